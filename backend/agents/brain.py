@@ -1,100 +1,467 @@
 import os
-from typing import Dict, Any, List
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+import re
+import time
+import asyncio
+import contextlib
+import statistics
+from collections import deque
+from datetime import datetime
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Union
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 
 # Import schemas
-from backend.core.schemas import RoutingDecision
+from backend.core.schemas import RoutingDecision, FusedDecision
 
 # Import Sub-Agents
 from backend.agents.finance_agent import FinanceAgent
 from backend.agents.health_agent import HealthAgent
 from backend.agents.journal_agent import JournalAgent
+from backend.agents.classifier import CategoryClassifier
+from backend.core.text import normalize
+from backend.core.cache import ResponseCache, cache_from_env
+from backend.core.embeddings import EmbeddingService
+from backend.core.clients import get_chat_model, get_embeddings
+from backend.core.rate_limit import RateGovernor, model_name, shared_governor
+from backend.core.metrics import timed
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 load_dotenv()
 
+ROUTER_SYSTEM_PROMPT = """You are the central router for a personal Life OS.
+        Analyze the user's input and categorize it into one of the following:
+        - FINANCE: Expense tracking, purchases, income.
+        - HEALTH: Workouts, meals, medical info, grooming.
+        - JOURNAL: Personal reflections, mood logs, diary entries.
+        - OTHER: Anything that doesn't fit (e.g., questions, random chatter).
+        
+        Return a confidence score (0.0-1.0)."""
+
+# Fused mode: route AND extract in a single structured-output call
+FUSED_ROUTING = os.getenv("FUSED_ROUTING", "false").lower() in ("1", "true", "yes")
+# Below this confidence the fused answer is discarded and the two-step path runs
+FUSED_MIN_CONFIDENCE = float(os.getenv("FUSED_MIN_CONFIDENCE", "0.7"))
+
+# Speculative mode: run the router and the locally guessed sub-agent concurrently
+SPECULATIVE_ROUTING = os.getenv("SPECULATIVE_ROUTING", "false").lower() in ("1", "true", "yes")
+# Only speculate when the local guess is at least this likely (a miss wastes a call)
+SPECULATION_MIN_CONFIDENCE = float(os.getenv("SPECULATION_MIN_CONFIDENCE", "0.6"))
+
+# Local pre-router: answer trivially classifiable messages without calling the LLM
+LOCAL_PREROUTER = os.getenv("LOCAL_PREROUTER", "true").lower() in ("1", "true", "yes")
+PREROUTER_MIN_CONFIDENCE = float(os.getenv("PREROUTER_MIN_CONFIDENCE", "0.9"))
+# Let the naive Bayes model answer too (off by default: its probabilities are
+# overconfident, e.g. "cuánto gasté este mes?" scores FINANCE at 0.96)
+PREROUTER_MODEL = os.getenv("PREROUTER_MODEL", "false").lower() in ("1", "true", "yes")
+
+# Compact on purpose: pasting the three agent prompts made every fused call ~3x
+# the prompt tokens of route + one agent. The field descriptions of the schemas
+# carry the rest of the instructions.
+FUSED_SYSTEM_PROMPT = """You are the router and data extractor of Mariano's personal Life OS.
+        Pick one category and extract its data in the same answer:
+        - FINANCE (expenses, purchases, income): extract EVERY transaction. Today is {today}, resolve relative dates.
+          Currency ARS unless USD is mentioned. For installments ("12 cuotas de 5000", "cuota 3/12") amount is ONE installment.
+          Categories: "Ingreso: Sueldo", "Ingreso: Alquiler", "Ingreso: Freelance", "Vivienda: Depto", "Vehículo: Auto",
+          "Vehículo: Moto", "Educación: Data Science", "Servicios", "Supermercado", "Salidas/Ocio", "Suscripciones", "Salud", "Otros".
+          Payment methods: "Efectivo", "Débito", "Crédito: Visa", "Crédito: Master", "Crédito: Amex", "Transferencia" ('tarjeta' alone = "Crédito: Visa").
+        - HEALTH (workouts, meals, medical): activity_type workout/meal/...; exercises, sets, reps, weight or food_items, calories_est in details_json.
+        - JOURNAL (reflections, mood): mood_score 1-10, 3-5 sentiment_tags, reflection_summary.
+        - OTHER (questions, chatter): no data.
+        Return a confidence score (0.0-1.0)."""
+
+class RulePreRouter:
+    """
+    Local fast path ahead of the LLM router. Regex rules catch trivially
+    classifiable messages ("$3500 nafta visa", "corrí 5km", "hoy me sentí 7/10");
+    with `use_model` the local category model answers too once it has enough
+    history.
+
+    Any object with a `route(text) -> Optional[RoutingDecision]` method can be
+    plugged into LifeOSBrain instead.
+    """
+
+    MONEY = r"(\$\s?\d|\busd\s?\d|\b\d[\d.,]*\s?(k|mil|lucas|pesos|usd|dolares|ars)\b)"
+    FINANCE_CUES = r"\b(gaste|pague|compre|cobre|cobraron|transferi|cargue|abone|visa|master|amex|debito|credito|tarjeta|efectivo|transferencia|cuotas?)\b"
+    WORKOUT_VERBS = r"\b(corri|trote|nade|camine|pedalee|entrene|hice)\b"
+    DISTANCE = r"\b\d+([.,]\d+)?\s?(km|kms|kilometros|metros)\b"
+    SETS = r"\b\d+\s?(series|reps|repeticiones)\b"
+    MOOD_SCORE = r"\b(10|[1-9])\s?/\s?10\b"
+    MOOD_CUES = r"\b(me senti|me siento|animo|mood|dia)\b"
+
+    # (category, confidence, patterns that must all match)
+    RULES = [
+        ("FINANCE", 0.97, [MONEY, FINANCE_CUES]),
+        ("FINANCE", 0.92, [r"\b(gaste|pague|compre|cobre)\b", r"\d"]),
+        ("HEALTH", 0.97, [WORKOUT_VERBS, DISTANCE]),
+        ("HEALTH", 0.95, [SETS]),
+        ("JOURNAL", 0.97, [MOOD_CUES, MOOD_SCORE]),
+    ]
+
+    def __init__(
+        self,
+        classifier: Optional[CategoryClassifier] = None,
+        min_confidence: float = PREROUTER_MIN_CONFIDENCE,
+        min_history: int = 200,
+        use_model: bool = PREROUTER_MODEL,
+    ):
+        self.classifier = classifier if use_model else None
+        self.min_confidence = min_confidence
+        # The local model is only trusted once it has seen enough routed messages
+        self.min_history = min_history
+        self.rules = [
+            (category, confidence, [re.compile(p) for p in patterns])
+            for category, confidence, patterns in self.RULES
+        ]
+
+    def route(self, text: str) -> Optional[RoutingDecision]:
+        normalized = normalize(text)
+
+        matches = {}
+        for category, confidence, patterns in self.rules:
+            if all(p.search(normalized) for p in patterns):
+                matches[category] = max(confidence, matches.get(category, 0.0))
+
+        # Rules for different categories fired: ambiguous, let the LLM decide
+        if len(matches) == 1:
+            category, confidence = next(iter(matches.items()))
+            if confidence >= self.min_confidence:
+                return RoutingDecision(category=category, confidence=confidence)
+        elif matches:
+            return None
+
+        if self.classifier and self.classifier.history_size >= self.min_history:
+            category, confidence = self.classifier.predict(text)
+            if category != "OTHER" and confidence >= self.min_confidence:
+                return RoutingDecision(category=category, confidence=round(confidence, 3))
+
+        return None
+
 class LifeOSBrain:
-    def __init__(self):
+    def __init__(
+        self,
+        llm: Optional["ChatOpenAI"] = None,
+        embeddings: Optional["OpenAIEmbeddings"] = None,
+        fused: Optional[bool] = None,
+        speculative: Optional[bool] = None,
+        pre_router: Union[RulePreRouter, bool, None] = None,
+        cache: Union[ResponseCache, bool, None] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        governor: Optional[RateGovernor] = None,
+    ):
+        # llm / embeddings can be injected (e.g. stubs for benchmarks)
         self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
+        if not self.api_key and (llm is None or embeddings is None):
             raise ValueError("OPENAI_API_KEY not found in environment variables")
             
-        # Initialize the base LLM (gpt-4o-mini is efficient for this)
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0,
-            api_key=self.api_key
-        )
+        # Models, agents and chains are built on first use (see the properties
+        # below), so constructing the brain doesn't load the OpenAI clients
+        self._llm = llm
+        self._embeddings = embeddings
+        self._embedding_service = embedding_service
+        # Shared rate limits / retries for every OpenAI call (agents, router, embeddings)
+        self.governor = governor or shared_governor()
 
-        # Initialize Embeddings
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=self.api_key
-        )
+        self.fused = FUSED_ROUTING if fused is None else fused
+        self.speculative = SPECULATIVE_ROUTING if speculative is None else speculative
+
+        # Local category model, seeded from raw_logs and updated with the LLM router's labels
+        self.classifier = CategoryClassifier()
+        self.speculation_stats = {"hits": 0, "misses": 0, "skipped": 0}
+
+        # Local pre-router (None -> LOCAL_PREROUTER env, False -> disabled)
+        if pre_router is None:
+            pre_router = LOCAL_PREROUTER
+        if pre_router is True:
+            pre_router = RulePreRouter(self.classifier)
+        self.pre_router = pre_router or None
+
+        # Response cache (None -> RESPONSE_CACHE env, False -> disabled)
+        if cache is None or cache is True:
+            cache = cache_from_env()
+        self.cache = cache or None
+
+        # Routing latencies (seconds) per path: "local" pre-router vs "llm" router
+        self.routing_latencies = {"local": deque(maxlen=1000), "llm": deque(maxlen=1000)}
+
+    @cached_property
+    def llm(self) -> "ChatOpenAI":
+        # Shared gpt-4o-mini client (efficient for routing and extraction)
+        return self._llm or get_chat_model("gpt-4o-mini")
+
+    @cached_property
+    def embeddings(self) -> "OpenAIEmbeddings":
+        return self._embeddings or get_embeddings("text-embedding-3-small")
+
+    @cached_property
+    def embedding_service(self) -> EmbeddingService:
+        # Hash-cached, batched access to the embeddings model
+        return self._embedding_service or EmbeddingService(self.embeddings, governor=self.governor)
+
+    # Sub-agents and chains are compiled once (on first use), not per message
+    @cached_property
+    def finance_agent(self) -> FinanceAgent:
+        return FinanceAgent(self.llm, governor=self.governor)
+
+    @cached_property
+    def health_agent(self) -> HealthAgent:
+        return HealthAgent(self.llm, governor=self.governor)
+
+    @cached_property
+    def journal_agent(self) -> JournalAgent:
+        return JournalAgent(self.llm, governor=self.governor)
+
+    @cached_property
+    def router_chain(self):
+        return self._build_router_chain()
 
-        # Initialize Sub-Agents
-        self.finance_agent = FinanceAgent(self.llm)
-        self.health_agent = HealthAgent(self.llm)
-        self.journal_agent = JournalAgent(self.llm)
+    @cached_property
+    def fused_chain(self):
+        return self._build_fused_chain()
 
+    @timed("embedding")
     def generate_embedding(self, text: str) -> List[float]:
-        """Generates a vector embedding for the given text."""
-        return self.embeddings.embed_query(text)
+        """Generates a vector embedding for the given text (cached by text hash)."""
+        return self.embedding_service.embed(text)
 
+    @timed("embedding")
+    async def agenerate_embedding(self, text: str) -> List[float]:
+        """Async version of `generate_embedding`; concurrent calls are batched into one request."""
+        return await self.embedding_service.aembed(text)
+
+    def _get_agent(self, category: str):
+        return {
+            "FINANCE": self.finance_agent,
+            "HEALTH": self.health_agent,
+            "JOURNAL": self.journal_agent,
+        }.get(category)
+
+    @timed("message")
     def process_input(self, text: str) -> Dict[str, Any]:
         """
         Main entry point. Routes the input and delegates to specialized agents.
         """
-        # 1. Routing Step
-        router_result = self._route_input(text)
+        # Date context: relative dates ("ayer") resolve differently each day
+        context = datetime.now().strftime("%Y-%m-%d")
+        embedding = None
+        if self.cache:
+            cached = self.cache.get(text, context)
+            if cached is None and self.cache.semantic:
+                embedding = self.generate_embedding(text)
+                cached = self.cache.get_similar(text, embedding, context)
+            if cached is not None:
+                return cached
+
+        router_result = extracted_data = None
+
+        # 0. Fused Step (route + extract in one call)
+        if self.fused:
+            router_result, extracted_data = self._split_fused(
+                self.fused_chain.invoke(self._fused_inputs(text))
+            )
+            if router_result:
+                self._learn(text, router_result)
+
+        if router_result is None:
+            # 1. Routing Step
+            router_result = self._route_input(text)
+
+            # 2. Delegation Step
+            agent = self._get_agent(router_result.category)
+            extracted_data = agent.process(text) if agent else None
+
+        result = self._build_result(text, router_result, extracted_data)
+
+        # Add embedding to data if it's a Journal entry
+        if result["category"] == "JOURNAL" and result["data"]:
+            result["data"]["embedding"] = embedding or self.generate_embedding(text)
+
+        if self.cache:
+            self.cache.set(text, context, result, embedding=embedding)
+
+        return result
+
+    @timed("message")
+    async def aprocess_input(self, text: str) -> Dict[str, Any]:
+        """
+        Async version of `process_input`. Every LLM / embedding call is awaited,
+        so concurrent messages overlap instead of blocking the event loop.
+        """
+        context = datetime.now().strftime("%Y-%m-%d")
+        embedding = None
+        if self.cache:
+            cached = self.cache.get(text, context)
+            if cached is None and self.cache.semantic:
+                embedding = await self.agenerate_embedding(text)
+                cached = self.cache.get_similar(text, embedding, context)
+            if cached is not None:
+                return cached
+
+        router_result = extracted_data = None
+
+        if self.fused:
+            router_result, extracted_data = self._split_fused(
+                await self.fused_chain.ainvoke(self._fused_inputs(text))
+            )
+            if router_result:
+                self._learn(text, router_result)
+
+        if router_result is None:
+            router_result, extracted_data = await self._aroute_and_extract(text)
+
+        result = self._build_result(text, router_result, extracted_data)
+
+        if result["category"] == "JOURNAL" and result["data"]:
+            result["data"]["embedding"] = embedding or await self.agenerate_embedding(text)
+
+        if self.cache:
+            self.cache.set(text, context, result, embedding=embedding)
+
+        return result
+
+    async def _aroute_and_extract(self, text: str):
+        """
+        Two-step path. In speculative mode the sub-agent guessed by the local
+        classifier starts at the same time as the router; on a hit its result
+        is used as is, on a miss it is cancelled and the right agent runs.
+        """
+        speculative_task = None
+        guess = None
+        if self.speculative:
+            guess, score = self.classifier.predict(text)
+            guessed_agent = self._get_agent(guess)
+            if guessed_agent and score >= SPECULATION_MIN_CONFIDENCE:
+                speculative_task = asyncio.create_task(guessed_agent.aprocess(text))
+            else:
+                self.speculation_stats["skipped"] += 1
+
+        try:
+            router_result = await self._aroute_input(text)
+        except BaseException:
+            if speculative_task:
+                await self._cancel(speculative_task)
+            raise
+
+        if speculative_task:
+            if router_result.category == guess:
+                self.speculation_stats["hits"] += 1
+                return router_result, await speculative_task
+            self.speculation_stats["misses"] += 1
+            await self._cancel(speculative_task)
+
+        agent = self._get_agent(router_result.category)
+        extracted_data = await agent.aprocess(text) if agent else None
+        return router_result, extracted_data
+
+    @staticmethod
+    async def _cancel(task: asyncio.Task) -> None:
+        """Cancels a speculative call and waits for it, so it stops (and its error is retrieved) now."""
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await task
+
+    @property
+    def speculation_hit_rate(self) -> float:
+        attempts = self.speculation_stats["hits"] + self.speculation_stats["misses"]
+        return self.speculation_stats["hits"] / attempts if attempts else 0.0
+
+    def _build_result(self, text: str, router_result: RoutingDecision, extracted_data) -> Dict[str, Any]:
         category = router_result.category
-        confidence = router_result.confidence
 
-        extracted_data = None
-        
-        # 2. Delegation Step
-        if category == "FINANCE":
-            extracted_data = self.finance_agent.process(text)
-        elif category == "HEALTH":
-            extracted_data = self.health_agent.process(text)
-        elif category == "JOURNAL":
-            extracted_data = self.journal_agent.process(text)
-        else:
+        if category not in ("FINANCE", "HEALTH", "JOURNAL"):
             # Category is OTHER
             category = "OTHER"
             extracted_data = {"raw_text": text, "message": "Could not categorize input."}
 
         # Prepare final data dict
         final_data = extracted_data.model_dump() if extracted_data and hasattr(extracted_data, 'model_dump') else extracted_data
-        
-        # Add embedding to data if it's a Journal entry
-        if category == "JOURNAL" and final_data:
-            final_data["embedding"] = self.generate_embedding(text)
 
         return {
             "category": category,
-            "confidence": confidence,
+            "confidence": router_result.confidence,
             "data": final_data
         }
 
-    def _route_input(self, text: str) -> RoutingDecision:
-        """Decides the category of the input."""
-        system_prompt = """You are the central router for a personal Life OS.
-        Analyze the user's input and categorize it into one of the following:
-        - FINANCE: Expense tracking, purchases, income.
-        - HEALTH: Workouts, meals, medical info, grooming.
-        - JOURNAL: Personal reflections, mood logs, diary entries.
-        - OTHER: Anything that doesn't fit (e.g., questions, random chatter).
-        
-        Return a confidence score (0.0-1.0)."""
-        
+    def _build_fused_chain(self):
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", FUSED_SYSTEM_PROMPT),
+            ("human", "{input}")
+        ])
+
+        structured_llm = self.llm.with_structured_output(FusedDecision)
+        return self.governor.wrap(
+            prompt | structured_llm, model_name(self.llm), base_tokens=len(FUSED_SYSTEM_PROMPT) // 4
+        )
+
+    def _fused_inputs(self, text: str) -> dict:
+        return {"input": text, "today": datetime.now().strftime("%Y-%m-%d")}
+
+    def _split_fused(self, decision: FusedDecision):
+        """
+        Returns (RoutingDecision, extracted_data) from a fused answer,
+        or (None, None) if the confidence is too low to trust it.
+        """
+        result = decision.result
+        if result.confidence < FUSED_MIN_CONFIDENCE:
+            return None, None
+
+        router_result = RoutingDecision(category=result.category, confidence=result.confidence)
+        return router_result, getattr(result, "data", None)
+
+    def _learn(self, text: str, decision: RoutingDecision) -> None:
+        # Only labels from the LLM: learning from local decisions would reinforce their mistakes
+        self.classifier.update(text, decision.category)
+
+    def _build_router_chain(self):
         prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", ROUTER_SYSTEM_PROMPT),
             ("human", "{input}")
         ])
         
         structured_llm = self.llm.with_structured_output(RoutingDecision)
-        chain = prompt | structured_llm
-        
-        return chain.invoke({"input": text})
+        return self.governor.wrap(
+            prompt | structured_llm, model_name(self.llm), base_tokens=len(ROUTER_SYSTEM_PROMPT) // 4,
+            completion_tokens=32,
+        )
+
+    @timed("route")
+    def _route_input(self, text: str) -> RoutingDecision:
+        """Decides the category of the input (locally if the pre-router is confident)."""
+        start = time.perf_counter()
+        decision = self.pre_router.route(text) if self.pre_router else None
+        path = "local"
+        if decision is None:
+            decision = self.router_chain.invoke({"input": text})
+            path = "llm"
+            self._learn(text, decision)
+        self.routing_latencies[path].append(time.perf_counter() - start)
+        return decision
+
+    @timed("route")
+    async def _aroute_input(self, text: str) -> RoutingDecision:
+        """Async version of `_route_input`."""
+        start = time.perf_counter()
+        decision = self.pre_router.route(text) if self.pre_router else None
+        path = "local"
+        if decision is None:
+            decision = await self.router_chain.ainvoke({"input": text})
+            path = "llm"
+            self._learn(text, decision)
+        self.routing_latencies[path].append(time.perf_counter() - start)
+        return decision
+
+    def routing_report(self) -> Dict[str, Any]:
+        """Fraction of messages routed locally and latency percentiles (ms) per path."""
+        report = {}
+        total = sum(len(samples) for samples in self.routing_latencies.values())
+        report["local_fraction"] = len(self.routing_latencies["local"]) / total if total else 0.0
+        for path, samples in self.routing_latencies.items():
+            ordered = sorted(samples)
+            report[path] = {
+                "count": len(ordered),
+                "p50_ms": round(statistics.median(ordered) * 1000, 3) if ordered else None,
+                "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 3) if ordered else None,
+            }
+        return report
@@ -0,0 +1,96 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from backend.core.text import normalize
+
+CATEGORIES = ("FINANCE", "HEALTH", "JOURNAL", "OTHER")
+
+# Token prefixes that strongly hint a category (accents are stripped before matching)
+KEYWORDS = {
+    "FINANCE": [
+        "gast", "pagu", "pago", "compr", "cuota", "cobr", "sueldo", "alquiler", "transferi",
+        "nafta", "expensas", "visa", "master", "amex", "debito", "credito", "tarjeta",
+        "efectivo", "coto", "carrefour", "netflix", "spotify", "usd", "lucas", "$",
+    ],
+    "HEALTH": [
+        "corri", "km", "gym", "gimnasio", "entren", "series", "reps", "pesas", "banco",
+        "sentadilla", "calorias", "almorc", "cene", "desayun", "comi", "medico", "turno",
+        "dormi", "nade", "bici", "yoga", "kg",
+    ],
+    "JOURNAL": [
+        "senti", "siento", "animo", "feliz", "triste", "ansios", "estres", "cansad",
+        "contento", "agradec", "reflexion", "pense", "dia", "hoy",
+    ],
+}
+
+TOKEN_RE = re.compile(r"\$|[^\W\d_]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalizes and splits the text into word / number tokens."""
+    return TOKEN_RE.findall(normalize(text))
+
+
+class CategoryClassifier:
+    """
+    Cheap local guess of the routing category, no network involved.
+    Combines keyword hints with a multinomial naive Bayes model over past
+    messages and the category they were routed to (`raw_logs.category`).
+    """
+
+    def __init__(self, keyword_weight: float = 2.0):
+        self.keyword_weight = keyword_weight
+        self.category_counts = Counter()
+        self.token_counts = {category: Counter() for category in CATEGORIES}
+        self.vocabulary = set()
+
+    def fit(self, rows: Iterable[Tuple[str, str]]) -> "CategoryClassifier":
+        """Trains on (message, category) pairs, e.g. rows from `raw_logs`."""
+        for text, category in rows:
+            self.update(text, category)
+        return self
+
+    def update(self, text: str, category: str) -> None:
+        """Adds one labelled message to the model (online learning)."""
+        if category not in self.token_counts or not text:
+            return
+        tokens = tokenize(text)
+        self.category_counts[category] += 1
+        self.token_counts[category].update(tokens)
+        self.vocabulary.update(tokens)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        tokens = tokenize(text)
+        total_docs = sum(self.category_counts.values())
+        vocabulary_size = len(self.vocabulary) + 1
+
+        scores = {}
+        for category in CATEGORIES:
+            # Laplace smoothed prior and likelihoods (uniform until there is history)
+            score = math.log((self.category_counts[category] + 1) / (total_docs + len(CATEGORIES)))
+            counts = self.token_counts[category]
+            total_tokens = sum(counts.values())
+            for token in tokens:
+                score += math.log((counts[token] + 1) / (total_tokens + vocabulary_size))
+                if any(token.startswith(k) for k in KEYWORDS.get(category, ())):
+                    score += self.keyword_weight
+            scores[category] = score
+
+        # Softmax over log scores
+        best = max(scores.values())
+        exp_scores = {c: math.exp(s - best) for c, s in scores.items()}
+        norm = sum(exp_scores.values())
+        return {c: v / norm for c, v in exp_scores.items()}
+
+    @property
+    def history_size(self) -> int:
+        """Number of labelled messages the model has seen."""
+        return sum(self.category_counts.values())
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Returns the most likely category and its probability."""
+        proba = self.predict_proba(text)
+        category = max(proba, key=proba.get)
+        return category, proba[category]
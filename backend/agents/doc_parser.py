@@ -1,36 +1,267 @@
+import io
 import os
-import base64
+import re
+import asyncio
+import logging
+import multiprocessing
+import threading
 import pdfplumber
-from typing import List, Union
-from langchain_openai import ChatOpenAI
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cached_property
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Union
 from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 
 from backend.core.schemas import FinanceBatch, FinanceEntry
+from backend.agents.finance_parser import NUMBER, parse_number
+from backend.agents.image_prep import prepare_image
+from backend.core.clients import get_chat_model
+from backend.core.rate_limit import BACKGROUND, RateGovernor, model_name, shared_governor
+from backend.core.metrics import metrics, timed
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 load_dotenv()
 
+# PDFs with at least this many pages are extracted in a process pool
+PARALLEL_PDF_MIN_PAGES = int(os.getenv("PARALLEL_PDF_MIN_PAGES", "16"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Completion budget charged per extraction call (a statement chunk lists many transactions)
+DOC_COMPLETION_TOKENS = int(os.getenv("DOC_COMPLETION_TOKENS", "2000"))
+
+# A file path or an in-memory buffer with the file's bytes
+DocumentSource = Union[str, BinaryIO]
+# Progress callbacks: (pages read, total pages) and (chunks done, total chunks, transactions so far)
+PageProgress = Callable[[int, int], None]
+ChunkProgress = Callable[[int, int, int], None]
+
+def _extract_page_range(source: Union[str, bytes], start: int, end: int) -> List[str]:
+    """Process pool worker: text of the non-empty pages in [start, end)."""
+    texts = []
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with pdfplumber.open(source, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text()
+            page.close()
+            if text and text.strip():
+                texts.append(text)
+    return texts
+
+# Process pools shared by every document, by worker count (started on the first large PDF)
+_pdf_pools: Dict[int, ProcessPoolExecutor] = {}
+_pdf_pools_lock = threading.Lock()
+
+def _pdf_pool(workers: int) -> ProcessPoolExecutor:
+    with _pdf_pools_lock:
+        pool = _pdf_pools.get(workers)
+        if pool is None:
+            # spawn, not fork: PDFs are parsed from worker threads of a multi-threaded
+            # process, and forking it can deadlock on a lock held by another thread
+            pool = _pdf_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return pool
+
+def shutdown_pdf_pools() -> None:
+    """Stops the PDF worker processes (call on exit)."""
+    with _pdf_pools_lock:
+        pools = list(_pdf_pools.values())
+        _pdf_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+# Statements longer than this are split into chunks and extracted concurrently
+CHUNK_MAX_CHARS = int(os.getenv("DOC_CHUNK_MAX_CHARS", "6000"))
+CHUNK_OVERLAP_LINES = int(os.getenv("DOC_CHUNK_OVERLAP_LINES", "2"))
+CHUNK_CONCURRENCY = int(os.getenv("DOC_CHUNK_CONCURRENCY", "4"))
+# Extra attempts for a chunk whose extraction fails (bad structured output, timeout...)
+CHUNK_RETRIES = int(os.getenv("DOC_CHUNK_RETRIES", "2"))
+
+# A transaction line starts with a date ("05/10", "05-10-24", "2024-10-05")
+TRANSACTION_LINE_RE = re.compile(r"^\s*(\d{1,2}[/-]\d{1,2}|\d{4}-\d{2}-\d{2})")
+
+class ChunkExtractionError(Exception):
+    """Some chunks of a statement couldn't be extracted even after retrying."""
+
+    def __init__(self, failed: int, total: int, cause: BaseException):
+        super().__init__(f"{failed} of {total} statement chunks could not be extracted: {cause}")
+        self.failed = failed
+        self.total = total
+
+class StatementChunk(NamedTuple):
+    text: str
+    # Transaction lines repeated from the end of the previous chunk ("" for the first one)
+    overlap: str
+
+def split_statement(text: str, max_chars: Optional[int] = None, overlap_lines: Optional[int] = None) -> List[StatementChunk]:
+    """
+    Splits statement text into chunks of ~max_chars on transaction-line
+    boundaries (continuation lines stay with their transaction). Each chunk
+    repeats the last `overlap_lines` transaction lines of the previous one so
+    nothing is lost at the cut.
+    """
+    max_chars = max_chars or CHUNK_MAX_CHARS
+    overlap_lines = CHUNK_OVERLAP_LINES if overlap_lines is None else overlap_lines
+
+    # Group lines into records: a transaction line plus its continuation lines
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if TRANSACTION_LINE_RE.match(line) or not records:
+            records.append(line)
+        else:
+            records[-1] += "\n" + line
+
+    chunks, current, overlap, size = [], [], [], 0
+    for record in records:
+        if current and size + len(record) > max_chars:
+            chunks.append(StatementChunk("\n".join(current), "\n".join(overlap)))
+            current = current[-overlap_lines:] if overlap_lines else []
+            overlap = list(current)
+            size = sum(len(r) + 1 for r in current)
+        current.append(record)
+        size += len(record) + 1
+    if current:
+        chunks.append(StatementChunk("\n".join(current), "\n".join(overlap)))
+    return chunks
+
+def _amounts(text: str) -> Counter:
+    """Amounts written in statement text ("1.234,50", "1234.50", "-800")."""
+    return Counter(round(parse_number(n), 2) for n in re.findall(NUMBER, text))
+
+def merge_chunk_results(results: List[List[FinanceEntry]], chunks: List[StatementChunk]) -> List[FinanceEntry]:
+    """
+    Concatenates per-chunk transactions in order and drops the duplicates
+    created by the overlap: an entry is skipped only if the previous chunk
+    produced the same date / amount / merchant AND its amount is written in
+    the lines this chunk repeats from the previous one. A transaction that
+    genuinely appears twice next to a cut is kept.
+    """
+    def key(entry: FinanceEntry):
+        return (entry.date, round(abs(entry.amount), 2), (entry.merchant or entry.item or "").strip().lower())
+
+    merged = []
+    previous = Counter()
+    for entries, chunk in zip(results, chunks):
+        current = Counter(key(entry) for entry in entries)
+        window = _amounts(chunk.overlap)
+        for entry in entries:
+            k = key(entry)
+            if previous[k] > 0 and window[k[1]] > 0:
+                previous[k] -= 1
+                window[k[1]] -= 1
+                continue
+            merged.append(entry)
+        previous = current
+    return merged
+
+DOC_SYSTEM_PROMPT = """Eres un analista contable experto.
+        Analiza este documento (resumen de cuenta, ticket o factura).
+        Extrae UNA lista de transacciones financieras.
+        
+        Reglas:
+        1. Ignora pagos de la propia tarjeta, saldos anteriores o intereses de financiación si no son compras nuevas.
+        2. Para cada transacción extrae: fecha (YYYY-MM-DD), item/descripcion, monto, moneda (ARS/USD) y categoría.
+        3. Categoriza inteligentemente (Supermercado, Ocio, Servicios, Transporte, etc).
+        4. Si la moneda no es explícita, asume ARS.
+        """
+
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(self, llm: Optional["ChatOpenAI"] = None, governor: Optional[RateGovernor] = None):
+        # llm can be injected (e.g. a stub for benchmarks)
         self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
+        if not self.api_key and llm is None:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        # Initialize LLM with gpt-4o for robust vision/text handling
-        self.llm = ChatOpenAI(
-            model="gpt-4o",
-            temperature=0,
-            api_key=self.api_key
+        self._llm = llm
+        # Document calls queue behind interactive messages (BACKGROUND priority)
+        self.governor = governor or shared_governor()
+
+    @cached_property
+    def llm(self) -> "ChatOpenAI":
+        # Shared gpt-4o client for robust vision/text handling, built on first document
+        return self._llm or get_chat_model("gpt-4o")
+
+    # Compiled once (on first use): structured vision model and text chain
+    @cached_property
+    def vision_llm(self):
+        return self.governor.wrap(
+            self.llm.with_structured_output(FinanceBatch), model_name(self.llm),
+            priority=BACKGROUND, completion_tokens=DOC_COMPLETION_TOKENS,
+        )
+
+    @cached_property
+    def text_chain(self):
+        return self._build_text_chain()
+
+    def _build_text_chain(self):
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", DOC_SYSTEM_PROMPT),
+            ("human", "{input}")
+        ])
+        return self.governor.wrap(
+            prompt | self.llm.with_structured_output(FinanceBatch), model_name(self.llm),
+            priority=BACKGROUND, base_tokens=len(DOC_SYSTEM_PROMPT) // 4, completion_tokens=DOC_COMPLETION_TOKENS,
         )
 
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extracts raw text from a PDF file using pdfplumber."""
-        text_content = ""
+    def iter_pdf_pages(self, source: DocumentSource, workers: Optional[int] = None,
+                       on_page: Optional[PageProgress] = None) -> Iterator[str]:
+        """
+        Yields the text of each non-empty page, in order, without holding the
+        whole document in memory. Large PDFs are split into page ranges that are
+        extracted in a shared process pool (pdfplumber is CPU bound).
+
+        `source` is a file path or a binary buffer (e.g. a BytesIO download).
+        `on_page(pages_read, total)` is called as pages (or page ranges) finish.
+        """
+        if not isinstance(source, str):
+            source.seek(0)
+        with pdfplumber.open(source) as pdf:
+            page_count = len(pdf.pages)
+
+            workers = workers or PDF_WORKERS
+            if page_count < PARALLEL_PDF_MIN_PAGES or workers <= 1:
+                for number, page in enumerate(pdf.pages, 1):
+                    text = page.extract_text()
+                    # Release the page's cached layout objects as we go
+                    page.close()
+                    if on_page:
+                        on_page(number, page_count)
+                    if text and text.strip():
+                        yield text
+                return
+
+        # ~2 ranges per worker keeps the pool busy without too much pickling
+        step = max(1, -(-page_count // (workers * 2)))
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        # Buffers can't be shared across processes, workers get the raw bytes instead
+        if not isinstance(source, str):
+            source.seek(0)
+            source = source.read()
+        pool = _pdf_pool(workers)
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text_content += page.extract_text() + "\n"
+            for (_, end), texts in zip(ranges, pool.map(_extract_page_range, [source] * len(ranges), *zip(*ranges))):
+                if on_page:
+                    on_page(end, page_count)
+                yield from texts
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM): the next document gets a fresh pool
+            with _pdf_pools_lock:
+                if _pdf_pools.get(workers) is pool:
+                    del _pdf_pools[workers]
+            raise
+
+    @timed("pdf_parse")
+    def extract_text_from_pdf(self, source: DocumentSource, on_page: Optional[PageProgress] = None) -> str:
+        """Extracts raw text from a PDF (path or buffer) using pdfplumber."""
+        try:
+            text_content = "\n".join(self.iter_pdf_pages(source, on_page=on_page))
         except Exception as e:
             raise ValueError(f"Error reading PDF: {str(e)}")
         
@@ -39,62 +270,95 @@ class DocumentProcessor:
             
         return text_content
 
-    def _encode_image(self, image_path: str) -> str:
-        """Encodes an image to base64."""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
-
-    def analyze_finance_document(self, content: str, is_image: bool = False) -> List[FinanceEntry]:
-        """
-        Analyzes a financial document (text or image) and returns a list of transactions.
-        
-        Args:
-            content: Raw text content OR file path to image if is_image=True
-            is_image: Boolean flag indicating if content is an image path
-        """
-        
-        system_prompt = """Eres un analista contable experto.
-        Analiza este documento (resumen de cuenta, ticket o factura).
-        Extrae UNA lista de transacciones financieras.
-        
-        Reglas:
-        1. Ignora pagos de la propia tarjeta, saldos anteriores o intereses de financiación si no son compras nuevas.
-        2. Para cada transacción extrae: fecha (YYYY-MM-DD), item/descripcion, monto, moneda (ARS/USD) y categoría.
-        3. Categoriza inteligentemente (Supermercado, Ocio, Servicios, Transporte, etc).
-        4. Si la moneda no es explícita, asume ARS.
-        """
-
+    def _build_request(self, content: Union[str, BinaryIO], is_image: bool):
+        """Returns the (runnable, input) pair used by the sync and async analyzers."""
         if is_image:
-            # Handle Image with Vision
-            base64_image = self._encode_image(content)
+            # Handle Image with Vision (downsized / re-encoded, real MIME type)
+            image = prepare_image(content)
             
             messages = [
                 HumanMessage(
                     content=[
-                        {"type": "text", "text": system_prompt},
+                        {"type": "text", "text": DOC_SYSTEM_PROMPT},
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
+                                "url": image.data_url
                             },
                         },
                     ]
                 )
             ]
-            
-            # Using with_structured_output directly on the LLM with the message list
-            structured_llm = self.llm.with_structured_output(FinanceBatch)
-            result = structured_llm.invoke(messages)
-            
-        else:
-            # Handle Text
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("human", "{input}")
-            ])
-            
-            structured_llm = self.llm.with_structured_output(FinanceBatch)
-            chain = prompt | structured_llm
-            result = chain.invoke({"input": content})
+            return self.vision_llm, messages
+
+        # Handle Text
+        return self.text_chain, {"input": content}
+
+    def analyze_finance_document(self, content: Union[str, BinaryIO], is_image: bool = False) -> List[FinanceEntry]:
+        """
+        Analyzes a financial document (text or image) and returns a list of transactions.
+        
+        Args:
+            content: Raw text content OR image path / binary buffer if is_image=True
+            is_image: Boolean flag indicating if content is an image
+        """
+        with metrics.timer("vision" if is_image else "doc_extract"):
+            if not is_image and len(content) > CHUNK_MAX_CHARS:
+                chunks = split_statement(content)
+                return merge_chunk_results([self.text_chain.invoke({"input": c.text}).transactions for c in chunks], chunks)
+
+            runnable, inputs = self._build_request(content, is_image)
+            return runnable.invoke(inputs).transactions
+
+    async def aanalyze_finance_document(self, content: Union[str, BinaryIO], is_image: bool = False,
+                                        on_chunk: Optional[ChunkProgress] = None) -> List[FinanceEntry]:
+        """
+        Async version of `analyze_finance_document`. Long statements are map-reduced
+        by chunk, calling `on_chunk(done, total, transactions_so_far)` as chunks finish.
+        """
+        with metrics.timer("vision" if is_image else "doc_extract"):
+            if not is_image and len(content) > CHUNK_MAX_CHARS:
+                return await self._aanalyze_chunked(content, on_chunk)
+
+            # Decoding/resizing/encoding the image is blocking work, keep it off the event loop
+            runnable, inputs = await asyncio.to_thread(self._build_request, content, is_image)
+            result = await runnable.ainvoke(inputs)
+            return result.transactions
+
+    async def _aanalyze_chunked(self, content: str, on_chunk: Optional[ChunkProgress] = None) -> List[FinanceEntry]:
+        """
+        Map: extract every chunk concurrently (at most CHUNK_CONCURRENCY in flight),
+        retrying a failing chunk up to CHUNK_RETRIES times.
+        Reduce: merge in document order and drop the duplicates produced by the overlap.
+        Raises ChunkExtractionError if a chunk still fails: a partial list would be
+        saved (and cached) as if it were the whole statement.
+        """
+        chunks = split_statement(content)
+        semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+        progress = {"done": 0, "found": 0}
+
+        async def extract(chunk: StatementChunk) -> List[FinanceEntry]:
+            async with semaphore:
+                try:
+                    for attempt in range(CHUNK_RETRIES + 1):
+                        try:
+                            result = await self.text_chain.ainvoke({"input": chunk.text})
+                            break
+                        except Exception as e:
+                            if attempt == CHUNK_RETRIES:
+                                raise
+                            logging.warning(f"Statement chunk extraction failed (attempt {attempt + 1}), retrying: {e}")
+                    progress["found"] += len(result.transactions)
+                    return result.transactions
+                finally:
+                    progress["done"] += 1
+                    if on_chunk:
+                        on_chunk(progress["done"], len(chunks), progress["found"])
+
+        results = await asyncio.gather(*(extract(c) for c in chunks), return_exceptions=True)
+
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            raise ChunkExtractionError(len(failed), len(chunks), failed[0])
 
-        return result.transactions
+        return merge_chunk_results(results, chunks)
@@ -1,24 +1,27 @@
+import os
 from datetime import datetime
-from langchain_openai import ChatOpenAI
+from typing import TYPE_CHECKING, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from backend.core.schemas import FinanceBatch
+from backend.agents.finance_parser import FinanceRuleParser
+from backend.core.rate_limit import RateGovernor, model_name, shared_governor
+from backend.core.metrics import timed
 
-class FinanceAgent:
-    def __init__(self, llm: ChatOpenAI):
-        self.llm = llm
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
-    def process(self, text: str) -> FinanceBatch:
-        """Extracts a LIST of finance transactions based on Mariano's specific context."""
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        
-        system_prompt = f"""Eres el contador personal de Mariano. 
+# Parse simple messages ("gasté 2000 en coto con débito") without calling the LLM
+LOCAL_FINANCE_PARSER = os.getenv("LOCAL_FINANCE_PARSER", "true").lower() in ("1", "true", "yes")
+
+# Prompt template, `{today}` is filled at call time to resolve relative dates
+FINANCE_SYSTEM_PROMPT = """Eres el contador personal de Mariano. 
         - ACTIVOS: Tiene un Departamento, un Auto y una Moto. 
         - INGRESOS: Sueldo fijo, Alquileres (variable) y Freelance (variable). 
         - EDUCACIÓN: Estudia Data Science (gastos académicos). 
         - CLIENTES: A veces paga suscripciones o gastos para clientes (detectar contexto y marcar `is_client_expense=True`). 
         - PAGOS: Usa Visa, Master y Amex. Si dice 'tarjeta' sin especificar, asume 'Crédito: Visa'. 
         - REGLA: Extrae TODAS las transacciones del texto (pueden ser varias). Si menciona USD, usa moneda 'USD'.
-        - FECHA: Hoy es {today_str}. Úsalo para resolver fechas relativas.
+        - FECHA: Hoy es {today}. Úsalo para resolver fechas relativas.
         - SUBCATEGORÍA: Extrae detalles específicos en `subcategory` (ej: si es Auto -> Nafta/Seguro/Patente; si es Depto -> Expensas/ABL).
         
         **CUOTAS (IMPORTANTE):**
@@ -35,13 +38,45 @@ class FinanceAgent:
         Métodos de pago válidos (Strict):
         - "Efectivo", "Débito", "Crédito: Visa", "Crédito: Master", "Crédito: Amex", "Transferencia".
         """
-        
+
+class FinanceAgent:
+    def __init__(self, llm: "ChatOpenAI", parser: Optional[FinanceRuleParser] = None,
+                 governor: Optional[RateGovernor] = None):
+        self.llm = llm
+        self.governor = governor or shared_governor()
+        # Compiled once; only the input (and date) change between calls
+        self.chain = self._build_chain()
+        if parser is None and LOCAL_FINANCE_PARSER:
+            parser = FinanceRuleParser()
+        self.parser = parser
+        # How many messages were resolved by the local parser vs the LLM
+        self.stats = {"local": 0, "llm": 0}
+
+    def _build_chain(self):
         prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", FINANCE_SYSTEM_PROMPT),
             ("human", "{input}")
         ])
         
         structured_llm = self.llm.with_structured_output(FinanceBatch)
-        chain = prompt | structured_llm
-        
-        return chain.invoke({"input": text})
+        return self.governor.wrap(
+            prompt | structured_llm, model_name(self.llm), base_tokens=len(FINANCE_SYSTEM_PROMPT) // 4
+        )
+
+    def _inputs(self, text: str) -> dict:
+        return {"input": text, "today": datetime.now().strftime("%Y-%m-%d")}
+
+    def _parse_locally(self, text: str) -> Optional[FinanceBatch]:
+        batch = self.parser.parse(text) if self.parser else None
+        self.stats["local" if batch else "llm"] += 1
+        return batch
+
+    @timed("extract.finance")
+    def process(self, text: str) -> FinanceBatch:
+        """Extracts a LIST of finance transactions based on Mariano's specific context."""
+        return self._parse_locally(text) or self.chain.invoke(self._inputs(text))
+
+    @timed("extract.finance")
+    async def aprocess(self, text: str) -> FinanceBatch:
+        """Async version of `process`, doesn't block the event loop."""
+        return self._parse_locally(text) or await self.chain.ainvoke(self._inputs(text))
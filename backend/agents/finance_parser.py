@@ -0,0 +1,307 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from pydantic import ValidationError
+
+from backend.core.text import normalize
+from backend.core.schemas import FinanceBatch, FinanceEntry
+
+# alias -> (merchant, category, subcategory)
+MERCHANTS = {
+    "coto": ("Coto", "Supermercado", None),
+    "carrefour": ("Carrefour", "Supermercado", None),
+    "jumbo": ("Jumbo", "Supermercado", None),
+    "disco": ("Disco", "Supermercado", None),
+    "vea": ("Vea", "Supermercado", None),
+    "chino": ("Chino", "Supermercado", None),
+    "shell": ("Shell", "Vehículo: Auto", "Nafta"),
+    "ypf": ("YPF", "Vehículo: Auto", "Nafta"),
+    "axion": ("Axion", "Vehículo: Auto", "Nafta"),
+    "puma": ("Puma", "Vehículo: Auto", "Nafta"),
+    "netflix": ("Netflix", "Suscripciones", None),
+    "spotify": ("Spotify", "Suscripciones", None),
+    "disney": ("Disney+", "Suscripciones", None),
+    "hbo": ("HBO Max", "Suscripciones", None),
+    "youtube": ("YouTube Premium", "Suscripciones", None),
+    "chatgpt": ("OpenAI", "Suscripciones", None),
+    "farmacity": ("Farmacity", "Salud", "Farmacia"),
+    "farmacia": ("Farmacia", "Salud", "Farmacia"),
+    "rappi": ("Rappi", "Salidas/Ocio", "Delivery"),
+    "pedidosya": ("PedidosYa", "Salidas/Ocio", "Delivery"),
+    "edesur": ("Edesur", "Servicios", "Luz"),
+    "edenor": ("Edenor", "Servicios", "Luz"),
+    "metrogas": ("Metrogas", "Servicios", "Gas"),
+    "aysa": ("AySA", "Servicios", "Agua"),
+    "fibertel": ("Fibertel", "Servicios", "Internet"),
+    "movistar": ("Movistar", "Servicios", "Celular"),
+}
+
+# keyword -> (category, subcategory), used when no merchant alias matches
+ITEMS = {
+    "nafta": ("Vehículo: Auto", "Nafta"),
+    "seguro del auto": ("Vehículo: Auto", "Seguro"),
+    "patente": ("Vehículo: Auto", "Patente"),
+    "estacionamiento": ("Vehículo: Auto", "Estacionamiento"),
+    "seguro de la moto": ("Vehículo: Moto", "Seguro"),
+    "moto": ("Vehículo: Moto", None),
+    "expensas": ("Vivienda: Depto", "Expensas"),
+    "abl": ("Vivienda: Depto", "ABL"),
+    "super": ("Supermercado", None),
+    "supermercado": ("Supermercado", None),
+    "verduleria": ("Supermercado", "Verdulería"),
+    "carniceria": ("Supermercado", "Carnicería"),
+    "cena": ("Salidas/Ocio", "Cena"),
+    "almuerzo": ("Salidas/Ocio", "Almuerzo"),
+    "bar": ("Salidas/Ocio", "Bar"),
+    "cine": ("Salidas/Ocio", "Cine"),
+    "birra": ("Salidas/Ocio", "Bar"),
+    "luz": ("Servicios", "Luz"),
+    "gas": ("Servicios", "Gas"),
+    "internet": ("Servicios", "Internet"),
+    "celular": ("Servicios", "Celular"),
+    "medico": ("Salud", "Médico"),
+    "remedios": ("Salud", "Farmacia"),
+    "curso": ("Educación: Data Science", "Curso"),
+}
+
+PAYMENT_METHODS = [
+    (r"\b(amex|american express)\b", "Crédito: Amex"),
+    (r"\b(master|mastercard)\b", "Crédito: Master"),
+    (r"\bvisa\b", "Crédito: Visa"),
+    (r"\b(tarjeta de debito|debito)\b", "Débito"),
+    (r"\b(transferencia|transferi|mercado ?pago|mp)\b", "Transferencia"),
+    (r"\b(efectivo|cash)\b", "Efectivo"),
+]
+# "tarjeta" without brand defaults to Visa (same rule as the LLM prompt)
+GENERIC_CARD_RE = re.compile(r"\b(tarjeta|credito)\b")
+
+WEEKDAYS = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"]
+
+NUMBER = r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?"
+MULTIPLIERS = {"k": 1_000, "mil": 1_000, "lucas": 1_000, "luca": 1_000, "palos": 1_000_000}
+AMOUNT_RE = re.compile(
+    r"(?:usd|u\$s|us\$)?\s?\$?\s?(?P<number>" + NUMBER + r")"
+    r"\s?(?P<multiplier>k|mil|lucas|luca|palos)?\b"
+)
+# "5 m" is rarely millions (metros, minutos...) and a misread is off by 10^6: left to the LLM
+M_SUFFIX_RE = re.compile(r"\d\s?m\b")
+INSTALLMENTS_OF_RE = re.compile(r"\b(?P<total>\d{1,2})\s?cuotas?\s+de\s+\$?\s?(?P<amount>" + NUMBER + r")")
+INSTALLMENTS_IN_RE = re.compile(r"\ben\s+(?P<total>\d{1,2})\s?cuotas\b")
+INSTALLMENT_NUMBER_RE = re.compile(r"\bcuota\s+(?P<current>\d{1,2})\s?(?:/|de)\s?(?P<total>\d{1,2})\b")
+EXPLICIT_DATE_RE = re.compile(r"\b(?P<day>\d{1,2})/(?P<month>\d{1,2})(?:/(?P<year>\d{2,4}))?\b")
+DAYS_AGO_RE = re.compile(r"\bhace\s+(?P<days>\d+|un|una|dos|tres)\s+dias?\b")
+MONTHS = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+          "septiembre", "setiembre", "octubre", "noviembre", "diciembre"]
+# Date phrases `_parse_date` doesn't resolve: the LLM dates them instead of "today"
+UNRESOLVED_DATE_RE = re.compile(
+    r"\b(pasad[oa]s?|anoche|antenoche|finde|fin de semana|el otro dia|" + "|".join(MONTHS)
+    + r"|hace\s+\w+\s+(mes|meses|semana|semanas|ano|anos))\b"
+)
+
+# Income, sales, refunds, multiple items or client context: leave it to the LLM
+AMBIGUOUS_RE = re.compile(
+    r"\b(cobr\w*|vend\w*|devol\w*|devuelt\w*|reintegr\w*|reembols\w*|me (pagaron|pago|transfirieron|depositaron)"
+    r"|sueldo|alquiler|freelance|ingres\w*|cliente|y tambien|ademas)\b"
+)
+# "no gaste 2000 en coto", "nunca pague la luz"
+NEGATION_RE = re.compile(r"\b(no|nunca|tampoco|ni)\b")
+# Only messages that say money went out are parsed locally
+EXPENSE_VERBS_RE = re.compile(
+    r"\b(gaste|gastamos|pague|pagamos|compre|compramos|cargue|cargamos|abone|saque|invite|me salio|salio)\b"
+)
+
+
+def parse_number(raw: str) -> float:
+    """Parses Argentinian formatted numbers ("2.000", "2.000,50", "1,5", "20.5")."""
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+(?:,\d+)?", raw):
+        return float(raw.replace(".", "").replace(",", "."))
+    return float(raw.replace(",", "."))
+
+
+class FinanceRuleParser:
+    """
+    Deterministic extractor for simple finance messages
+    ("gasté 2000 en coto con débito", "nafta 20 lucas visa", "tv 12 cuotas de 10000").
+
+    `parse` returns a validated FinanceBatch, or None whenever the message is
+    ambiguous so the caller falls through to the LLM.
+    """
+
+    def parse(self, text: str, today: Optional[date] = None) -> Optional[FinanceBatch]:
+        today = today or datetime.now().date()
+        normalized = normalize(text)
+
+        if AMBIGUOUS_RE.search(normalized) or NEGATION_RE.search(normalized):
+            return None
+        if not self._is_expense(normalized):
+            return None
+
+        amount_info = self._parse_amount(normalized)
+        if amount_info is None:
+            return None
+        amount, currency, installments = amount_info
+
+        merchant, category, subcategory, item = self._parse_category(normalized)
+        if category is None:
+            return None
+
+        tx_date = self._parse_date(normalized, today)
+        if tx_date is None:
+            return None
+
+        payment_method = self._parse_payment_method(normalized, installments is not None)
+        if payment_method is None:
+            return None
+
+        try:
+            entry = FinanceEntry(
+                amount=amount,
+                currency=currency,
+                category=category,
+                subcategory=subcategory,
+                payment_method=payment_method,
+                merchant=merchant,
+                item=item,
+                date=tx_date.strftime("%Y-%m-%d"),
+                is_fixed=category == "Suscripciones",
+                installments=installments,
+            )
+        except ValidationError:
+            return None
+
+        return FinanceBatch(transactions=[entry])
+
+    def _is_expense(self, normalized: str) -> bool:
+        """An expense verb, a payment method or installments ("nafta 20 lucas visa") must be there."""
+        return bool(
+            EXPENSE_VERBS_RE.search(normalized)
+            or INSTALLMENTS_OF_RE.search(normalized)
+            or INSTALLMENTS_IN_RE.search(normalized)
+            or INSTALLMENT_NUMBER_RE.search(normalized)
+            or any(re.search(pattern, normalized) for pattern, _ in PAYMENT_METHODS)
+            or GENERIC_CARD_RE.search(normalized)
+        )
+
+    def _parse_amount(self, normalized: str) -> Optional[Tuple[float, str, Optional[dict]]]:
+        """Returns (amount, currency, installments) or None if missing/ambiguous."""
+        currency = "USD" if re.search(r"\b(usd|u\$s|us\$|dolares?)\b", normalized) else "ARS"
+
+        # "12 cuotas de 10000": the amount is the installment value
+        match = INSTALLMENTS_OF_RE.search(normalized)
+        if match:
+            total = int(match.group("total"))
+            return parse_number(match.group("amount")), currency, {"current": 1, "total": total}
+
+        # Ignore the numbers that belong to installment counters / dates
+        cleaned = INSTALLMENT_NUMBER_RE.sub(" ", normalized)
+        cleaned = EXPLICIT_DATE_RE.sub(" ", cleaned)
+        cleaned = INSTALLMENTS_IN_RE.sub(" ", cleaned)
+        cleaned = DAYS_AGO_RE.sub(" ", cleaned)
+        if M_SUFFIX_RE.search(cleaned):
+            return None
+
+        amounts = []
+        for m in AMOUNT_RE.finditer(cleaned):
+            value = parse_number(m.group("number"))
+            if m.group("multiplier"):
+                value *= MULTIPLIERS[m.group("multiplier")]
+            amounts.append(value)
+
+        # Several amounts: probably several transactions
+        if len(amounts) != 1 or amounts[0] <= 0:
+            return None
+        amount = amounts[0]
+
+        installments = None
+        match = INSTALLMENT_NUMBER_RE.search(normalized)
+        if match:
+            current, total = int(match.group("current")), int(match.group("total"))
+            if not 0 < current <= total:
+                return None
+            installments = {"current": current, "total": total}
+        else:
+            # "compré una tv de 120000 en 12 cuotas": register the installment value
+            match = INSTALLMENTS_IN_RE.search(normalized)
+            if match:
+                total = int(match.group("total"))
+                if total <= 0:
+                    return None
+                amount = round(amount / total, 2)
+                installments = {"current": 1, "total": total}
+
+        return amount, currency, installments
+
+    def _parse_category(self, normalized: str):
+        """Returns (merchant, category, subcategory, item); category None if unknown/ambiguous."""
+        merchants = [alias for alias in MERCHANTS if re.search(rf"\b{alias}\b", normalized)]
+        items = [keyword for keyword in ITEMS if re.search(rf"\b{keyword}\b", normalized)]
+        # Longest keyword wins ("seguro de la moto" over "moto")
+        items.sort(key=len, reverse=True)
+        item = items[0] if items else None
+
+        if len(merchants) > 1:
+            return None, None, None, item
+        if merchants:
+            merchant, category, subcategory = MERCHANTS[merchants[0]]
+            if item and ITEMS[item][0] == category:
+                subcategory = ITEMS[item][1] or subcategory
+            return merchant, category, subcategory, item
+        if item:
+            category, subcategory = ITEMS[item]
+            # Different categories mentioned: ambiguous
+            if any(ITEMS[other][0] != category and other not in item for other in items[1:]):
+                return None, None, None, item
+            return None, category, subcategory, item
+        return None, None, None, None
+
+    def _parse_payment_method(self, normalized: str, installments: bool = False) -> Optional[str]:
+        """Returns the payment method; None if several are mentioned or installments have none."""
+        methods = {method for pattern, method in PAYMENT_METHODS if re.search(pattern, normalized)}
+        if len(methods) > 1:
+            # "con visa y master": let the LLM split or pick
+            return None
+        if methods:
+            return methods.pop()
+        if GENERIC_CARD_RE.search(normalized):
+            return "Crédito: Visa"
+        # Installments are almost never paid in cash
+        return None if installments else "Efectivo"
+
+    def _parse_date(self, normalized: str, today: date) -> Optional[date]:
+        """Resolves relative / explicit dates; None if the date can't be trusted."""
+        # "cuota 3/12" is not a date
+        match = EXPLICIT_DATE_RE.search(INSTALLMENT_NUMBER_RE.sub(" ", normalized))
+        if match:
+            year = int(match.group("year") or today.year)
+            if year < 100:
+                year += 2000
+            try:
+                explicit = date(year, int(match.group("month")), int(match.group("day")))
+            except ValueError:
+                return None
+            # "28/12" sent in January refers to last year
+            if not match.group("year") and explicit > today:
+                explicit = explicit.replace(year=year - 1)
+            return explicit
+
+        if re.search(r"\banteayer\b", normalized):
+            return today - timedelta(days=2)
+        if re.search(r"\bayer\b", normalized):
+            return today - timedelta(days=1)
+
+        match = DAYS_AGO_RE.search(normalized)
+        if match:
+            words = {"un": 1, "una": 1, "dos": 2, "tres": 3}
+            days = words.get(match.group("days")) or int(match.group("days"))
+            return today - timedelta(days=days)
+
+        for index, weekday in enumerate(WEEKDAYS):
+            if re.search(rf"\b(el )?{weekday}( pasado)?\b", normalized):
+                # Most recent past occurrence of that weekday
+                delta = (today.weekday() - index) % 7 or 7
+                return today - timedelta(days=delta)
+
+        if UNRESOLVED_DATE_RE.search(normalized):
+            return None
+        return today
@@ -1,14 +1,13 @@
-from langchain_openai import ChatOpenAI
+from typing import TYPE_CHECKING, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from backend.core.schemas import HealthEntry
+from backend.core.rate_limit import RateGovernor, model_name, shared_governor
+from backend.core.metrics import timed
 
-class HealthAgent:
-    def __init__(self, llm: ChatOpenAI):
-        self.llm = llm
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
-    def process(self, text: str) -> HealthEntry:
-        """Extracts health, workout OR meal details."""
-        system_prompt = """Extract health, workout, or nutrition details.
+HEALTH_SYSTEM_PROMPT = """Extract health, workout, or nutrition details.
         
         IF IT IS A MEAL:
         - Set 'activity_type' to 'meal'.
@@ -18,13 +17,31 @@ class HealthAgent:
         - Set 'activity_type' to 'workout'.
         - In 'details_json', extract exercises, sets, reps, weight.
         """
-        
+
+class HealthAgent:
+    def __init__(self, llm: "ChatOpenAI", governor: Optional[RateGovernor] = None):
+        self.llm = llm
+        self.governor = governor or shared_governor()
+        # Compiled once; only the input (and date) change between calls
+        self.chain = self._build_chain()
+
+    def _build_chain(self):
         prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", HEALTH_SYSTEM_PROMPT),
             ("human", "{input}")
         ])
         
         structured_llm = self.llm.with_structured_output(HealthEntry)
-        chain = prompt | structured_llm
-        
-        return chain.invoke({"input": text})
+        return self.governor.wrap(
+            prompt | structured_llm, model_name(self.llm), base_tokens=len(HEALTH_SYSTEM_PROMPT) // 4
+        )
+
+    @timed("extract.health")
+    def process(self, text: str) -> HealthEntry:
+        """Extracts health, workout OR meal details."""
+        return self.chain.invoke({"input": text})
+
+    @timed("extract.health")
+    async def aprocess(self, text: str) -> HealthEntry:
+        """Async version of `process`, doesn't block the event loop."""
+        return await self.chain.ainvoke({"input": text})
@@ -1,25 +1,42 @@
-from langchain_openai import ChatOpenAI
+from typing import TYPE_CHECKING, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from backend.core.schemas import JournalEntry
+from backend.core.rate_limit import RateGovernor, model_name, shared_governor
+from backend.core.metrics import timed
 
-class JournalAgent:
-    def __init__(self, llm: ChatOpenAI):
-        self.llm = llm
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
-    def process(self, text: str) -> JournalEntry:
-        """Extracts journal and mood details."""
-        system_prompt = """Analyze the text for a journal entry.
+JOURNAL_SYSTEM_PROMPT = """Analyze the text for a journal entry.
         - Estimate a 'mood_score' from 1 (terrible) to 10 (amazing) based on the sentiment.
         - Generate a list of 'sentiment_tags' (3-5 tags).
         - 'reflection_summary' should be the refined content of the user's thought.
         """
-        
+
+class JournalAgent:
+    def __init__(self, llm: "ChatOpenAI", governor: Optional[RateGovernor] = None):
+        self.llm = llm
+        self.governor = governor or shared_governor()
+        # Compiled once; only the input (and date) change between calls
+        self.chain = self._build_chain()
+
+    def _build_chain(self):
         prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", JOURNAL_SYSTEM_PROMPT),
             ("human", "{input}")
         ])
         
         structured_llm = self.llm.with_structured_output(JournalEntry)
-        chain = prompt | structured_llm
-        
-        return chain.invoke({"input": text})
+        return self.governor.wrap(
+            prompt | structured_llm, model_name(self.llm), base_tokens=len(JOURNAL_SYSTEM_PROMPT) // 4
+        )
+
+    @timed("extract.journal")
+    def process(self, text: str) -> JournalEntry:
+        """Extracts journal and mood details."""
+        return self.chain.invoke({"input": text})
+
+    @timed("extract.journal")
+    async def aprocess(self, text: str) -> JournalEntry:
+        """Async version of `process`, doesn't block the event loop."""
+        return await self.chain.ainvoke({"input": text})
@@ -0,0 +1,137 @@
+"""
+Vectorized (pandas/NumPy) finance reports vs. the same reports as plain Python
+loops, on synthetic transactions.
+
+    python -m backend.benchmarks.analytics_reports --rows 100000
+
+Both sides start from the list of dicts a bulk fetch returns. Building the
+DataFrame is timed separately: it's paid once per fetch, while the reports can
+be re-run on it (other windows, other budgets) without touching the rows again.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pandas as pd
+
+from backend.services.analytics import (
+    INCOME_PREFIX,
+    budget_consumption,
+    installment_cash_flow,
+    month_over_month_by_category,
+    rolling_burn_rate,
+    transactions_frame,
+)
+
+CATEGORIES = ["Supermercado", "Salidas/Ocio", "Servicios", "Suscripciones", "Salud", "Otros", "Ingreso: Sueldo"]
+METHODS = ["visa", "mastercard", "debito", "efectivo", "mercadopago"]
+
+
+def synthetic_rows(count: int, start: date, days: int, seed: int = 7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        installments = rng.random() < 0.15
+        total = rng.choice([3, 6, 12]) if installments else None
+        rows.append({
+            "amount": round(rng.uniform(100, 50000), 2),
+            "category": rng.choice(CATEGORIES),
+            "payment_method": rng.choice(METHODS),
+            "date_transaction": (start + timedelta(days=rng.randrange(days))).isoformat(),
+            "installment_current": rng.randint(1, total) if total else None,
+            "installment_total": total,
+        })
+    return rows
+
+
+def vectorized(df, budgets, start, end, current):
+    month_over_month_by_category(df)
+    budget_consumption(df, budgets, current)
+    installment_cash_flow(df, current)
+    rolling_burn_rate(df, start, end)
+
+
+def loops(rows, budgets, start, end, current):
+    """Straightforward pure-Python version of the same four reports."""
+    spend = defaultdict(float)
+    daily = defaultdict(float)
+    flow = defaultdict(float)
+    current_key = (current.year, current.month)
+    for row in rows:
+        day = date.fromisoformat(row["date_transaction"])
+        month = (day.year, day.month)
+        if not row["category"].startswith(INCOME_PREFIX):
+            spend[(month, row["category"])] += row["amount"]
+            daily[day] += row["amount"]
+        total, current_installment = row["installment_total"], row["installment_current"] or 1
+        if total and total > 1:
+            for k in range(1, total - current_installment + 1):
+                index = day.year * 12 + day.month - 1 + k
+                flow[(index // 12, index % 12 + 1)] += row["amount"]
+
+    months = sorted({m for m, _ in spend})
+    categories = sorted({c for _, c in spend})
+    month_over_month = []
+    for previous, month in zip([None] + months, months):
+        for category in categories:
+            total = spend.get((month, category), 0.0)
+            before = spend.get((previous, category), 0.0) if previous else None
+            change = (total - before) / before * 100 if before else None
+            month_over_month.append((month, category, total, before, change))
+
+    budget_report = []
+    for budget in budgets.to_dict("records"):
+        spent = spend.get((current_key, budget["category"]), 0.0)
+        budget_report.append((budget["category"], spent, spent / budget["limit_amount"]))
+
+    burn, window, day = [], [], start
+    while day < end:
+        window.append(daily.get(day, 0.0))
+        window = window[-30:]
+        burn.append(sum(window) / len(window))
+        day += timedelta(days=1)
+
+    index = current.year * 12 + current.month - 1
+    projection = [flow.get(((index + k) // 12, (index + k) % 12 + 1), 0.0) for k in range(1, 13)]
+    return month_over_month, budget_report, burn, projection
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    start = date(2024, 1, 1)
+    end = start + timedelta(days=args.days)
+    current = pd.Period(end - timedelta(days=1), freq="M")
+    rows = synthetic_rows(args.rows, start, args.days)
+    budgets = pd.DataFrame([
+        {"category": c, "limit_amount": 2_000_000, "alert_threshold": 0.9, "period": "monthly"}
+        for c in CATEGORIES if not c.startswith(INCOME_PREFIX)
+    ])
+
+    build = timed(transactions_frame, rows)
+    df = transactions_frame(rows)
+    fast = timed(vectorized, df, budgets, start, end, current)
+    slow = timed(loops, rows, budgets, start, end, current)
+    print(f"{args.rows} transactions over {args.days} days")
+    print(f"pure python (one pass)   {slow * 1000:8.1f} ms")
+    print(f"build DataFrame          {build * 1000:8.1f} ms")
+    print(f"vectorized reports       {fast * 1000:8.1f} ms  ({slow / fast:.1f}x)")
+    print(f"build + reports          {(build + fast) * 1000:8.1f} ms  ({slow / (build + fast):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Per-document I/O cost of the attachment download path: temp file on disk
+(spill threshold 0, the old behaviour) vs. in-memory buffer.
+
+    python -m backend.benchmarks.attachment_io --docs 200 --pages 4
+
+Each iteration "downloads" a synthetic statement through a fake bot (bytes are
+already in memory, so only local I/O is measured), hashes it for the document
+cache, opens it with pdfplumber to count pages and cleans up.
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pdfplumber
+
+from backend.benchmarks.pdf_extraction import make_statement_pdf
+from backend.core.doc_cache import sha256_file
+from backend.core.downloads import download_attachment
+
+
+class FakeBot:
+    """Serves `payload` like `Bot.download_file` (path or BinaryIO destination)."""
+
+    def __init__(self, payload: bytes, chunk_size: int = 65536):
+        self.payload = payload
+        self.chunk_size = chunk_size
+
+    async def download_file(self, file_path, destination=None):
+        if isinstance(destination, (str, pathlib.Path)):
+            with open(destination, "wb") as f:
+                for start in range(0, len(self.payload), self.chunk_size):
+                    f.write(self.payload[start:start + self.chunk_size])
+            return None
+        for start in range(0, len(self.payload), self.chunk_size):
+            destination.write(self.payload[start:start + self.chunk_size])
+        destination.seek(0)
+        return destination
+
+
+async def run(bot: FakeBot, docs: int, spill_bytes: int) -> float:
+    file_info = SimpleNamespace(file_path="documents/statement.pdf", file_size=len(bot.payload))
+    start = time.perf_counter()
+    for _ in range(docs):
+        async with download_attachment(bot, file_info, suffix="_statement.pdf", spill_bytes=spill_bytes) as source:
+            sha256_file(source)
+            if not isinstance(source, str):
+                source.seek(0)
+            with pdfplumber.open(source) as pdf:
+                len(pdf.pages)
+    return (time.perf_counter() - start) / docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.pdf")
+        make_statement_pdf(path, args.pages, args.lines)
+        with open(path, "rb") as f:
+            payload = f.read()
+    print(f"synthetic PDF: {args.pages} pages, {len(payload) / 1024:.0f} KiB, {args.docs} documents")
+
+    bot = FakeBot(payload)
+    disk = asyncio.run(run(bot, args.docs, spill_bytes=0))
+    memory = asyncio.run(run(bot, args.docs, spill_bytes=len(payload)))
+    print(f"temp file   {disk * 1000:7.3f} ms/doc")
+    print(f"in memory   {memory * 1000:7.3f} ms/doc")
+    print(f"saved       {(disk - memory) * 1000:7.3f} ms/doc ({(1 - memory / disk) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Per-call overhead of rebuilding the prompt + structured-output chain on every
+message vs. using the chain compiled once at construction (stub LLM, no latency).
+
+    python -m backend.benchmarks.chain_overhead --calls 500
+"""
+import argparse
+import time
+
+from backend.agents.doc_parser import DocumentProcessor
+from backend.agents.finance_agent import FinanceAgent
+from backend.agents.health_agent import HealthAgent
+from backend.agents.journal_agent import JournalAgent
+from backend.benchmarks.stubs import StubLLM, unlimited_governor
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    llm = StubLLM()
+    governor = unlimited_governor()
+    finance = FinanceAgent(llm, governor=governor)
+    health = HealthAgent(llm, governor=governor)
+    journal = JournalAgent(llm, governor=governor)
+    docs = DocumentProcessor(llm, governor=governor)
+
+    cases = [
+        ("FinanceAgent", finance, finance._inputs("compré una tv en cuotas")),
+        ("HealthAgent", health, {"input": "corrí 5km"}),
+        ("JournalAgent", journal, {"input": "hoy fue un buen día"}),
+    ]
+
+    print(f"{'chain':<20}{'rebuilt us/call':>17}{'prebuilt us/call':>18}{'saved':>8}")
+    for name, agent, inputs in cases:
+        # Bind the loop variables: closures would otherwise see the last case
+        rebuilt = per_call_us(lambda agent=agent, inputs=inputs: agent._build_chain().invoke(inputs), args.calls)
+        prebuilt = per_call_us(lambda agent=agent, inputs=inputs: agent.chain.invoke(inputs), args.calls)
+        print(f"{name:<20}{rebuilt:>17.0f}{prebuilt:>18.0f}{1 - prebuilt / rebuilt:>8.0%}")
+
+    text = "01/10 COTO 12.000,00\n02/10 SHELL 20.000,00"
+    rebuilt = per_call_us(lambda: docs._build_text_chain().invoke({"input": text}), args.calls)
+    prebuilt = per_call_us(lambda: docs.text_chain.invoke({"input": text}), args.calls)
+    print(f"{'DocumentProcessor':<20}{rebuilt:>17.0f}{prebuilt:>18.0f}{1 - prebuilt / rebuilt:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
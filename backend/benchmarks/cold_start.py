@@ -0,0 +1,55 @@
+"""
+Bot cold start: time and peak RSS to `import backend.main` (module-level
+setup: Supabase client, agents, caches, indexes) in a fresh interpreter, plus
+the one-off cost of building the first OpenAI model on demand.
+
+    python -m backend.benchmarks.cold_start --runs 5
+
+Nothing talks to the network; dummy credentials are used when missing.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r'''
+import json, resource, time
+t = time.perf_counter()
+import backend.main as main
+imported = time.perf_counter() - t
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+t = time.perf_counter()
+main.brain.llm
+first_model = time.perf_counter() - t
+print(json.dumps({"import": imported, "rss": rss, "first_model": first_model}))
+'''
+
+
+def run_once(env) -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "x"),
+        TELEGRAM_TOKEN=os.getenv("TELEGRAM_TOKEN", "123:abc"),
+        JOURNAL_INDEX_PATH=os.path.join(tmp, "journal_index"),
+        DOC_CACHE_PATH=os.path.join(tmp, "document_cache.sqlite3"),
+    )
+    results = [run_once(env) for _ in range(args.runs)]
+    for key, unit in (("import", "s"), ("rss", "MB"), ("first_model", "s")):
+        print(f"{key:<12} median {statistics.median(r[key] for r in results):8.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures message throughput of the sync vs async brain pipeline with a fake LLM.
+
+    python -m backend.benchmarks.concurrency --messages 20 --latency 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from backend.agents.brain import LifeOSBrain
+from backend.benchmarks.stubs import StubEmbeddings, StubLLM, unlimited_governor
+
+MESSAGES = [
+    "gasté 2000 en coto con débito",
+    "corrí 5km en 30 minutos",
+    "hoy me sentí 7/10, cansado pero contento",
+    "pagué netflix con visa",
+    "metí 4 series de sentadillas",
+]
+
+
+def run_sync(brain: LifeOSBrain, messages) -> float:
+    start = time.perf_counter()
+    for text in messages:
+        brain.process_input(text)
+    return time.perf_counter() - start
+
+
+async def run_async(brain: LifeOSBrain, messages) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(brain.aprocess_input(text) for text in messages))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency in seconds")
+    args = parser.parse_args()
+
+    messages = [MESSAGES[i % len(MESSAGES)] for i in range(args.messages)]
+    brain = LifeOSBrain(llm=StubLLM(args.latency), embeddings=StubEmbeddings(args.latency),
+                        pre_router=False, cache=False, governor=unlimited_governor())
+
+    sync_elapsed = run_sync(brain, messages)
+    async_elapsed = asyncio.run(run_async(brain, messages))
+
+    print(f"messages: {len(messages)}  fake latency: {args.latency * 1000:.0f} ms/call")
+    print(f"sequential (process_input):  {sync_elapsed:6.2f}s  {len(messages) / sync_elapsed:7.2f} msg/s")
+    print(f"concurrent (aprocess_input): {async_elapsed:6.2f}s  {len(messages) / async_elapsed:7.2f} msg/s")
+    print(f"speedup: x{sync_elapsed / async_elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Document ingestion through the background job queue: how fast the upload is
+acknowledged, how long a batch of statements takes with 1 vs N workers, and
+that jobs interrupted by a "restart" are resumed.
+
+    python -m backend.benchmarks.document_jobs --docs 6 --workers 3 --latency 4
+
+Real JobQueue + DocumentIngestor + DocumentProcessor on synthetic PDFs; the
+bot, the LLM (stub, `latency` seconds per chunk) and Supabase are fakes.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from backend.agents.doc_parser import DocumentProcessor
+from backend.benchmarks.attachment_io import FakeBot
+from backend.benchmarks.pdf_extraction import make_statement_pdf
+from backend.benchmarks.stubs import StubLLM, unlimited_governor
+from backend.core.job_queue import JobQueue
+from backend.services.document_jobs import DocumentIngestor
+
+
+class ProgressBot(FakeBot):
+    """FakeBot that also records the progress edits and sent messages."""
+
+    def __init__(self, payload: bytes):
+        super().__init__(payload)
+        self.edits = []
+        self.sent = []
+
+    async def get_file(self, file_id):
+        return SimpleNamespace(file_path=f"documents/{file_id}.pdf", file_size=len(self.payload))
+
+    async def edit_message_text(self, text, chat_id, message_id):
+        self.edits.append((message_id, text))
+
+    async def send_message(self, chat_id, text):
+        self.sent.append(text)
+
+
+class FakeWriter:
+    async def ainsert_many(self, table, rows):
+        await asyncio.sleep(0.01)
+        return rows
+
+
+def make_queue(bot: ProgressBot, path: str, workers: int, latency: float) -> JobQueue:
+    processor = DocumentProcessor(StubLLM(latency), governor=unlimited_governor())
+    ingestor = DocumentIngestor(bot, processor, FakeWriter())
+    return JobQueue(ingestor.run, path=path, workers=workers, poll_interval=0.05, on_failed=ingestor.fail)
+
+
+async def wait_idle(queue: JobQueue) -> None:
+    while queue.counts().get("queued") or queue.counts().get("running"):
+        await asyncio.sleep(0.02)
+
+
+async def batch(payload: bytes, path: str, docs: int, workers: int, latency: float):
+    bot = ProgressBot(payload)
+    queue = make_queue(bot, path, workers, latency)
+    await queue.start()
+    start = time.perf_counter()
+    acks = []
+    for i in range(docs):
+        t = time.perf_counter()
+        await queue.submit({"chat_id": 1, "message_id": i, "file_id": f"f{i}", "file_name": f"doc{i}.pdf",
+                            "is_image": False})
+        acks.append(time.perf_counter() - t)
+    await wait_idle(queue)
+    elapsed = time.perf_counter() - start
+    await queue.stop()
+    return elapsed, statistics.median(acks), bot
+
+
+async def resume(payload: bytes, path: str, latency: float) -> int:
+    bot = ProgressBot(payload)
+    queue = make_queue(bot, path, 2, latency)
+    await queue.start()
+    for i in range(4):
+        await queue.submit({"chat_id": 1, "message_id": i, "file_id": f"f{i}", "file_name": f"doc{i}.pdf",
+                            "is_image": False})
+    await asyncio.sleep(latency / 2)
+    await queue.stop()  # "crash" with jobs running and queued
+
+    bot = ProgressBot(payload)
+    queue = make_queue(bot, path, 2, latency)
+    await queue.start()
+    await wait_idle(queue)
+    await queue.stop()
+    return queue.counts().get("done", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=4.0, help="Fake LLM latency per chunk (s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "statement.pdf")
+        make_statement_pdf(pdf, args.pages, 40)
+        with open(pdf, "rb") as f:
+            payload = f.read()
+
+        print(f"{args.docs} statements x {args.pages} pages, stub LLM {args.latency * 1000:.0f} ms/chunk")
+        for workers in (1, args.workers):
+            elapsed, ack, bot = asyncio.run(
+                batch(payload, os.path.join(tmp, f"jobs_{workers}.sqlite3"), args.docs, workers, args.latency)
+            )
+            print(f"workers={workers:<3} batch {elapsed:6.2f}s   ack p50 {ack * 1000:6.2f} ms   "
+                  f"progress edits/doc {len(bot.edits) / args.docs:4.1f}")
+        print(f"last edit: {bot.edits[-1][1]!r}")
+
+        done = asyncio.run(resume(payload, os.path.join(tmp, "jobs_resume.sqlite3"), args.latency))
+        print(f"resume after restart: {done}/4 jobs done")
+
+
+if __name__ == "__main__":
+    main()
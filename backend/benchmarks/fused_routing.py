@@ -0,0 +1,72 @@
+"""
+Compares the two-step (route, then extract) pipeline against the fused
+single-call mode and the speculative two-step mode on a fixed set of
+messages, using a fake LLM.
+
+    python -m backend.benchmarks.fused_routing --latency 0.3
+
+Token cost is approximated from prompt characters (~4 chars per token).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from backend.agents.brain import LifeOSBrain
+from backend.benchmarks.stubs import StubEmbeddings, StubLLM, unlimited_governor
+
+MESSAGES = [
+    "gasté 2000 en coto con débito",
+    "cargué 20 lucas de nafta en la shell ayer",
+    "pagué netflix con visa",
+    "compré una tv de 120000 en 12 cuotas",
+    "corrí 5km en 30 minutos",
+    "metí 4 series de banco plano con 80kg",
+    "almorcé una ensalada césar",
+    "hoy me sentí 7/10, cansado pero contento",
+    "me peleé con mi jefe pero cerré el reporte, buen día",
+    "qué hora es?",
+]
+
+
+async def run(latency: float, fused: bool = False, speculative: bool = False):
+    llm = StubLLM(latency)
+    brain = LifeOSBrain(
+        llm=llm, embeddings=StubEmbeddings(latency), fused=fused, speculative=speculative, pre_router=False,
+        governor=unlimited_governor(),
+    )
+
+    latencies = []
+    for text in MESSAGES:
+        start = time.perf_counter()
+        await brain.aprocess_input(text)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "median_ms": statistics.median(latencies) * 1000,
+        "calls_per_msg": llm.calls / len(MESSAGES),
+        "prompt_tokens_per_msg": llm.prompt_chars / 4 / len(MESSAGES),
+        "speculation": brain.speculation_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM latency in seconds")
+    args = parser.parse_args()
+
+    results = {
+        "two-step": asyncio.run(run(args.latency)),
+        "fused": asyncio.run(run(args.latency, fused=True)),
+        "speculative": asyncio.run(run(args.latency, speculative=True)),
+    }
+
+    print(f"messages: {len(MESSAGES)}  fake latency: {args.latency * 1000:.0f} ms/call")
+    print(f"{'mode':<13}{'median ms':>10}{'LLM calls/msg':>16}{'~prompt tokens/msg':>21}")
+    for name, stats in results.items():
+        print(f"{name:<13}{stats['median_ms']:>10.0f}{stats['calls_per_msg']:>16.2f}{stats['prompt_tokens_per_msg']:>21.0f}")
+    print(f"speculation: {results['speculative']['speculation']}")
+
+
+if __name__ == "__main__":
+    main()
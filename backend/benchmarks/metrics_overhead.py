@@ -0,0 +1,54 @@
+"""
+Cost of the instrumentation layer: a trivial sync / async function called
+bare vs. wrapped with `timed` (metrics on). With METRICS=false `timed` returns
+the function itself, so the disabled cost is exactly the bare one.
+
+    python -m backend.benchmarks.metrics_overhead --calls 200000
+"""
+import argparse
+import asyncio
+import time
+
+from backend.core.metrics import metrics, timed
+
+
+def work(x):
+    return x + 1
+
+
+async def awork(x):
+    return x + 1
+
+
+def per_call_ns(func, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+async def aper_call_ns(func, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        await func(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    bare = per_call_ns(work, args.calls)
+    wrapped = per_call_ns(timed("bench.sync")(work), args.calls)
+    abare = asyncio.run(aper_call_ns(awork, args.calls))
+    awrapped = asyncio.run(aper_call_ns(timed("bench.async")(awork), args.calls))
+
+    print(f"{'':<8}{'bare ns':>10}{'timed ns':>10}{'overhead ns':>13}")
+    print(f"{'sync':<8}{bare:>10.0f}{wrapped:>10.0f}{wrapped - bare:>13.0f}")
+    print(f"{'async':<8}{abare:>10.0f}{awrapped:>10.0f}{awrapped - abare:>13.0f}")
+    print(f"recorded: {metrics.report()['bench.sync']['count']} sync samples")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+PDF text extraction throughput on synthetic multi-page statements:
+serial streaming vs. page-parallel (process pool) extraction.
+
+    python -m backend.benchmarks.pdf_extraction --pages 60 --lines 40
+
+Reports pages/sec and peak memory. Every 10th page is left blank to exercise
+the empty-page path. Peak memory is the parent process' traced Python
+allocations plus the max RSS of the process and its pool workers.
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+from backend.agents.doc_parser import DocumentProcessor, shutdown_pdf_pools
+from backend.benchmarks.stubs import StubLLM, unlimited_governor
+
+
+def make_statement_pdf(path: str, pages: int, lines_per_page: int, first_merchant: int = 0) -> None:
+    """
+    Writes a minimal text-only PDF (Helvetica) that looks like a card statement.
+    Merchants are numbered from `first_merchant`, so different values give different documents.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for page in range(pages):
+        lines = [] if page % 10 == 9 else [
+            f"{(i % 28) + 1:02d}/10 COMERCIO {first_merchant + page * lines_per_page + i:05d} CUOTA 01/03 {1000 + i * 37:>10},00"
+            for i in range(lines_per_page)
+        ]
+        stream = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>"
+        )
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {pages} >>"
+
+    with open(path, "wb") as pdf:
+        pdf.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(pdf.tell())
+            pdf.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+        xref = pdf.tell()
+        pdf.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            pdf.write(f"{offset:010d} 00000 n \n".encode())
+        pdf.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def run(processor: DocumentProcessor, path: str, pages: int, workers: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    extracted = sum(1 for _ in processor.iter_pdf_pages(path, workers=workers))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return extracted, pages / elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    processor = DocumentProcessor(StubLLM(), governor=unlimited_governor())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.pdf")
+        make_statement_pdf(path, args.pages, args.lines)
+        print(f"synthetic PDF: {args.pages} pages, {os.path.getsize(path) / 1024:.0f} KiB")
+
+        # The pool is shared: the first parallel run pays for starting the workers
+        runs = (("serial", 1), (f"parallel x{args.workers} (cold)", args.workers),
+                (f"parallel x{args.workers} (warm)", args.workers))
+        for name, workers in runs:
+            extracted, pages_per_sec, peak_mb = run(processor, path, args.pages, workers)
+            print(f"{name:<22} {pages_per_sec:8.1f} pages/s  {extracted} non-empty pages  "
+                  f"peak traced {peak_mb:6.1f} MiB")
+        shutdown_pdf_pools()
+
+    rss_mb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                 resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+    print(f"max RSS (process / largest worker): {rss_mb:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Shows how many messages the local pre-router answers without the LLM and
+how the routing latency distribution changes, using a fake LLM.
+
+    python -m backend.benchmarks.prerouter --latency 0.4
+"""
+import argparse
+import asyncio
+
+from backend.agents.brain import LifeOSBrain
+from backend.benchmarks.stubs import StubEmbeddings, StubLLM, unlimited_governor
+
+MESSAGES = [
+    "$3500 nafta visa",
+    "gasté 2000 en coto con débito",
+    "20 lucas de nafta con tarjeta",
+    "pagué netflix",
+    "compré una tv en 12 cuotas de 10000",
+    "corrí 5km",
+    "metí 4 series de banco plano con 80kg",
+    "almorcé una ensalada césar",
+    "hoy me sentí 7/10",
+    "me peleé con mi jefe pero cerré el reporte",
+    "qué hora es?",
+    "cobré el sueldo, 1.2M por transferencia",
+]
+
+
+async def run(latency: float, pre_router: bool):
+    brain = LifeOSBrain(llm=StubLLM(latency), embeddings=StubEmbeddings(), pre_router=pre_router,
+                        governor=unlimited_governor())
+    for text in MESSAGES:
+        await brain.aprocess_input(text)
+    return brain.routing_report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.4, help="Fake LLM latency in seconds")
+    args = parser.parse_args()
+
+    print(f"messages: {len(MESSAGES)}  fake router latency: {args.latency * 1000:.0f} ms")
+    for name, enabled in (("LLM only", False), ("pre-router", True)):
+        report = asyncio.run(run(args.latency, enabled))
+        print(f"\n{name}: {report['local_fraction']:.0%} routed locally")
+        for path in ("local", "llm"):
+            stats = report[path]
+            if stats["count"]:
+                print(f"  {path:<6} n={stats['count']:<3} p50={stats['p50_ms']:.3f} ms  p95={stats['p95_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
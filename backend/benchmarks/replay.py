@@ -0,0 +1,321 @@
+"""
+Offline load test of the bot: replays a corpus through the real handlers
+(`process_message_handler` and `handle_files` from backend.main, plus the
+write-behind queue and the document job workers) with OpenAI replaced by the
+stub LLM and Supabase by InMemorySupabase.
+
+    python -m backend.benchmarks.replay --messages 300 --concurrency 8 --latency 0.3
+    python -m backend.benchmarks.replay --corpus corpus.jsonl --output run.json
+    python -m backend.benchmarks.replay --baseline run.json --tolerance 0.2
+    python -m backend.benchmarks.replay --export-raw-logs corpus.jsonl --limit 2000
+
+The corpus is JSONL: {"text": "..."} for a chat message, {"pdf_pages": 8} for
+a synthetic statement upload, or {"pdf": "path/to/file.pdf"}. Without
+--corpus a synthetic mix is generated; --export-raw-logs dumps the real
+messages from Supabase `raw_logs` (needs SUPABASE_URL / SUPABASE_KEY).
+
+Reports throughput, latency percentiles (reply to text messages; ack and
+completion of documents), Supabase round trips per item and the per-stage
+metrics. With --baseline it exits with status 1 if throughput, p95 latency
+or round trips got worse by more than --tolerance.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from backend.benchmarks.pdf_extraction import make_statement_pdf
+from backend.benchmarks.stubs import InMemorySupabase, StubEmbeddings, StubLLM, unlimited_governor
+
+CHAT_ID = 1
+TEMPLATES = [
+    "gasté {n} en coto con débito",
+    "pagué {n} de nafta con visa",
+    "compré zapatillas por {n} en 3 cuotas con master",
+    "cobré el sueldo, {n}0 pesos",
+    "corrí {k}km en {m} minutos",
+    "hice 4 series de sentadillas con {k}0kg",
+    "almorcé una ensalada y pollo, unas {n} calorías",
+    "hoy me sentí {s}/10, bastante cansado pero contento",
+    "día raro, me siento ansioso por el trabajo y no dormí bien",
+    "necesito acordarme de llamar al contador",
+]
+FINAL_PREFIXES = ("✅", "⚠️", "❌")
+
+
+def synthetic_corpus(messages: int, doc_every: int, pdf_pages: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(messages):
+        if doc_every and i % doc_every == doc_every - 1:
+            corpus.append({"pdf_pages": pdf_pages})
+            continue
+        template = rng.choice(TEMPLATES)
+        corpus.append({"text": template.format(
+            n=rng.randint(500, 90000), k=rng.randint(3, 15), m=rng.randint(20, 90), s=rng.randint(1, 10)
+        )})
+    return corpus
+
+
+def export_raw_logs(path: str, limit: int) -> None:
+    from backend.core.setup import supabase
+    if not supabase:
+        sys.exit("SUPABASE_URL / SUPABASE_KEY are needed to export raw_logs")
+    rows = supabase.table("raw_logs").select("message_content").order("created_at").limit(limit).execute().data or []
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            if row.get("message_content"):
+                f.write(json.dumps({"text": row["message_content"]}, ensure_ascii=False) + "\n")
+    print(f"exported {len(rows)} messages to {path}")
+
+
+class ReplayBot:
+    """Telegram stand-in: serves uploaded files and records replies / edits (with timestamps)."""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self.finished: Dict[int, float] = {}
+        self.sent = 0
+        self.edits = 0
+        self._ids = itertools.count(1)
+
+    def message(self, **kwargs) -> "ReplayMessage":
+        return ReplayMessage(self, next(self._ids), **kwargs)
+
+    async def get_file(self, file_id):
+        return SimpleNamespace(file_path=file_id, file_size=len(self.files[file_id]))
+
+    async def download_file(self, file_path, destination=None):
+        payload = self.files[file_path]
+        if isinstance(destination, str):
+            with open(destination, "wb") as f:
+                f.write(payload)
+            return None
+        destination.write(payload)
+        destination.seek(0)
+        return destination
+
+    async def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        self.edits += 1
+        if text.startswith(FINAL_PREFIXES):
+            self.finished[message_id] = time.perf_counter()
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+        return self.message(text=text)
+
+
+class ReplayMessage:
+    """The parts of aiogram's Message the handlers use."""
+
+    def __init__(self, bot: ReplayBot, message_id: int, text=None, document=None, photo=None):
+        self.bot = bot
+        self.message_id = message_id
+        self.text = text
+        self.document = document
+        self.photo = photo
+        self.from_user = SimpleNamespace(id=CHAT_ID)
+        self.chat = SimpleNamespace(id=CHAT_ID)
+        self.replies: List[ReplayMessage] = []
+
+    async def answer(self, text, **kwargs):
+        reply = await self.bot.send_message(CHAT_ID, text)
+        self.replies.append(reply)
+        return reply
+
+    async def edit_text(self, text, **kwargs):
+        await self.bot.edit_message_text(text, CHAT_ID, self.message_id)
+
+
+def load_bot(tmp: str, latency: float, doc_latency: float, db_latency: float):
+    """Imports backend.main with local paths and swaps OpenAI / Supabase / Telegram for the fakes."""
+    os.environ.update({
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "replay",
+        "TELEGRAM_TOKEN": "123456:replay",
+        "JOURNAL_INDEX_PATH": os.path.join(tmp, "journal_index"),
+        "DOC_CACHE_PATH": os.path.join(tmp, "document_cache.sqlite3"),
+        "DOCUMENT_JOBS_PATH": os.path.join(tmp, "document_jobs.sqlite3"),
+        "WRITE_SPOOL_PATH": os.path.join(tmp, "write_spool.jsonl"),
+    })
+    import backend.main as main
+
+    db = InMemorySupabase(db_latency)
+    main.supabase = db
+    for component in (main.writer, main.budget_monitor):
+        component.client = db
+    main.document_ingestor.writer = main.writer
+
+    # Models are built on first use: inject the stubs before anything calls them
+    governor = unlimited_governor()
+    main.brain._llm = StubLLM(latency)
+    main.brain._embeddings = StubEmbeddings(latency / 2)
+    main.brain.governor = governor
+    main.doc_processor._llm = StubLLM(doc_latency)
+    main.doc_processor.governor = governor
+
+    bot = ReplayBot()
+    main.document_ingestor.bot = bot
+    return main, db, bot
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+async def replay(corpus: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        main, db, bot = load_bot(tmp, args.latency, args.doc_latency, args.db_latency)
+        from backend.core.metrics import metrics
+
+        await main.write_queue.start()
+        await main.document_jobs.start()
+
+        text_latencies, doc_acks, doc_started = [], [], {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        doc_counter = itertools.count()
+
+        async def send(item: Dict[str, Any]) -> None:
+            async with semaphore:
+                if "text" in item:
+                    message = bot.message(text=item["text"])
+                    start = time.perf_counter()
+                    await main.process_message_handler(message)
+                    text_latencies.append(time.perf_counter() - start)
+                    return
+
+                number = next(doc_counter)
+                if "pdf" in item:
+                    with open(item["pdf"], "rb") as f:
+                        payload = f.read()
+                else:
+                    path = os.path.join(tmp, f"statement_{number}.pdf")
+                    # Distinct merchants per upload, so the document cache doesn't dedupe them
+                    make_statement_pdf(path, item.get("pdf_pages", 8), 40, first_merchant=number * 100000)
+                    with open(path, "rb") as f:
+                        payload = f.read()
+                file_id = f"doc-{number}"
+                bot.files[file_id] = payload
+                document = SimpleNamespace(file_id=file_id, file_name=f"{file_id}.pdf", mime_type="application/pdf")
+                message = bot.message(document=document)
+                start = time.perf_counter()
+                await main.handle_files(message, bot)
+                doc_acks.append(time.perf_counter() - start)
+                doc_started[message.replies[0].message_id] = start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(item) for item in corpus))
+        while main.document_jobs.counts().get("queued") or main.document_jobs.counts().get("running"):
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+        await main.document_jobs.stop()
+        await main.write_queue.stop()
+        main.shutdown_pdf_pools()
+
+        doc_latencies = [bot.finished[mid] - t for mid, t in doc_started.items() if mid in bot.finished]
+        round_trips = sum(db.round_trips.values())
+        return {
+            "items": len(corpus),
+            "texts": len(text_latencies),
+            "documents": len(doc_acks),
+            "seconds": round(elapsed, 3),
+            "throughput": round(len(corpus) / elapsed, 2),
+            "text_latency": percentiles(text_latencies),
+            "document_ack": percentiles(doc_acks),
+            "document_done": percentiles(doc_latencies),
+            "round_trips": round_trips,
+            "round_trips_per_item": round(round_trips / max(1, len(corpus)), 3),
+            "round_trips_by_call": {f"{table}.{op}": n for (table, op), n in sorted(db.round_trips.items())},
+            "rows": {table: len(rows) for table, rows in sorted(db.tables.items())},
+            "stages": metrics.report(),
+        }
+
+
+def print_report(result: Dict[str, Any], args) -> None:
+    print(f"{result['items']} items ({result['texts']} texts, {result['documents']} documents), "
+          f"concurrency {args.concurrency}, LLM {args.latency * 1000:.0f} ms, "
+          f"doc LLM {args.doc_latency * 1000:.0f} ms, DB {args.db_latency * 1000:.0f} ms")
+    print(f"wall {result['seconds']:.2f}s   throughput {result['throughput']:.2f} items/s\n")
+    print(f"{'latency (ms)':<16}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for key in ("text_latency", "document_ack", "document_done"):
+        row = result[key]
+        print(f"{key:<16}" + "".join(f"{str(row[p]):>9}" for p in ("p50_ms", "p95_ms", "p99_ms")))
+
+    print(f"\nSupabase round trips: {result['round_trips']} ({result['round_trips_per_item']}/item)")
+    for call, count in result["round_trips_by_call"].items():
+        print(f"  {call:<36}{count:>6}")
+
+    print(f"\n{'stage':<20}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for stage, row in result["stages"].items():
+        if row["count"]:
+            print(f"{stage:<20}{row['count']:>6}" + "".join(f"{str(row[p]):>9}" for p in ("p50_ms", "p95_ms", "p99_ms")))
+
+
+def regressions(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    found = []
+    if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        found.append(f"throughput {result['throughput']} < baseline {baseline['throughput']}")
+    for key in ("text_latency", "document_done"):
+        now, before = result[key]["p95_ms"], baseline[key]["p95_ms"]
+        if now is not None and before and now > before * (1 + tolerance):
+            found.append(f"{key} p95 {now} ms > baseline {before} ms")
+    if result["round_trips_per_item"] > baseline["round_trips_per_item"] * (1 + tolerance):
+        found.append(f"round trips/item {result['round_trips_per_item']} > baseline {baseline['round_trips_per_item']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="JSONL corpus (default: synthetic)")
+    parser.add_argument("--messages", type=int, default=200, help="Synthetic corpus size")
+    parser.add_argument("--doc-every", type=int, default=25, help="Synthetic: one statement every N items (0 = none)")
+    parser.add_argument("--pdf-pages", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8, help="Items in flight (aiogram handles updates as tasks)")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub LLM latency per call (s)")
+    parser.add_argument("--doc-latency", type=float, default=2.0, help="Stub document LLM latency per call (s)")
+    parser.add_argument("--db-latency", type=float, default=0.03, help="Supabase stand-in latency per round trip (s)")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Compare against a previous --output and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--export-raw-logs", metavar="PATH", help="Export raw_logs messages as a corpus and exit")
+    parser.add_argument("--limit", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.export_raw_logs:
+        export_raw_logs(args.export_raw_logs, args.limit)
+        return
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = [json.loads(line) for line in f if line.strip()]
+    else:
+        corpus = synthetic_corpus(args.messages, args.doc_every, args.pdf_pages)
+
+    result = asyncio.run(replay(corpus, args))
+    print_report(result, args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(result, json.load(f), args.tolerance)
+        if found:
+            print("\nREGRESSIONS:\n" + "\n".join(f"  - {line}" for line in found))
+            sys.exit(1)
+        print(f"\nno regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
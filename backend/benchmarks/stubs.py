@@ -0,0 +1,285 @@
+"""
+Deterministic stand-ins for the OpenAI and Supabase clients, used by the
+benchmark scripts.
+
+They mimic the small surface the code uses (`with_structured_output`,
+`embed_query`, `table(...).insert(...).execute()`, ...) and sleep for a
+configurable latency instead of doing a network round trip.
+"""
+import asyncio
+import hashlib
+import itertools
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from backend.core.rate_limit import ModelLimits, RateGovernor
+from backend.core.schemas import (
+    FinanceBatch, FinanceEntry, FusedDecision, HealthEntry, JournalEntry, RoutingDecision
+)
+
+ROUTING_KEYWORDS = {
+    "FINANCE": ["$", "gast", "pagu", "compr", "cuota", "nafta", "coto", "visa", "netflix", "sueldo"],
+    "HEALTH": ["corr", "km", "gym", "entren", "series", "comí", "almorc", "cené"],
+    "JOURNAL": ["sentí", "siento", "día", "ánimo", "feliz", "triste", "cansado"],
+}
+
+
+def _input_text(value: Any) -> str:
+    """Returns the text of the last message of a prompt value / message list."""
+    if isinstance(value, PromptValue):
+        value = value.to_messages()
+    if isinstance(value, list) and value:
+        content = value[-1].content
+        if isinstance(content, list):
+            return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content
+    return str(value)
+
+
+def _guess_category(text: str) -> str:
+    lowered = text.lower()
+    for category, keywords in ROUTING_KEYWORDS.items():
+        if any(k in lowered for k in keywords):
+            return category
+    return "OTHER"
+
+
+def _default_response(schema: type, text: str) -> Any:
+    if schema is RoutingDecision:
+        return RoutingDecision(category=_guess_category(text), confidence=0.95)
+    if schema is FusedDecision:
+        category = _guess_category(text)
+        result = {"category": category, "confidence": 0.95}
+        if category != "OTHER":
+            data_schema = {"FINANCE": FinanceBatch, "HEALTH": HealthEntry, "JOURNAL": JournalEntry}[category]
+            result["data"] = _default_response(data_schema, text)
+        return FusedDecision(result=result)
+    if schema is FinanceBatch:
+        numbers = re.findall(r"\d+(?:[.,]\d+)?", text)
+        amount = float(numbers[0].replace(",", ".")) if numbers else 1000.0
+        return FinanceBatch(transactions=[FinanceEntry(amount=amount, category="Otros", item=text[:40])])
+    if schema is HealthEntry:
+        return HealthEntry(activity_type="workout", details_json={"raw": text})
+    if schema is JournalEntry:
+        return JournalEntry(mood_score=7, sentiment_tags=["neutral"], reflection_summary=text)
+    raise ValueError(f"StubLLM has no default response for {schema.__name__}")
+
+
+def unlimited_governor() -> RateGovernor:
+    """Governor that never waits, so benchmarks measure the code and not the rate limits."""
+    return RateGovernor(limits={"default": ModelLimits(rpm=1e9, tpm=1e12, concurrency=10 ** 6)})
+
+
+class StubLLM:
+    """Fake chat model returning canned structured outputs after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.0, responses: Optional[Dict[type, Callable[[str], Any]]] = None):
+        self.latency = latency
+        self.responses = responses or {}
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _respond(self, schema: type, value: Any) -> Any:
+        self.calls += 1
+        if isinstance(value, PromptValue):
+            self.prompt_chars += len(value.to_string())
+        else:
+            self.prompt_chars += len(str(value))
+        text = _input_text(value)
+        factory = self.responses.get(schema)
+        return factory(text) if factory else _default_response(schema, text)
+
+    def with_structured_output(self, schema: type, **kwargs) -> RunnableLambda:
+        # Same schema -> JSON schema conversion the real ChatOpenAI does
+        convert_to_openai_tool(schema)
+
+        def invoke(value):
+            time.sleep(self.latency)
+            return self._respond(schema, value)
+
+        async def ainvoke(value):
+            await asyncio.sleep(self.latency)
+            return self._respond(schema, value)
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+
+class StubEmbeddings:
+    """Fake embeddings model with deterministic hash-based vectors."""
+
+    def __init__(self, latency: float = 0.0, dimensions: int = 1536):
+        self.latency = latency
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255.0 for i in range(self.dimensions)]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._vector(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._vector(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+
+class _StubQuery:
+    """Query builder for InMemorySupabase (select / insert / delete / rpc plus the filters in use)."""
+
+    def __init__(self, client: "InMemorySupabase", table: str, op: str = "select", payload: Any = None):
+        self.client = client
+        self.table = table
+        self.op = op
+        self.payload = payload
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.order_by = None
+        self.descending = False
+        self.offset = 0
+        self.limit_n = None
+        self._negate = False
+
+    def select(self, *columns, **kwargs) -> "_StubQuery":
+        self.op = "select"
+        return self
+
+    def insert(self, rows) -> "_StubQuery":
+        self.op = "insert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def delete(self) -> "_StubQuery":
+        self.op = "delete"
+        return self
+
+    @property
+    def not_(self) -> "_StubQuery":
+        self._negate = True
+        return self
+
+    def _filter(self, column: str, test: Callable[[Any], bool]) -> "_StubQuery":
+        negate, self._negate = self._negate, False
+
+        def predicate(row):
+            value = row.get(column)
+            if test is _is_null:
+                matched = value is None
+            else:
+                try:
+                    matched = value is not None and test(value)
+                except TypeError:
+                    matched = False
+            return not matched if negate else matched
+
+        self.filters.append(predicate)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v <= value)
+
+    def in_(self, column, values):
+        return self._filter(column, lambda v: v in set(values))
+
+    def is_(self, column, value):
+        return self._filter(column, _is_null if value in (None, "null") else (lambda v: v == value))
+
+    def order(self, column, desc: bool = False):
+        self.order_by, self.descending = column, desc
+        return self
+
+    def limit(self, n: int):
+        self.limit_n = n
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset, self.limit_n = start, end - start + 1
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.client._execute(self))
+
+
+def _is_null(value) -> bool:
+    return value is None
+
+
+class InMemorySupabase:
+    """
+    In-memory stand-in for the (sync) Supabase client: tables are lists of
+    dicts and inserts get sequential ids. Every `execute()` is one round trip:
+    it sleeps `latency` seconds and is counted in `round_trips[(table, op)]`.
+    RPCs are counted and otherwise ignored.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.round_trips: Counter = Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> _StubQuery:
+        return _StubQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _StubQuery:
+        return _StubQuery(self, name, op="rpc", payload=params)
+
+    def _execute(self, query: _StubQuery):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.round_trips[(query.table, query.op)] += 1
+            if query.op == "rpc":
+                return None
+            table = self.tables[query.table]
+            if query.op == "insert":
+                rows = [{"id": next(self._ids), **row} for row in query.payload]
+                table.extend(rows)
+                return [dict(row) for row in rows]
+
+            rows = [row for row in table if all(test(row) for test in query.filters)]
+            if query.op == "delete":
+                doomed = {id(row) for row in rows}
+                table[:] = [row for row in table if id(row) not in doomed]
+                return rows
+            if query.order_by:
+                rows.sort(key=lambda row: (row.get(query.order_by) is None, row.get(query.order_by)),
+                          reverse=query.descending)
+            end = None if query.limit_n is None else query.offset + query.limit_n
+            return [dict(row) for row in rows[query.offset:end]]
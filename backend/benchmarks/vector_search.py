@@ -0,0 +1,90 @@
+"""
+Journal similarity search on the local vector index (brute force vs. LSH) and
+embedding request batching.
+
+    python -m backend.benchmarks.vector_search --entries 20000 --dim 1536
+
+Vectors are synthetic clusters (entries written about the same few topics), so
+the approximate search has real neighbours to find. Recall@k is measured
+against the brute-force result. The batching part fires concurrent `aembed`
+calls at a fake embeddings model with fixed latency.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backend.benchmarks.stubs import StubEmbeddings
+from backend.core.embeddings import EmbeddingService
+from backend.core.vector_index import VectorIndex
+
+
+def clustered_vectors(count: int, dim: int, topics: int = 200, noise: float = 0.6, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, count)
+    return centers[labels] + noise * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def bench_search(index: VectorIndex, queries: np.ndarray, k: int, approximate: bool):
+    results, started = [], time.perf_counter()
+    for query in queries:
+        results.append({row for row, _, _ in index.search(query, k=k, approximate=approximate)})
+    return results, (time.perf_counter() - started) / len(queries)
+
+
+async def bench_batching(messages: int, latency: float):
+    results = {}
+    for name, batch_delay in (("one request each", None), ("batched", 0.01)):
+        stub = StubEmbeddings(latency=latency)
+        texts = [f"entrada de diario {i}" for i in range(messages)]
+        started = time.perf_counter()
+        if batch_delay is None:
+            await asyncio.gather(*(stub.aembed_query(t) for t in texts))
+        else:
+            service = EmbeddingService(stub, batch_delay=batch_delay)
+            await asyncio.gather(*(service.aembed(t) for t in texts))
+        results[name] = (time.perf_counter() - started, stub.calls)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake embeddings latency in seconds")
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.entries + args.queries, args.dim)
+    corpus, queries = vectors[:args.entries], vectors[args.entries:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal_index")
+        started = time.perf_counter()
+        index = VectorIndex(path, dim=args.dim)
+        for start in range(0, args.entries, 1000):
+            batch = corpus[start:start + 1000]
+            index.add_many(batch, [{"content": f"entry {start + i}"} for i in range(len(batch))])
+        print(f"indexed {args.entries} x {args.dim} in {time.perf_counter() - started:.1f}s "
+              f"({os.path.getsize(path + '.npy') / 2**20:.0f} MiB memory-mapped)")
+
+        reopened = VectorIndex(path)
+        exact, exact_ms = bench_search(reopened, queries, args.k, approximate=False)
+        approx, approx_ms = bench_search(reopened, queries, args.k, approximate=True)
+        recall = np.mean([len(a & e) / args.k for a, e in zip(approx, exact)])
+        print(f"brute force  {exact_ms * 1000:7.2f} ms/query")
+        print(f"LSH          {approx_ms * 1000:7.2f} ms/query  recall@{args.k} {recall:.2f}")
+        del reopened, index
+
+    for name, (elapsed, calls) in asyncio.run(bench_batching(args.messages, args.latency)).items():
+        print(f"{name:<17} {args.messages} embeddings in {elapsed:.2f}s, {calls} model calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import os
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import cached_property
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.core.paths import data_path, ensure_parent
+from backend.core.text import normalize
+
+# Extracted results (amounts, sets, mood scores) are only reused on an exact
+# match: "gasté 2000 en coto" and "gasté 3000 en coto" embed almost the same,
+# and a similar diary entry must not get another day's mood / summary
+SEMANTIC_CATEGORIES = ("OTHER",)
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+class MemoryBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (time.time() + ttl, copy.deepcopy(value))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """Local SQLite file store, LRU eviction on `last_used`. Survives restarts."""
+
+    def __init__(self, path: str = "response_cache.sqlite3", max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.path = path
+
+    @cached_property
+    def _conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(ensure_parent(self.path), check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache(last_used)")
+        conn.commit()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Cache for `LifeOSBrain.process_input` results.
+
+    - Exact tier: key = hash(normalized text + date context), so relative dates
+      ("ayer") never leak across days.
+    - Semantic tier (optional): cosine similarity between the message embedding
+      and the embeddings of cached messages with the same date context. Only
+      OTHER results are indexed, and a hit also needs the same numbers in
+      both messages.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        ttl_seconds: float = 24 * 3600,
+        semantic: bool = False,
+        similarity_threshold: float = 0.97,
+    ):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        # key -> (context, numbers in the text, unit vector); bounded like the backend
+        self._vectors: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(text: str, context: str) -> str:
+        normalized = re.sub(r"\s+", " ", normalize(text)).strip()
+        return hashlib.sha256(f"{context}|{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str, context: str) -> Optional[Dict[str, Any]]:
+        """Exact-match lookup. A miss is only counted by `get_similar` in semantic mode."""
+        value = self.backend.get(self.make_key(text, context))
+        if value is not None:
+            self.stats["exact_hits"] += 1
+        elif not self.semantic:
+            self.stats["misses"] += 1
+        return value
+
+    @staticmethod
+    def numbers(text: str) -> tuple:
+        return tuple(NUMBER_RE.findall(text))
+
+    def get_similar(self, text: str, embedding: List[float], context: str) -> Optional[Dict[str, Any]]:
+        """Semantic lookup: returns the cached result of the most similar message, if close enough."""
+        numbers = self.numbers(text)
+        candidates = [
+            (key, vector) for key, (ctx, nums, vector) in self._vectors.items() if ctx == context and nums == numbers
+        ]
+        if candidates:
+            query = self._unit(embedding)
+            matrix = np.stack([vector for _, vector in candidates])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                key = candidates[best][0]
+                value = self.backend.get(key)
+                if value is not None:
+                    self.stats["semantic_hits"] += 1
+                    return value
+                # Expired / evicted in the backend
+                self._vectors.pop(key, None)
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, text: str, context: str, value: Dict[str, Any], embedding: Optional[List[float]] = None) -> None:
+        key = self.make_key(text, context)
+        self.backend.set(key, value, self.ttl_seconds)
+        if self.semantic and embedding is not None and value.get("category") in SEMANTIC_CATEGORIES:
+            self._vectors[key] = (context, self.numbers(text), self._unit(embedding))
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self.backend.max_entries:
+                self._vectors.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """
+    Builds the response cache from env vars:
+    RESPONSE_CACHE (memory | sqlite | off), RESPONSE_CACHE_PATH, RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL (seconds), RESPONSE_CACHE_SEMANTIC, RESPONSE_CACHE_SIMILARITY.
+    """
+    kind = os.getenv("RESPONSE_CACHE", "memory").lower()
+    if kind in ("off", "false", "0", "none"):
+        return None
+
+    max_entries = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+    if kind == "sqlite":
+        backend = SQLiteBackend(os.getenv("RESPONSE_CACHE_PATH", data_path("response_cache.sqlite3")), max_entries)
+    else:
+        backend = MemoryBackend(max_entries)
+
+    return ResponseCache(
+        backend=backend,
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600))),
+        semantic=os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() in ("1", "true", "yes"),
+        similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.97")),
+    )
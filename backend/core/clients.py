@@ -0,0 +1,63 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+from dotenv import load_dotenv
+
+from backend.core.metrics import usage_callbacks
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+load_dotenv()
+
+# Process-wide registry of OpenAI models. Nothing (not even langchain_openai)
+# is imported until a model is first requested, and every model shares one
+# sync + one async HTTP connection pool. The SDK's own retries are off:
+# backend.core.rate_limit.RateGovernor owns retries and backoff.
+_lock = threading.Lock()
+_models: Dict[Tuple, Any] = {}
+_http_clients: Dict[str, Any] = {}
+
+
+def _http(kind: str):
+    if not _http_clients:
+        from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+        _http_clients["sync"] = DefaultHttpxClient()
+        _http_clients["async"] = DefaultAsyncHttpxClient()
+    return _http_clients[kind]
+
+
+def get_chat_model(model: str = "gpt-4o-mini", temperature: float = 0) -> "ChatOpenAI":
+    """Shared ChatOpenAI for `model`, built on first use."""
+    key = ("chat", model, temperature)
+    with _lock:
+        if key not in _models:
+            from langchain_openai import ChatOpenAI
+            _models[key] = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0,
+                http_client=_http("sync"),
+                http_async_client=_http("async"),
+                # Token usage / cost per stage (backend.core.metrics)
+                callbacks=usage_callbacks(),
+            )
+        return _models[key]
+
+
+def get_embeddings(model: str = "text-embedding-3-small") -> "OpenAIEmbeddings":
+    """Shared OpenAIEmbeddings for `model`, built on first use."""
+    key = ("embeddings", model)
+    with _lock:
+        if key not in _models:
+            from langchain_openai import OpenAIEmbeddings
+            _models[key] = OpenAIEmbeddings(
+                model=model,
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0,
+                http_client=_http("sync"),
+                http_async_client=_http("async"),
+            )
+        return _models[key]
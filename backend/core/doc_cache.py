@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import cached_property
+from typing import BinaryIO, Iterable, List, NamedTuple, Optional, Union
+
+from backend.core.paths import data_path, ensure_parent
+from backend.core.schemas import FinanceEntry
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(source: Union[str, BinaryIO]) -> str:
+    """SHA-256 of a file path or binary buffer, read in chunks (buffers are rewound afterwards)."""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    else:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    """SHA-256 of extracted text, so a re-exported PDF with the same content still matches."""
+    return "text:" + hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+class CachedDocument(NamedTuple):
+    file_name: str
+    entries: List[FinanceEntry]
+    ingested: bool
+    created_at: float
+
+
+class DocumentCache:
+    """
+    Content-addressed store of parsed documents (SQLite).
+
+    Keys are SHA-256 digests of the uploaded bytes and/or the extracted text; the
+    value is the `FinanceEntry` list the LLM returned. `ingested` marks documents
+    whose rows were already inserted, so a repeat upload can be refused instead of
+    duplicated. When the stored payloads exceed `max_bytes`, the least recently
+    used documents are evicted.
+    """
+
+    def __init__(self, path: str = "document_cache.sqlite3", max_bytes: int = 50 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.path = path
+
+    @cached_property
+    def _conn(self) -> sqlite3.Connection:
+        # Opened on first use: building the cache doesn't touch the disk
+        conn = sqlite3.connect(ensure_parent(self.path), check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " digest TEXT PRIMARY KEY, file_name TEXT, entries TEXT NOT NULL,"
+            " size INTEGER NOT NULL, ingested INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_last_used ON documents(last_used)")
+        conn.commit()
+        return conn
+
+    def get(self, digests: Iterable[str]) -> Optional[CachedDocument]:
+        """Returns the first cached document matching any of `digests`."""
+        for digest in digests:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT file_name, entries, ingested, created_at FROM documents WHERE digest = ?",
+                    (digest,),
+                ).fetchone()
+                if row is None:
+                    continue
+                self._conn.execute("UPDATE documents SET last_used = ? WHERE digest = ?", (time.time(), digest))
+                self._conn.commit()
+            entries = [FinanceEntry(**entry) for entry in json.loads(row[1])]
+            return CachedDocument(row[0], entries, bool(row[2]), row[3])
+        return None
+
+    def set(self, digests: Iterable[str], file_name: str, entries: List[FinanceEntry], ingested: bool = False) -> None:
+        payload = json.dumps([entry.model_dump() for entry in entries])
+        now = time.time()
+        with self._lock:
+            for digest in digests:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents"
+                    " (digest, file_name, entries, size, ingested, created_at, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (digest, file_name, payload, len(payload), int(ingested), now, now),
+                )
+            self._evict()
+            self._conn.commit()
+
+    def mark_ingested(self, digests: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE documents SET ingested = 1 WHERE digest = ?", [(digest,) for digest in digests]
+            )
+            self._conn.commit()
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+
+    def _evict(self) -> None:
+        # Drop least recently used documents until the running total fits
+        self._conn.execute(
+            "DELETE FROM documents WHERE digest IN ("
+            " SELECT digest FROM ("
+            "  SELECT digest, SUM(size) OVER (ORDER BY last_used DESC, digest) AS running"
+            "  FROM documents) WHERE running > ?)",
+            (self.max_bytes,),
+        )
+
+
+def doc_cache_from_env() -> Optional[DocumentCache]:
+    """Builds the document cache from DOC_CACHE (true | false), DOC_CACHE_PATH and DOC_CACHE_MAX_MB."""
+    if os.getenv("DOC_CACHE", "true").lower() not in ("1", "true", "yes"):
+        return None
+    return DocumentCache(
+        path=os.getenv("DOC_CACHE_PATH", data_path("document_cache.sqlite3")),
+        max_bytes=int(float(os.getenv("DOC_CACHE_MAX_MB", "50")) * 1024 * 1024),
+    )
@@ -0,0 +1,39 @@
+import io
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Union
+
+# Attachments up to this size are kept in memory; bigger (or unknown size) ones spill to a temp file
+DOWNLOAD_SPILL_BYTES = int(float(os.getenv("DOWNLOAD_SPILL_MB", "10")) * 1024 * 1024)
+
+
+@asynccontextmanager
+async def download_attachment(bot, file_info, suffix: str = "", spill_bytes: int = None) -> AsyncIterator[Union[BinaryIO, str]]:
+    """
+    Downloads a Telegram file and yields either an in-memory buffer (rewound to
+    the start) or, above `spill_bytes`, the path of a temp file that is removed
+    on exit. pdfplumber, the image encoder and the hashers accept both.
+    """
+    spill_bytes = DOWNLOAD_SPILL_BYTES if spill_bytes is None else spill_bytes
+
+    if file_info.file_size is not None and file_info.file_size <= spill_bytes:
+        buffer = io.BytesIO()
+        await bot.download_file(file_info.file_path, destination=buffer)
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+        return
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        local_path = tmp_file.name
+    try:
+        await bot.download_file(file_info.file_path, destination=local_path)
+        yield local_path
+    finally:
+        try:
+            os.remove(local_path)
+        except OSError as e:
+            logging.warning(f"Could not remove temp file {local_path}: {e}")
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from backend.core.metrics import metrics
+from backend.core.rate_limit import RateGovernor, estimate_tokens, model_name
+
+# Requests arriving within EMBEDDING_BATCH_DELAY seconds are sent as one embed_documents call
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_BATCH_DELAY = float(os.getenv("EMBEDDING_BATCH_DELAY", "0.02"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "5000"))
+
+
+class EmbeddingService:
+    """
+    Wraps a LangChain embeddings model with:
+
+    - a vector cache keyed by the SHA-256 of the text (LRU, `cache_size` entries);
+    - batching: `embed_many` / `aembed_many` send every cache miss in one
+      `embed_documents` call, and concurrent `aembed` calls are coalesced into
+      micro-batches (up to `batch_size` texts, waiting at most `batch_delay`);
+    - optionally, a RateGovernor around every model call.
+    """
+
+    def __init__(self, embeddings, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 batch_delay: float = EMBEDDING_BATCH_DELAY, cache_size: int = EMBEDDING_CACHE_SIZE,
+                 governor: Optional[RateGovernor] = None):
+        self.embeddings = embeddings
+        self.governor = governor
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._pending_texts: Dict[str, str] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.stats = {"hits": 0, "misses": 0, "requests": 0}
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embeds `texts`, calling the model once for all cache misses."""
+        keys = [self.key(text) for text in texts]
+        found, missing = self._lookup(texts, keys)
+        if missing:
+            self.stats["requests"] += 1
+            found.update(self._store(missing, self._embed_documents(list(missing.values()))))
+        return [found[key] for key in keys]
+
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.key(text) for text in texts]
+        found, missing = self._lookup(texts, keys)
+        if missing:
+            self.stats["requests"] += 1
+            found.update(self._store(missing, await self._aembed_documents(list(missing.values()))))
+        return [found[key] for key in keys]
+
+    async def aembed(self, text: str) -> List[float]:
+        """Embeds one text; concurrent calls share a single batched request."""
+        key = self.key(text)
+        cached = self._get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+        self.stats["misses"] += 1
+
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            self._pending_texts[key] = text
+            if len(self._pending) >= self.batch_size:
+                self._schedule_flush(0)
+            elif self._flush_handle is None:
+                self._schedule_flush(self.batch_delay)
+        return await asyncio.shield(future)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self) -> None:
+        self._flush_handle = None
+        pending, texts = self._pending, self._pending_texts
+        self._pending, self._pending_texts = {}, {}
+        if not pending:
+            return
+        try:
+            self.stats["requests"] += 1
+            vectors = await self._aembed_documents(list(texts.values()))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        stored = self._store(texts, vectors)
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(stored[key])
+
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # The embeddings API doesn't go through LangChain callbacks: charge the estimated tokens here
+        metrics.add_usage(model_name(self.embeddings), estimate_tokens(texts), stage="embedding")
+        if self.governor is None:
+            return self.embeddings.embed_documents(texts)
+        return self.governor.run(
+            model_name(self.embeddings), lambda: self.embeddings.embed_documents(texts), estimate_tokens(texts)
+        )
+
+    async def _aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        metrics.add_usage(model_name(self.embeddings), estimate_tokens(texts), stage="embedding")
+        if self.governor is None:
+            return await self.embeddings.aembed_documents(texts)
+        return await self.governor.arun(
+            model_name(self.embeddings), lambda: self.embeddings.aembed_documents(texts), estimate_tokens(texts)
+        )
+
+    def _lookup(self, texts: List[str], keys: List[str]) -> Tuple[Dict[str, List[float]], Dict[str, str]]:
+        """Splits texts into cached vectors and (deduplicated) misses, both keyed by hash."""
+        found, missing = {}, {}
+        for text, key in zip(texts, keys):
+            vector = self._get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+        self.stats["hits"] += len(texts) - len(missing)
+        self.stats["misses"] += len(missing)
+        return found, missing
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+        return vector
+
+    def _store(self, texts: Dict[str, str], vectors: List[List[float]]) -> Dict[str, List[float]]:
+        stored = {key: list(vector) for key, vector in zip(texts, vectors)}
+        for key, vector in stored.items():
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return stored
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import cached_property
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from backend.core.paths import ensure_parent
+
+# Documents processed at the same time (each one is download + parse + LLM + insert)
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", "2"))
+
+
+class Job(NamedTuple):
+    id: int
+    payload: Dict[str, Any]
+    attempts: int
+    created_at: float
+
+
+class JobQueue:
+    """
+    Persistent job queue (SQLite) with an asyncio worker pool.
+
+    `submit` stores the payload and returns at once; `workers` tasks claim jobs
+    in submission order and await `handler(job)`. A job that raises is retried
+    with exponential backoff up to `max_attempts` times, then marked failed and
+    passed to `on_failed(job, error)`.
+
+    Jobs claimed but not finished when the process stops stay `running` in the
+    database and are queued again by the next `start`, so nothing is lost on a
+    restart (handlers must tolerate running twice).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], Awaitable[None]],
+        path: str = "jobs.sqlite3",
+        workers: int = DOCUMENT_WORKERS,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+        poll_interval: float = 1.0,
+        on_failed: Optional[Callable[[Job, Exception], Awaitable[None]]] = None,
+        keep_days: float = 7,
+    ):
+        self.handler = handler
+        self.on_failed = on_failed
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.keep_days = keep_days
+        self._lock = threading.Lock()
+        self.path = path
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @cached_property
+    def _conn(self) -> sqlite3.Connection:
+        # Opened on first use: building the queue doesn't touch the disk
+        conn = sqlite3.connect(ensure_parent(self.path), check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'queued', attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT, run_after REAL NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, run_after, id)")
+        conn.commit()
+        return conn
+
+    async def start(self) -> None:
+        """Requeues jobs interrupted by a previous run and starts the workers."""
+        resumed = self._execute(
+            "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'", (time.time(),)
+        )
+        self._execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (time.time() - self.keep_days * 86400,),
+        )
+        if resumed:
+            logging.info(f"📥 Resuming {resumed} interrupted jobs")
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancels the workers; their running jobs are resumed on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: Dict[str, Any]) -> int:
+        """Stores a job and wakes a worker; returns the job id."""
+        now = time.time()
+        job_id = await asyncio.to_thread(
+            self._insert, "INSERT INTO jobs (payload, created_at, updated_at) VALUES (?, ?, ?)",
+            (json.dumps(payload, default=str), now, now),
+        )
+        if self._wakeup:
+            self._wakeup.set()
+        return job_id
+
+    def position(self, job_id: int) -> int:
+        """How many jobs will be started before `job_id` (0 = next / already running)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (job_id,)
+            ).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    async def _worker(self) -> None:
+        while True:
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            try:
+                await self.handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._failed(job, e)
+            else:
+                await asyncio.to_thread(
+                    self._execute, "UPDATE jobs SET status = 'done', updated_at = ? WHERE id = ?",
+                    (time.time(), job.id),
+                )
+
+    async def _failed(self, job: Job, error: Exception) -> None:
+        attempts = job.attempts + 1
+        now = time.time()
+        if attempts < self.max_attempts:
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            logging.warning(f"Job {job.id} failed (attempt {attempts}/{self.max_attempts}), retrying in {delay:.0f}s: {error}")
+            await asyncio.to_thread(
+                self._execute,
+                "UPDATE jobs SET status = 'queued', attempts = ?, error = ?, run_after = ?, updated_at = ? WHERE id = ?",
+                (attempts, str(error), now + delay, now, job.id),
+            )
+            return
+
+        logging.error(f"Job {job.id} failed after {attempts} attempts: {error}")
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET status = 'failed', attempts = ?, error = ?, updated_at = ? WHERE id = ?",
+            (attempts, str(error), now, job.id),
+        )
+        if self.on_failed:
+            try:
+                await self.on_failed(job._replace(attempts=attempts), error)
+            except Exception as e:
+                logging.error(f"on_failed for job {job.id} raised: {e}")
+
+    def _claim(self) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, payload, attempts, created_at FROM jobs"
+                " WHERE status = 'queued' AND run_after <= ? ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (now, row[0]))
+            self._conn.commit()
+        return Job(row[0], json.loads(row[1]), row[2], row[3])
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            changed = self._conn.execute(sql, params).rowcount
+            self._conn.commit()
+            return changed
+
+    def _insert(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            job_id = self._conn.execute(sql, params).lastrowid
+            self._conn.commit()
+            return job_id
@@ -0,0 +1,264 @@
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# METRICS=false turns `timed` into a no-op decorator and skips the usage callback
+METRICS_ENABLED = os.getenv("METRICS", "true").lower() in ("1", "true", "yes")
+# Local Prometheus text endpoint (0 disables it)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# USD per 1M tokens (input, output); matched by model-name prefix ("gpt-4o-mini-2024-07-18")
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+# Stage the current code is running in, so LLM token usage is attributed to it
+_stage: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("metrics_stage", default=None)
+
+
+def model_price(model: str):
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else (0.0, 0.0)
+
+
+class Histogram:
+    """
+    Latency histogram: Prometheus-style cumulative buckets plus the last
+    `reservoir` samples for exact p50 / p95 / p99.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, reservoir: int = 2048):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=reservoir)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    """
+    Per-stage latency histograms, error counts and LLM token usage / cost.
+
+    Stages are plain names ("route", "extract.finance", "pdf_parse", ...). Time
+    a block with `timer(stage)` or a function with the `timed(stage)`
+    decorator; token usage reported by the OpenAI callback is charged to the
+    innermost active stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = defaultdict(Histogram)
+        self.errors: Dict[str, int] = defaultdict(int)
+        # (stage, model) -> {"prompt": n, "completion": n, "cost": usd}
+        self.usage: Dict[tuple, Dict[str, float]] = defaultdict(lambda: {"prompt": 0, "completion": 0, "cost": 0.0})
+
+    def observe(self, stage: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self.histograms[stage].observe(seconds)
+            if error:
+                self.errors[stage] += 1
+
+    def add_usage(self, model: str, prompt_tokens: int, completion_tokens: int = 0,
+                  stage: Optional[str] = None) -> None:
+        if not METRICS_ENABLED:
+            return
+        stage = stage or _stage.get() or "other"
+        input_price, output_price = model_price(model)
+        with self._lock:
+            usage = self.usage[(stage, model)]
+            usage["prompt"] += prompt_tokens
+            usage["completion"] += completion_tokens
+            usage["cost"] += (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        if not METRICS_ENABLED:
+            yield
+            return
+        token = _stage.set(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.observe(stage, time.perf_counter() - start, error=True)
+            raise
+        else:
+            self.observe(stage, time.perf_counter() - start)
+        finally:
+            # Cancelled work (e.g. a speculative miss) isn't recorded at all
+            _stage.reset(token)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """{stage: {count, errors, p50_ms, p95_ms, p99_ms, prompt_tokens, completion_tokens, cost_usd}}."""
+        with self._lock:
+            stages = set(self.histograms) | {stage for stage, _ in self.usage}
+            report = {}
+            for stage in sorted(stages):
+                histogram = self.histograms.get(stage) or Histogram()
+                usage = [u for (s, _), u in self.usage.items() if s == stage]
+                report[stage] = {
+                    "count": histogram.count,
+                    "errors": self.errors.get(stage, 0),
+                    **{f"p{int(q * 100)}_ms": _ms(histogram.percentile(q)) for q in (0.5, 0.95, 0.99)},
+                    "prompt_tokens": sum(u["prompt"] for u in usage),
+                    "completion_tokens": sum(u["completion"] for u in usage),
+                    "cost_usd": round(sum(u["cost"] for u in usage), 6),
+                }
+            return report
+
+    def render_text(self) -> str:
+        """Summary for the /stats command."""
+        report = self.report()
+        if not report:
+            return "📊 Todavía no hay métricas."
+        lines = ["📊 Latencias por etapa (ms):"]
+        for stage, row in report.items():
+            if row["count"]:
+                lines.append(
+                    f"• {stage}: n={row['count']} p50={row['p50_ms']} p95={row['p95_ms']} p99={row['p99_ms']}"
+                    + (f" ❌{row['errors']}" if row["errors"] else "")
+                )
+        tokens = [(stage, row) for stage, row in report.items() if row["prompt_tokens"] or row["completion_tokens"]]
+        if tokens:
+            lines.append("\n🔤 Tokens y costo:")
+            for stage, row in tokens:
+                lines.append(f"• {stage}: {row['prompt_tokens']}+{row['completion_tokens']} tok ${row['cost_usd']:.4f}")
+            lines.append(f"💵 Total: ${sum(row['cost_usd'] for row in report.values()):.4f}")
+        return "\n".join(lines)
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        out: List[str] = ["# TYPE lifeos_stage_seconds histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(Histogram.BUCKETS, histogram.counts):
+                    cumulative += count
+                    out.append(f'lifeos_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                out.append(f'lifeos_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                out.append(f'lifeos_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                out.append(f'lifeos_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            out.append("# TYPE lifeos_stage_errors_total counter")
+            for stage, count in sorted(self.errors.items()):
+                out.append(f'lifeos_stage_errors_total{{stage="{stage}"}} {count}')
+
+            usage = sorted(self.usage.items())
+            out.append("# TYPE lifeos_llm_tokens_total counter")
+            for (stage, model), counts in usage:
+                for kind in ("prompt", "completion"):
+                    out.append(f'lifeos_llm_tokens_total{{stage="{stage}",model="{model}",kind="{kind}"}} {counts[kind]}')
+            out.append("# TYPE lifeos_llm_cost_usd_total counter")
+            for (stage, model), counts in usage:
+                out.append(f'lifeos_llm_cost_usd_total{{stage="{stage}",model="{model}"}} {counts["cost"]}')
+        return "\n".join(out) + "\n"
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+metrics = Metrics()
+
+
+def timed(stage: str):
+    """Decorator timing a sync or async function under `stage` (returns it untouched when METRICS is off)."""
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+        # Same as `metrics.timer`, inlined: a generator-based context manager costs ~4 us per call
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                token = _stage.set(stage)
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception:
+                    metrics.observe(stage, time.perf_counter() - start, error=True)
+                    raise
+                finally:
+                    _stage.reset(token)
+                metrics.observe(stage, time.perf_counter() - start)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _stage.set(stage)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                metrics.observe(stage, time.perf_counter() - start, error=True)
+                raise
+            finally:
+                _stage.reset(token)
+            metrics.observe(stage, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+
+class UsageCallback(BaseCallbackHandler):
+    """LangChain callback that charges each chat completion's token usage to the active stage."""
+
+    # Run in the caller's context (not an executor), so the stage contextvar is visible
+    run_inline = True
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        output = response.llm_output or {}
+        usage = output.get("token_usage") or {}
+        if usage:
+            metrics.add_usage(
+                output.get("model_name") or "unknown",
+                usage.get("prompt_tokens") or 0,
+                usage.get("completion_tokens") or 0,
+            )
+
+
+def usage_callbacks() -> list:
+    """Callbacks to attach to chat models ([] when metrics are disabled)."""
+    return [UsageCallback()] if METRICS_ENABLED else []
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Serves `GET /metrics` (Prometheus text format); returns the aiohttp runner (call `cleanup()` to stop)."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=metrics.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"📈 Metrics at http://{host}:{port}/metrics")
+    return runner
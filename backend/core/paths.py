@@ -0,0 +1,17 @@
+import os
+
+# Local state (write spool, caches, job queue, journal index) lives under this
+# directory. Files are created on first use, never when a module is imported.
+DATA_DIR = os.getenv("DATA_DIR", ".")
+
+
+def data_path(name: str) -> str:
+    return os.path.join(DATA_DIR, name)
+
+
+def ensure_parent(path: str) -> str:
+    """Creates the directory of `path` if it is missing and returns `path`."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    return path
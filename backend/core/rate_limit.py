@@ -0,0 +1,348 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Priorities (lower runs first): chat messages jump ahead of document jobs
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+class ModelLimits(NamedTuple):
+    rpm: float
+    tpm: float
+    concurrency: int
+
+
+# OpenAI tier-1 limits; override with OPENAI_RATE_LIMITS="gpt-4o=5000/800000/16,gpt-4o-mini=..."
+DEFAULT_LIMITS = {
+    "gpt-4o-mini": ModelLimits(rpm=500, tpm=200_000, concurrency=16),
+    "gpt-4o": ModelLimits(rpm=500, tpm=30_000, concurrency=4),
+    "text-embedding-3-small": ModelLimits(rpm=3000, tpm=1_000_000, concurrency=8),
+    "default": ModelLimits(rpm=500, tpm=30_000, concurrency=8),
+}
+# Bucket capacity, in seconds of the per-minute rate (how bursty we let a lane be)
+RATE_BURST_SECONDS = float(os.getenv("RATE_BURST_SECONDS", "1"))
+RATE_MAX_RETRIES = int(os.getenv("RATE_MAX_RETRIES", "6"))
+RATE_BACKOFF_BASE = float(os.getenv("RATE_BACKOFF_BASE", "0.5"))
+RATE_BACKOFF_MAX = float(os.getenv("RATE_BACKOFF_MAX", "30"))
+# On a 429 the lane's rates drop to this fraction (never below RATE_MIN_SCALE),
+# and every success gives back RATE_RECOVERY of the configured rate
+RATE_THROTTLE_FACTOR = 0.7
+RATE_MIN_SCALE = 0.2
+RATE_RECOVERY = 0.02
+
+# Rough size of one image at the resolution image_prep sends (high detail)
+IMAGE_TOKENS = 1100
+
+
+def parse_limits(spec: str) -> Dict[str, ModelLimits]:
+    """"model=rpm/tpm/concurrency,..." -> {model: ModelLimits}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = item.partition("=")
+        rpm, tpm, concurrency = values.split("/")
+        limits[model.strip()] = ModelLimits(float(rpm), float(tpm), int(concurrency))
+    return limits
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough prompt size (~4 chars per token) of a chain input: text, dicts, messages, content parts."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value) // 4 + 1
+    if isinstance(value, dict):
+        if value.get("type") == "image_url":
+            return IMAGE_TOKENS
+        return sum(estimate_tokens(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(v) for v in value)
+    content = getattr(value, "content", None)
+    return estimate_tokens(content) if content is not None else estimate_tokens(str(value))
+
+
+def retry_delay_hint(error: BaseException) -> Optional[float]:
+    """
+    None if `error` shouldn't be retried, else the server's Retry-After (0 if
+    absent). Retried: 408/409/429, 5xx, connection errors and timeouts; not
+    retried: other 4xx and 429 "insufficient_quota" (it won't heal by waiting).
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        if type(error).__name__ not in ("APIConnectionError", "APITimeoutError"):
+            return None
+    elif status not in (408, 409, 429) and status < 500:
+        return None
+    if getattr(error, "code", None) == "insufficient_quota":
+        return None
+
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return 0.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. A request larger than the capacity is let
+    through once the bucket is full and leaves it in debt, so it still only
+    goes as fast as `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: Optional[float] = None) -> float:
+        """Seconds until `amount` can be taken (0 = now)."""
+        with self._lock:
+            self._refill(now or time.monotonic())
+            missing = min(amount, self.capacity) - self.level
+            return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level -= amount
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+
+class _Lane:
+    """Per-model state: request/token buckets, concurrency slots and the priority queue."""
+
+    def __init__(self, limits: ModelLimits):
+        self.limits = limits
+        self.scale = 1.0
+        self.requests = TokenBucket(limits.rpm / 60, max(1.0, limits.rpm / 60 * RATE_BURST_SECONDS))
+        self.tokens = TokenBucket(limits.tpm / 60, max(1.0, limits.tpm / 60 * RATE_BURST_SECONDS))
+        self.active = 0
+        self.paused_until = 0.0
+        # heap of [priority, seq, tokens]; only the head may take a slot
+        self.waiters: List[list] = []
+        self.wakeups: List[asyncio.Future] = []
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def delay(self, tokens: int) -> float:
+        now = time.monotonic()
+        return max(self.paused_until - now, self.requests.delay(1, now), self.tokens.delay(tokens, now))
+
+    def take(self, tokens: int) -> None:
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+    def notify(self) -> None:
+        wakeups, self.wakeups = self.wakeups, []
+        for future in wakeups:
+            if not future.done():
+                future.set_result(None)
+
+    def throttle(self, pause: float) -> None:
+        self.stats["throttled"] += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        self._rescale(max(RATE_MIN_SCALE, self.scale * RATE_THROTTLE_FACTOR))
+
+    def recover(self) -> None:
+        if self.scale < 1.0:
+            self._rescale(min(1.0, self.scale + RATE_RECOVERY))
+
+    def _rescale(self, scale: float) -> None:
+        self.scale = scale
+        self.requests.set_rate(self.limits.rpm / 60 * scale)
+        self.tokens.set_rate(self.limits.tpm / 60 * scale)
+
+
+class RateGovernor:
+    """
+    Shared OpenAI rate limiter. Per model it keeps:
+
+    - token buckets for requests and tokens (RPM / TPM, with estimated prompt +
+      completion tokens per call);
+    - a concurrency cap, handed out by priority (INTERACTIVE before BACKGROUND,
+      FIFO within a priority);
+    - retries with jittered exponential backoff on 429 / 5xx / connection
+      errors, honouring Retry-After. A 429 pauses the whole lane and lowers its
+      rates (AIMD); successes slowly restore them.
+
+    The sync path (`run`) shares the buckets and retries, but not the
+    concurrency cap or the queue: it's only used by the sequential API.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, ModelLimits]] = None, max_retries: int = RATE_MAX_RETRIES,
+                 backoff_base: float = RATE_BACKOFF_BASE, backoff_max: float = RATE_BACKOFF_MAX):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lanes: Dict[str, _Lane] = {}
+        self._seq = itertools.count()
+
+    def lane(self, model: str) -> _Lane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _Lane(self.limits.get(model, self.limits["default"]))
+        return lane
+
+    def wrap(self, runnable, model: str, priority: int = INTERACTIVE, base_tokens: int = 0,
+             completion_tokens: int = 256) -> "GovernedRunnable":
+        """`runnable` with invoke/ainvoke going through this governor."""
+        return GovernedRunnable(self, runnable, model, priority, base_tokens, completion_tokens)
+
+    async def acquire(self, model: str, tokens: int, priority: int = INTERACTIVE) -> None:
+        """Waits for a concurrency slot and rate budget; pair with `release`."""
+        lane = self.lane(model)
+        entry = [priority, next(self._seq), tokens]
+        heapq.heappush(lane.waiters, entry)
+        try:
+            while True:
+                timeout = None
+                if lane.waiters[0] is entry and lane.active < lane.limits.concurrency:
+                    timeout = lane.delay(tokens)
+                    if timeout <= 0:
+                        heapq.heappop(lane.waiters)
+                        lane.take(tokens)
+                        lane.active += 1
+                        lane.notify()
+                        return
+                wakeup = asyncio.get_running_loop().create_future()
+                lane.wakeups.append(wakeup)
+                try:
+                    await asyncio.wait_for(wakeup, timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if entry in lane.waiters:
+                lane.waiters.remove(entry)
+                heapq.heapify(lane.waiters)
+                lane.notify()
+            raise
+
+    def release(self, model: str) -> None:
+        lane = self.lane(model)
+        lane.active -= 1
+        lane.notify()
+
+    async def arun(self, model: str, call, tokens: int, priority: int = INTERACTIVE):
+        """Awaits `call()` (a coroutine factory) under the model's limits, retrying transient errors."""
+        lane = self.lane(model)
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(model, tokens, priority)
+            try:
+                lane.stats["requests"] += 1
+                result = await call()
+            except Exception as e:
+                delay = self._on_error(lane, model, e, attempt)
+            else:
+                lane.recover()
+                return result
+            finally:
+                self.release(model)
+            await asyncio.sleep(delay)
+
+    def run(self, model: str, call, tokens: int):
+        """Sync version of `arun` (`call` is a plain function)."""
+        lane = self.lane(model)
+        for attempt in range(self.max_retries + 1):
+            delay = lane.delay(tokens)
+            while delay > 0:
+                time.sleep(delay)
+                delay = lane.delay(tokens)
+            lane.take(tokens)
+            try:
+                lane.stats["requests"] += 1
+                result = call()
+            except Exception as e:
+                time.sleep(self._on_error(lane, model, e, attempt))
+            else:
+                lane.recover()
+                return result
+
+    def _on_error(self, lane: _Lane, model: str, error: Exception, attempt: int) -> float:
+        """Returns how long to wait before retrying, or re-raises `error` if it's final."""
+        hint = retry_delay_hint(error)
+        if hint is None or attempt >= self.max_retries:
+            lane.stats["failures"] += 1
+            raise error
+        lane.stats["retries"] += 1
+        # Full jitter, but never sooner than the server asked for
+        delay = max(hint, random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+        if getattr(error, "status_code", None) == 429:
+            lane.throttle(delay)
+        logging.warning(f"⏳ {model}: {type(error).__name__}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model counters plus the current rate scale, active calls and queue length."""
+        return {
+            model: {**lane.stats, "scale": round(lane.scale, 2), "active": lane.active, "queued": len(lane.waiters)}
+            for model, lane in self._lanes.items()
+        }
+
+
+class GovernedRunnable:
+    """
+    Runnable wrapper whose `invoke` / `ainvoke` go through a RateGovernor.
+    Each call is charged `base_tokens` (the fixed prompt) + the input's
+    estimated size + `completion_tokens`.
+    """
+
+    def __init__(self, governor: RateGovernor, runnable, model: str, priority: int,
+                 base_tokens: int, completion_tokens: int):
+        self.governor = governor
+        self.runnable = runnable
+        self.model = model
+        self.priority = priority
+        self.base_tokens = base_tokens
+        self.completion_tokens = completion_tokens
+
+    def _tokens(self, inputs: Any) -> int:
+        return self.base_tokens + estimate_tokens(inputs) + self.completion_tokens
+
+    def invoke(self, inputs: Any, config=None, **kwargs):
+        return self.governor.run(
+            self.model, lambda: self.runnable.invoke(inputs, config, **kwargs), self._tokens(inputs)
+        )
+
+    async def ainvoke(self, inputs: Any, config=None, **kwargs):
+        return await self.governor.arun(
+            self.model, lambda: self.runnable.ainvoke(inputs, config, **kwargs), self._tokens(inputs), self.priority
+        )
+
+
+def model_name(model) -> str:
+    """Limits key of a LangChain model (stubs and unknown models share "default")."""
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or "default"
+
+
+_governor: Optional[RateGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def shared_governor() -> RateGovernor:
+    """Process-wide governor: every agent and embedding call shares the same budgets."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = RateGovernor(parse_limits(os.getenv("OPENAI_RATE_LIMITS", "")))
+        return _governor
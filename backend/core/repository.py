@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.core.setup import supabase
+from backend.core.metrics import timed
+
+
+class SupabaseWriter:
+    """
+    Bulk writer for Supabase tables.
+
+    Rows are sent as chunked list inserts (one HTTP round trip per chunk instead
+    of one per row). A failing chunk is retried with exponential backoff; if it
+    still fails, the chunks already inserted by the same call are deleted so a
+    document is never half-ingested, and the error is raised.
+
+    `on_insert(table, inserted_rows)` is called after every successful
+    `insert_many` (e.g. to update rollups).
+    """
+
+    def __init__(
+        self,
+        client=None,
+        chunk_size: int = 500,
+        retries: int = 2,
+        backoff: float = 0.5,
+        on_insert: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+    ):
+        self.client = client if client is not None else supabase
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff = backoff
+        self.on_insert = on_insert
+
+    @timed("supabase.insert")
+    def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Inserts `rows` into `table` and returns the inserted rows (with ids)."""
+        if not rows:
+            return []
+        if not self.client:
+            raise RuntimeError("Supabase client not configured")
+
+        inserted = []
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            try:
+                inserted.extend(self._insert_chunk(table, chunk))
+            except Exception:
+                self._rollback(table, inserted)
+                raise
+
+        if self.on_insert:
+            try:
+                self.on_insert(table, inserted)
+            except Exception as e:
+                logging.error(f"on_insert hook for {table} failed: {e}")
+        return inserted
+
+    async def ainsert_many(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Async version of `insert_many` (the Supabase client is sync, run it in a thread)."""
+        return await asyncio.to_thread(self.insert_many, table, rows)
+
+    def _insert_chunk(self, table: str, chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for attempt in range(self.retries + 1):
+            try:
+                return self.client.table(table).insert(chunk).execute().data or []
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logging.warning(f"Insert into {table} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _rollback(self, table: str, inserted: List[Dict[str, Any]]) -> None:
+        ids = [row["id"] for row in inserted if row.get("id") is not None]
+        if not ids:
+            return
+        try:
+            for start in range(0, len(ids), self.chunk_size):
+                self.client.table(table).delete().in_("id", ids[start:start + self.chunk_size]).execute()
+            logging.warning(f"Rolled back {len(ids)} rows from {table}")
+        except Exception as e:
+            logging.error(f"Rollback of {len(ids)} rows from {table} failed: {e}")
+
+
+def finance_rows_from_message(transactions: List[Dict[str, Any]], default_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Maps FinanceAgent transactions (dicts) to `finance_transactions` rows."""
+    rows = []
+    for tx in transactions:
+        # Use extracted date or default to today
+        tx_date = tx.get("date")
+        if not tx_date or str(tx_date).lower() in ["none", "null"]:
+            tx_date = default_date
+
+        installments = tx.get("installments") or {}
+
+        rows.append({
+            "amount": tx.get("amount"),
+            "currency": tx.get("currency", "ARS"),
+            "category": tx.get("category"),
+            "subcategory": tx.get("subcategory"),
+            "merchant": tx.get("merchant"),
+            "date_transaction": tx_date,
+            "payment_method": tx.get("payment_method"),
+            "is_fixed": tx.get("is_fixed", False),
+            "is_client_expense": tx.get("is_client_expense", False),
+            "installment_current": installments.get("current"),
+            "installment_total": installments.get("total"),
+            "original_desc": tx.get("item"),
+            "source": "telegram_manual",
+        })
+    return rows
+
+
+def finance_rows_from_document(transactions, file_name: str) -> List[Dict[str, Any]]:
+    """Maps DocumentProcessor FinanceEntry objects to `finance_transactions` rows."""
+    rows = []
+    for t in transactions:
+        installments = t.installments or {}
+        rows.append({
+            "date_transaction": t.date,
+            "amount": t.amount,
+            "currency": t.currency,
+            "category": t.category,
+            "merchant": t.merchant,
+            "payment_method": t.payment_method,
+            "installment_current": installments.get("current"),
+            "installment_total": installments.get("total"),
+            "is_fixed": False,
+            "source": f"doc_parser_{file_name}",
+        })
+    return rows
@@ -1,4 +1,4 @@
-from typing import List, Optional, Literal, Dict
+from typing import List, Optional, Literal, Dict, Union
 from pydantic import BaseModel, Field
 
 # --- Enums ---
@@ -66,3 +66,35 @@ class RoutingDecision(BaseModel):
     confidence: float = Field(
         description="Confidence score between 0.0 and 1.0."
     )
+
+# --- Fused Routing + Extraction Models ---
+
+class FinanceRoute(BaseModel):
+    """Input routed to FINANCE, with the extracted transactions."""
+    category: Literal["FINANCE"]
+    confidence: float = Field(description="Confidence score between 0.0 and 1.0.")
+    data: FinanceBatch
+
+class HealthRoute(BaseModel):
+    """Input routed to HEALTH, with the extracted activity."""
+    category: Literal["HEALTH"]
+    confidence: float = Field(description="Confidence score between 0.0 and 1.0.")
+    data: HealthEntry
+
+class JournalRoute(BaseModel):
+    """Input routed to JOURNAL, with the extracted entry."""
+    category: Literal["JOURNAL"]
+    confidence: float = Field(description="Confidence score between 0.0 and 1.0.")
+    data: JournalEntry
+
+class OtherRoute(BaseModel):
+    """Input that doesn't fit any category."""
+    category: Literal["OTHER"]
+    confidence: float = Field(description="Confidence score between 0.0 and 1.0.")
+
+class FusedDecision(BaseModel):
+    """Routing decision and extracted data returned by a single LLM call."""
+    result: Union[FinanceRoute, HealthRoute, JournalRoute, OtherRoute] = Field(
+        discriminator="category",
+        description="The category that best fits the input text, with its extracted data."
+    )
@@ -1,7 +1,6 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 # Load environment variables
 load_dotenv()
@@ -26,16 +25,4 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     print("Warning: OPENAI_API_KEY not found in environment variables.")
 
-# Initialize LLM
-# Using gpt-4o-mini as requested in rules
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0,
-    api_key=OPENAI_API_KEY
-)
-
-# Initialize Embeddings
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-small",
-    api_key=OPENAI_API_KEY
-)
+# LLM / embedding clients are built lazily and shared: see backend/core/clients.py
@@ -0,0 +1,7 @@
+import unicodedata
+
+
+def normalize(text: str) -> str:
+    """Lowercases and strips accents ("Gasté" -> "gaste")."""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in normalized if not unicodedata.combining(ch))
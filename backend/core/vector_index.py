@@ -0,0 +1,136 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.core.paths import ensure_parent
+
+# Set bits per byte, for NumPy < 2.0 (no np.bitwise_count)
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each element of a uint64 array."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return _BYTE_POPCOUNT[values.view(np.uint8)].reshape(*values.shape, 8).sum(axis=-1, dtype=np.uint64)
+
+
+class VectorIndex:
+    """
+    Local NumPy vector index for cosine similarity search.
+
+    Vectors are stored L2-normalized in `<path>.npy`, memory-mapped (`r+`) so
+    the OS pages them in on demand; per-row metadata goes to `<path>.jsonl`.
+    The files are created on the first `add` and grow by doubling their
+    capacity. With `path=None` everything stays in memory.
+
+    Search is brute force (one matrix-vector product) or approximate: rows are
+    bucketed by a random-hyperplane LSH signature (`lsh_bits` bits), candidates
+    are the rows with the closest signatures (Hamming distance) and only those
+    are re-ranked with exact cosine.
+    """
+
+    def __init__(self, path: Optional[str] = None, dim: int = 1536, capacity: int = 1024,
+                 lsh_bits: int = 64, seed: int = 42):
+        self.path = path
+        self.dim = dim
+        self.capacity = capacity
+        self.count = 0
+        self.metadata: List[Dict[str, Any]] = []
+
+        if path and os.path.exists(f"{path}.npy"):
+            self._vectors = np.load(f"{path}.npy", mmap_mode="r+")
+            self.dim = self._vectors.shape[1]
+            if os.path.exists(f"{path}.jsonl"):
+                with open(f"{path}.jsonl", encoding="utf-8") as f:
+                    self.metadata = [json.loads(line) for line in f if line.strip()]
+            # Metadata is written after the vector: a torn write leaves the row unused
+            self.count = min(len(self.metadata), len(self._vectors))
+            self.metadata = self.metadata[:self.count]
+        elif path:
+            # Nothing on disk until the first row is added
+            self._vectors = np.zeros((0, dim), dtype=np.float32)
+        else:
+            self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+
+        # Fixed seed: the same hyperplanes on every run, so signatures are recomputable
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((self.dim, lsh_bits)).astype(np.float32)
+        self._weights = np.left_shift(np.uint64(1), np.arange(lsh_bits, dtype=np.uint64))
+        self._signatures = self._signature(self._vectors[:self.count])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, vector: Sequence[float], metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Appends a vector (with metadata) and returns its row id."""
+        return self.add_many([vector], [metadata or {}])[0]
+
+    def add_many(self, vectors: Sequence[Sequence[float]], metadata: Sequence[Dict[str, Any]]) -> List[int]:
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        needed = self.count + len(matrix)
+        if needed > len(self._vectors):
+            self._grow(max(needed, 2 * len(self._vectors), self.capacity))
+
+        rows = list(range(self.count, needed))
+        self._vectors[self.count:needed] = matrix
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+        if self.path:
+            with open(f"{self.path}.jsonl", "a", encoding="utf-8") as f:
+                for meta in metadata:
+                    f.write(json.dumps(meta, default=str) + "\n")
+
+        self.metadata.extend(metadata)
+        self._signatures = np.concatenate([self._signatures, self._signature(matrix)])
+        self.count = needed
+        return rows
+
+    def search(self, query: Sequence[float], k: int = 5, approximate: bool = False,
+               candidates: int = 512) -> List[Tuple[int, float, Dict[str, Any]]]:
+        """Top-k rows by cosine similarity: [(row, score, metadata)], best first."""
+        if not self.count:
+            return []
+        q = self._normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+
+        if approximate and self.count > candidates:
+            distances = popcount(self._signatures ^ self._signature(q[None, :])[0])
+            rows = np.sort(np.argpartition(distances, candidates)[:candidates])
+            scores = self._vectors[rows] @ q
+        else:
+            # Contiguous slice: no copy of the (memory-mapped) matrix
+            rows = np.arange(self.count)
+            scores = self._vectors[:self.count] @ q
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i]), self.metadata[rows[i]]) for i in top]
+
+    def _grow(self, capacity: int) -> None:
+        if not self.path:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self.count] = self._vectors[:self.count]
+            self._vectors = grown
+            return
+
+        # Build the bigger file next to the old one and swap it in atomically
+        tmp = f"{ensure_parent(self.path)}.grow"
+        grown = np.lib.format.open_memmap(f"{tmp}.npy", mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        grown[:self.count] = self._vectors[:self.count]
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(f"{tmp}.npy", f"{self.path}.npy")
+        self._vectors = np.load(f"{self.path}.npy", mmap_mode="r+")
+
+    def _signature(self, matrix: np.ndarray) -> np.ndarray:
+        bits = (np.asarray(matrix) @ self._planes) > 0
+        return bits.astype(np.uint64) @ self._weights
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.paths import ensure_parent
+from backend.core.repository import SupabaseWriter
+
+
+class WriteBehindQueue:
+    """
+    Asyncio write-behind queue for Supabase inserts.
+
+    - Rows are buffered per table and flushed as one bulk insert when a table
+      reaches `batch_size` rows or every `flush_interval` seconds.
+    - Every row is first appended to a local spool file (JSONL); flushed rows are
+      acknowledged in the same file. On startup unacknowledged rows are replayed,
+      so a crash never loses a write the user was already told about.
+    - Backpressure: when `max_pending` rows are waiting (Supabase slow or down),
+      `enqueue` blocks until flushes catch up.
+    - A batch that keeps failing after `max_attempts` flushes is moved to a
+      `<spool>.dead` file instead of blocking the queue forever.
+    """
+
+    def __init__(
+        self,
+        writer: SupabaseWriter,
+        spool_path: str = "write_spool.jsonl",
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        max_pending: int = 1000,
+        max_attempts: int = 10,
+        fsync: bool = False,
+    ):
+        self.writer = writer
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.fsync = fsync
+
+        self._buffers: Dict[str, List[Tuple[int, Dict[str, Any]]]] = defaultdict(list)
+        self._attempts: Dict[str, int] = defaultdict(int)
+        self._pending = 0
+        self._seq = 0
+        self._spool = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def start(self) -> None:
+        """Replays the spool file and starts the background flusher."""
+        self._replay_spool()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the flusher after a last flush (rows that still fail stay in the spool)."""
+        if self._task:
+            # Not cancelled: a batch being inserted in a worker thread would be
+            # written anyway but not acknowledged, and the final flush would
+            # insert it a second time. The flusher finishes it and exits.
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._spool:
+            self._spool.close()
+            self._spool = None
+
+    async def enqueue(self, table: str, row: Dict[str, Any]) -> None:
+        """Queues a row for insertion, waiting if too many rows are pending."""
+        async with self._space:
+            await self._space.wait_for(lambda: self._pending < self.max_pending)
+            self._seq += 1
+            self._append_spool({"seq": self._seq, "table": table, "row": row})
+            self._buffers[table].append((self._seq, row))
+            self._pending += 1
+
+        if len(self._buffers[table]) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Flushes every table buffer once."""
+        async with self._flush_lock:
+            for table in list(self._buffers):
+                while self._buffers[table]:
+                    batch = self._buffers[table][:self.writer.chunk_size]
+                    if not await self._flush_batch(table, batch):
+                        break
+
+            # Everything written: start a fresh spool instead of growing it forever
+            if self._pending == 0 and self._spool:
+                self._spool.truncate(0)
+                self._spool.seek(0)
+
+    async def _flush_batch(self, table: str, batch: List[Tuple[int, Dict[str, Any]]]) -> bool:
+        seqs = [seq for seq, _ in batch]
+        try:
+            await self.writer.ainsert_many(table, [row for _, row in batch])
+        except Exception as e:
+            self._attempts[table] += 1
+            logging.error(f"Write-behind flush of {len(batch)} rows into {table} failed "
+                          f"(attempt {self._attempts[table]}): {e}")
+            if self._attempts[table] < self.max_attempts:
+                return False
+            self._dead_letter(table, batch)
+
+        self._attempts[table] = 0
+        self._append_spool({"ack": seqs})
+        del self._buffers[table][:len(batch)]
+        async with self._space:
+            self._pending -= len(batch)
+            self._space.notify_all()
+        return True
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                # `stop` does the last flush
+                return
+            await self.flush()
+
+            # Back off while Supabase keeps failing (`stop` interrupts the wait)
+            failures = max(self._attempts.values(), default=0)
+            if failures:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=min(30.0, self.flush_interval * (2 ** failures))
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    def _append_spool(self, record: Dict[str, Any]) -> None:
+        if self._spool is None:
+            self._spool = open(ensure_parent(self.spool_path), "a+", encoding="utf-8")
+        self._spool.write(json.dumps(record, default=str) + "\n")
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    def _replay_spool(self) -> None:
+        """Loads unacknowledged rows left by a previous run and compacts the spool."""
+        if not os.path.exists(self.spool_path):
+            return
+
+        records, acked = {}, set()
+        with open(self.spool_path, encoding="utf-8") as spool:
+            for line in spool:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-write
+                    continue
+                if "ack" in record:
+                    acked.update(record["ack"])
+                else:
+                    records[record["seq"]] = record
+
+        pending = [records[seq] for seq in sorted(records) if seq not in acked]
+        os.remove(self.spool_path)
+        for record in pending:
+            self._seq += 1
+            self._append_spool({"seq": self._seq, "table": record["table"], "row": record["row"]})
+            self._buffers[record["table"]].append((self._seq, record["row"]))
+            self._pending += 1
+
+        if pending:
+            logging.info(f"Replaying {len(pending)} spooled writes")
+
+    def _dead_letter(self, table: str, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        logging.error(f"Giving up on {len(batch)} rows for {table}, moved to {self.spool_path}.dead")
+        with open(f"{self.spool_path}.dead", "a", encoding="utf-8") as dead:
+            for _, row in batch:
+                dead.write(json.dumps({"table": table, "row": row}, default=str) + "\n")
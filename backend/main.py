@@ -1,20 +1,30 @@
 import asyncio
+import json
 import logging
 import os
 import sys
-import tempfile
 from datetime import datetime
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, F, types
-from aiogram.filters import CommandStart
+from aiogram.filters import Command, CommandStart
 from aiogram.types import Message, ContentType
 
 # Add project root to path so we can import from backend.core
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.agents.brain import LifeOSBrain
-from backend.agents.doc_parser import DocumentProcessor
+from backend.agents.doc_parser import DocumentProcessor, shutdown_pdf_pools
 from backend.core.setup import supabase
+from backend.core.repository import SupabaseWriter, finance_rows_from_message
+from backend.core.write_queue import WriteBehindQueue
+from backend.core.doc_cache import doc_cache_from_env
+from backend.core.job_queue import JobQueue
+from backend.core.metrics import METRICS_ENABLED, METRICS_PORT, metrics, start_metrics_server
+from backend.services.installments import InstallmentSchedule
+from backend.services.budgets import BudgetMonitor
+from backend.services.document_jobs import DocumentIngestor
+from backend.core.vector_index import VectorIndex
+from backend.core.paths import data_path
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
@@ -48,6 +58,31 @@ async def send_daily_checkin():
 # Initialize Agents
 brain = LifeOSBrain()
 doc_processor = DocumentProcessor()
+# Future installment payments by month, seeded in main()
+installments = InstallmentSchedule()
+
+def on_insert(table, rows):
+    """Every committed insert (documents and write-behind batches) updates the installment schedule."""
+    installments.apply(table, rows)
+
+writer = SupabaseWriter(supabase, on_insert=on_insert)
+# Running spend per budgeted category, seeded in main(); alerts when a threshold is crossed
+budget_monitor = BudgetMonitor(supabase)
+# Local (memory-mapped) index of journal embeddings for /similar
+journal_index = VectorIndex(os.getenv("JOURNAL_INDEX_PATH", data_path("journal_index")))
+# Above this many entries /similar uses the approximate (LSH) search
+JOURNAL_INDEX_EXACT_MAX = int(os.getenv("JOURNAL_INDEX_EXACT_MAX", "20000"))
+# Message inserts are written behind the reply, spooled to disk until committed
+write_queue = WriteBehindQueue(writer, spool_path=os.getenv("WRITE_SPOOL_PATH", data_path("write_spool.jsonl")))
+# Parsed documents keyed by content hash: repeat uploads skip the LLM and aren't inserted twice
+doc_cache = doc_cache_from_env()
+# Uploaded documents are processed in the background by a pool of workers (persistent queue)
+document_ingestor = DocumentIngestor(bot, doc_processor, writer if supabase else None, doc_cache, budget_monitor)
+document_jobs = JobQueue(
+    document_ingestor.run,
+    path=os.getenv("DOCUMENT_JOBS_PATH", data_path("document_jobs.sqlite3")),
+    on_failed=document_ingestor.fail,
+)
 
 @dp.message(CommandStart())
 async def command_start_handler(message: Message) -> None:
@@ -56,97 +91,109 @@ async def command_start_handler(message: Message) -> None:
     """
     await message.answer(f"Hola Mariano! Soy tu Life OS Bot. Envíame tus gastos, entrenamientos, pensamientos o documentos (PDF/Imágenes).")
 
+@dp.message(Command("cuotas"))
+async def installments_handler(message: Message) -> None:
+    """
+    `/cuotas [meses]`: installments owed over the next months (default 12).
+    """
+    args = (message.text or "").split()
+    months = int(args[1]) if len(args) > 1 and args[1].isdigit() else 12
+
+    schedule = [(month, amount) for month, amount in installments.schedule(months) if amount]
+    if not schedule:
+        await message.answer(f"✅ No tenés cuotas pendientes en los próximos {months} meses.")
+        return
+
+    lines = "\n".join(f"• {month}: ${amount:,.2f}" for month, amount in schedule)
+    await message.answer(
+        f"📅 Cuotas pendientes (próximos {months} meses):\n{lines}\n\n"
+        f"💰 Total: ${installments.owed(months):,.2f}"
+    )
+
+@dp.message(Command("similar"))
+async def similar_handler(message: Message) -> None:
+    """
+    `/similar <texto>`: past journal entries closest to the text, from the local vector index.
+    """
+    query = (message.text or "").partition(" ")[2].strip()
+    if not query:
+        await message.answer("Uso: /similar <texto>\nEj: /similar me sentí ansioso por el trabajo")
+        return
+    if not len(journal_index):
+        await message.answer("📓 Todavía no hay entradas de diario indexadas.")
+        return
+
+    vector = await brain.agenerate_embedding(query)
+    matches = journal_index.search(vector, k=5, approximate=len(journal_index) > JOURNAL_INDEX_EXACT_MAX)
+    lines = "\n".join(
+        f"• {str(meta.get('created_at', ''))[:10]} ({score:.2f}) {(meta.get('content') or '')[:120]}"
+        for _, score, meta in matches
+    )
+    await message.answer(f"🔎 Entradas parecidas:\n{lines}")
+
+@dp.message(Command("stats"))
+async def stats_handler(message: Message) -> None:
+    """
+    `/stats`: latency percentiles, token usage and cost per pipeline stage since startup.
+    """
+    if not METRICS_ENABLED:
+        await message.answer("📊 Las métricas están desactivadas (METRICS=false).")
+        return
+
+    jobs = document_jobs.counts()
+    await message.answer(
+        f"{metrics.render_text()}\n\n"
+        f"📥 Documentos: {jobs.get('queued', 0)} en cola, {jobs.get('running', 0)} en proceso, "
+        f"{jobs.get('failed', 0)} fallidos"
+    )
+
 @dp.message(F.document | F.photo)
 async def handle_files(message: Message, bot: Bot):
     """
-    Handles Document (PDF) and Photo ingestion for Finance parsing.
+    Handles Document (PDF) and Photo ingestion for Finance parsing: the file is
+    queued and acknowledged right away; a background worker (DocumentIngestor)
+    downloads, parses and saves it, editing the status message with progress.
     """
-    await message.answer("📄 Recibí un archivo. Analizando...")
-
-    try:
-        # 1. Determine file type and get file_id
-        file_id = None
-        is_image = False
-        file_name = "unknown"
-
-        if message.document:
-            file_id = message.document.file_id
-            file_name = message.document.file_name
-            if message.document.mime_type == 'application/pdf':
-                is_image = False
-            elif message.document.mime_type.startswith('image/'):
-                is_image = True
-            else:
-                await message.answer("⚠️ Formato no soportado. Solo acepto PDF o Imágenes.")
-                return
-        elif message.photo:
-            # Photos come in array of sizes, take the largest
-            file_id = message.photo[-1].file_id
-            file_name = "photo.jpg"
+    # 1. Determine file type and get file_id
+    file_id = None
+    is_image = False
+    file_name = "unknown"
+
+    if message.document:
+        file_id = message.document.file_id
+        file_name = message.document.file_name
+        if message.document.mime_type == 'application/pdf':
+            is_image = False
+        elif message.document.mime_type.startswith('image/'):
             is_image = True
+        else:
+            await message.answer("⚠️ Formato no soportado. Solo acepto PDF o Imágenes.")
+            return
+    elif message.photo:
+        # Photos come in array of sizes, take the largest
+        file_id = message.photo[-1].file_id
+        file_name = "photo.jpg"
+        is_image = True
 
-        # 2. Download File
-        file_info = await bot.get_file(file_id)
-        
-        # Create a temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file_name}") as tmp_file:
-            await bot.download_file(file_info.file_path, destination=tmp_file.name)
-            local_path = tmp_file.name
-
-        try:
-            # 3. Process File
-            transactions = []
-            
-            if is_image:
-                # Pass image path directly to Vision model
-                transactions = doc_processor.analyze_finance_document(local_path, is_image=True)
-            else:
-                # Extract text from PDF first
-                try:
-                    text_content = doc_processor.extract_text_from_pdf(local_path)
-                    transactions = doc_processor.analyze_finance_document(text_content, is_image=False)
-                except ValueError as ve:
-                    await message.answer(f"⚠️ Error leyendo PDF: {ve}")
-                    return
-
-            # 4. Insert into Supabase
-            if not transactions:
-                await message.answer("⚠️ No encontré transacciones válidas en el documento.")
-                return
-
-            total_amount = 0
-            count = 0
-
-            for t in transactions:
-                if supabase:
-                    supabase.table("finance_transactions").insert({
-                        "date_transaction": t.date,
-                        "amount": t.amount,
-                        "currency": t.currency,
-                        "category": t.category,
-                        "merchant": t.merchant,
-                        "is_fixed": False,
-                        "source": f"doc_parser_{file_name}"
-                    }).execute()
-                    total_amount += t.amount
-                    count += 1
-            
-            # 5. Summary Response
-            await message.answer(
-                f"✅ Procesamiento completado.\n"
-                f"📄 Transacciones extraídas: {count}\n"
-                f"💰 Total detectado: ${total_amount:,.2f}\n\n"
-                f"Guardado en Base de Datos."
-            )
-
-        finally:
-            # Cleanup temp file
-            if os.path.exists(local_path):
-                os.remove(local_path)
+    status = await message.answer("📄 Recibí un archivo. Analizando...")
 
+    # 2. Queue it (persisted: survives a restart)
+    try:
+        job_id = await document_jobs.submit({
+            "chat_id": message.chat.id,
+            "message_id": status.message_id,
+            "file_id": file_id,
+            "file_name": file_name,
+            "is_image": is_image,
+        })
     except Exception as e:
-        logging.error(f"Error processing file: {e}")
+        logging.error(f"Error queueing file: {e}")
         await message.answer(f"❌ Error procesando el archivo:\n{str(e)}")
+        return
+
+    ahead = document_jobs.position(job_id)
+    if ahead:
+        await status.edit_text(f"⏳ {file_name}: en cola, {ahead} documento(s) antes.")
 
 @dp.message()
 async def process_message_handler(message: Message) -> None:
@@ -159,22 +206,13 @@ async def process_message_handler(message: Message) -> None:
     if not text:
         return
 
-    # 0. Log raw message
-    try:
-        if supabase:
-            supabase.table("raw_logs").insert({
-                "user_id": user_id,
-                "message_content": text,
-                "media_type": "text"
-            }).execute()
-    except Exception as e:
-        logging.error(f"Failed to insert raw log: {e}")
-
     await message.answer("🧠 Procesando...")
 
+    category = None
+    budget_alerts = []
     try:
         # 1. Process Input
-        result = brain.process_input(text)
+        result = await brain.aprocess_input(text)
         category = result["category"]
         data = result["data"]
         confidence = result["confidence"]
@@ -196,78 +234,145 @@ async def process_message_handler(message: Message) -> None:
                  await message.answer("⚠️ Entendí que es finanzas, pero no pude extraer los detalles.")
                  return
 
-            count = 0
-            total_amount = 0
-            
-            for tx in transactions_data:
-                # Use extracted date or default to today
-                tx_date = tx.get("date")
-                if not tx_date or str(tx_date).lower() in ["none", "null"]:
-                    tx_date = datetime.now().strftime("%Y-%m-%d")
-
-                installments = tx.get("installments") or {}
-
-                supabase.table("finance_transactions").insert({
-                    "amount": tx.get("amount"),
-                    "currency": tx.get("currency", "ARS"),
-                    "category": tx.get("category"),
-                    "subcategory": tx.get("subcategory"),
-                    "merchant": tx.get("merchant"),
-                    "date_transaction": tx_date,
-                    "payment_method": tx.get("payment_method"),
-                    "is_fixed": tx.get("is_fixed", False),
-                    "is_client_expense": tx.get("is_client_expense", False),
-                    "installment_current": installments.get("current"),
-                    "installment_total": installments.get("total"),
-                    "original_desc": tx.get("item"),
-                    "source": "telegram_manual",
-                }).execute()
-                
-                count += 1
-                total_amount += float(tx.get("amount", 0))
+            rows = finance_rows_from_message(transactions_data, default_date=datetime.now().strftime("%Y-%m-%d"))
+            for row in rows:
+                await write_queue.enqueue("finance_transactions", row)
+
+            count = len(rows)
+            total_amount = sum(float(row["amount"] or 0) for row in rows)
             
             response_msg = f"✅ Se guardaron {count} gastos.\n💰 Total: ${total_amount:,.2f}"
+            budget_alerts = budget_monitor.record_rows(rows)
 
         elif category == "HEALTH":
-            supabase.table("activities").insert({
+            await write_queue.enqueue("activities", {
                 "type": data.get("activity_type"),
                 "details": data.get("details_json")
-            }).execute()
+            })
             
             response_msg = f"✅ Actividad guardada:\n🏃 {data.get('activity_type')}\n📋 {data.get('details_json')}"
 
         elif category == "JOURNAL":
             # Embedding is already generated by Brain
-            supabase.table("journal_entries").insert({
+            await write_queue.enqueue("journal_entries", {
                 "content": data.get("reflection_summary"),
                 "mood_score": data.get("mood_score"),
                 "sentiment_tags": data.get("sentiment_tags"),
                 "embedding": data.get("embedding")
-            }).execute()
+            })
             
+            if data.get("embedding"):
+                journal_index.add(data["embedding"], {
+                    "content": data.get("reflection_summary"),
+                    "mood_score": data.get("mood_score"),
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                })
+
             response_msg = f"✅ Journal guardado:\n📝 {data.get('reflection_summary')}\nmood: {data.get('mood_score')}/10"
 
         else:
             response_msg = f"❓ Categoría reconocida ({category}) pero no implementada en DB."
 
-        # 3. Confirm to User
+        # 3. Confirm to User (the write-behind queue commits to Supabase in the background)
         await message.answer(response_msg)
+        for alert in budget_alerts:
+            await message.answer(alert)
 
     except Exception as e:
         logging.error(f"Error processing message: {e}")
         await message.answer(f"❌ Ocurrió un error procesando tu mensaje:\n{str(e)}")
 
+    finally:
+        # 4. Log raw message with its routed category (None if routing failed)
+        try:
+            if supabase:
+                await write_queue.enqueue("raw_logs", {
+                    "user_id": user_id,
+                    "message_content": text,
+                    "media_type": "text",
+                    "category": category
+                })
+        except Exception as e:
+            logging.error(f"Failed to insert raw log: {e}")
+
+def seed_journal_index(limit: int = 5000) -> None:
+    """Fills an empty local journal index with the embeddings already stored in Supabase."""
+    with metrics.timer("supabase.select"):
+        rows = supabase.table("journal_entries") \
+            .select("content, mood_score, created_at, embedding") \
+            .not_.is_("embedding", "null") \
+            .order("created_at") \
+            .limit(limit) \
+            .execute().data or []
+    # pgvector columns come back as "[0.1,0.2,...]" strings
+    vectors = [json.loads(r["embedding"]) if isinstance(r["embedding"], str) else r["embedding"] for r in rows]
+    if vectors:
+        journal_index.add_many(vectors, [
+            {"content": r["content"], "mood_score": r["mood_score"], "created_at": r["created_at"]} for r in rows
+        ])
+    logging.info(f"📓 Journal index seeded with {len(vectors)} entries")
+
 async def main() -> None:
     if not TELEGRAM_TOKEN:
         print("Error: TELEGRAM_TOKEN not found in environment variables.")
         return
 
+    # Seed the local category model with past routed messages
+    if supabase:
+        try:
+            with metrics.timer("supabase.select"):
+                history = supabase.table("raw_logs") \
+                    .select("message_content, category") \
+                    .not_.is_("category", "null") \
+                    .limit(5000) \
+                    .execute()
+            brain.classifier.fit((row["message_content"], row["category"]) for row in history.data)
+            logging.info(f"🧠 Category model seeded with {len(history.data)} past messages")
+        except Exception as e:
+            logging.warning(f"Could not seed category model from raw_logs: {e}")
+
+        try:
+            installments.seed(supabase)
+        except Exception as e:
+            logging.warning(f"Could not seed installment schedule: {e}")
+
+        if not len(journal_index):
+            try:
+                seed_journal_index()
+            except Exception as e:
+                logging.warning(f"Could not seed journal index: {e}")
+
+        try:
+            budget_monitor.seed()
+        except Exception as e:
+            logging.warning(f"Could not seed budget monitor: {e}")
+
     # Start polling
     scheduler.add_job(send_daily_checkin, 'cron', hour=21, minute=0)
     scheduler.start()
     logging.info("🤖 Scheduler started (Daily Check-in at 21:00)")
-    
-    await dp.start_polling(bot)
+
+    # Replays writes left in the spool by a previous run
+    await write_queue.start()
+    # Resumes document jobs interrupted by a previous run
+    await document_jobs.start()
+
+    # Local Prometheus endpoint (METRICS_PORT=0 disables it)
+    metrics_server = None
+    if METRICS_ENABLED and METRICS_PORT:
+        try:
+            metrics_server = await start_metrics_server()
+        except OSError as e:
+            logging.warning(f"Could not start metrics endpoint: {e}")
+
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await document_jobs.stop()
+        await write_queue.stop()
+        shutdown_pdf_pools()
+        if metrics_server:
+            await metrics_server.cleanup()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
@@ -1,12 +1,196 @@
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
 from backend.core.setup import supabase
 
+# Columns bulk-fetched once for the vectorized reports
+REPORT_COLUMNS = ["amount", "category", "payment_method", "date_transaction", "installment_current", "installment_total"]
+# Income categories ("Ingreso: Sueldo", ...) are not spend
+INCOME_PREFIX = "Ingreso"
+# Budget periods expressed as a fraction / multiple of a month
+BUDGET_PERIOD_MONTHS = {"monthly": 1.0, "weekly": 7 / 30.4375, "yearly": 12.0}
+
+def month_bounds(day: date) -> Tuple[date, date]:
+    """First day of `day`'s month and first day of the next month."""
+    start = day.replace(day=1)
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, next_month
+
+def transactions_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Typed DataFrame of finance rows; drops rows without a date and adds `month`
+    (Period) and `is_income`. Categories are stored as a categorical, so string
+    work runs once per distinct category instead of once per row.
+    """
+    df = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
+    df["date_transaction"] = pd.to_datetime(df["date_transaction"], format="ISO8601", errors="coerce")
+    df = df.dropna(subset=["date_transaction"])
+    df["category"] = df["category"].fillna("Otros").astype("category")
+    df["installment_current"] = pd.to_numeric(df["installment_current"], errors="coerce")
+    df["installment_total"] = pd.to_numeric(df["installment_total"], errors="coerce")
+    df["month"] = df["date_transaction"].dt.to_period("M")
+    income = [c for c in df["category"].cat.categories if c.startswith(INCOME_PREFIX)]
+    df["is_income"] = df["category"].isin(income)
+    return df
+
+def expenses(df: pd.DataFrame) -> pd.DataFrame:
+    return df[~df["is_income"]]
+
+def month_over_month_by_category(df: pd.DataFrame) -> pd.DataFrame:
+    """Spend per month and category with the previous month's spend and the % change."""
+    spend = expenses(df).groupby(["month", "category"], observed=True)["amount"].sum().unstack(fill_value=0.0)
+    if spend.empty:
+        return pd.DataFrame(columns=["month", "category", "total", "previous", "change_pct"])
+    # Months without any spend still count as a (zero) previous month
+    spend = spend.reindex(pd.period_range(spend.index.min(), spend.index.max(), freq="M"), fill_value=0.0)
+    previous = spend.shift(1)
+    change = (spend - previous) / previous.where(previous != 0)
+
+    report = pd.DataFrame({
+        "total": spend.stack(),
+        "previous": previous.stack(),
+        "change_pct": (change * 100).round(1).stack(),
+    })
+    report.index.names = ["month", "category"]
+    return report.reset_index()
+
+def budget_consumption(df: pd.DataFrame, budgets: pd.DataFrame, month: pd.Period) -> pd.DataFrame:
+    """
+    Current spend vs. budget per category for `month`. Weekly/yearly limits are
+    scaled to a month. status: ok | alert (>= alert_threshold) | over (>= 100%).
+    """
+    spent = expenses(df)
+    spent = spent[spent["month"] == month].groupby("category", observed=True)["amount"].sum().rename("spent")
+
+    budgets = budgets.copy()
+    factor = budgets["period"].fillna("monthly").map(BUDGET_PERIOD_MONTHS).fillna(1.0)
+    budgets["monthly_limit"] = pd.to_numeric(budgets["limit_amount"], errors="coerce") / factor
+    budgets["alert_threshold"] = pd.to_numeric(budgets["alert_threshold"], errors="coerce").fillna(0.9)
+
+    spent.index = spent.index.astype(str)
+    report = budgets.merge(spent, left_on="category", right_index=True, how="left")
+    report["spent"] = report["spent"].fillna(0.0)
+    report["used_pct"] = (report["spent"] / report["monthly_limit"] * 100).round(1)
+    report["remaining"] = report["monthly_limit"] - report["spent"]
+    used = report["spent"] / report["monthly_limit"]
+    report["status"] = np.select([used >= 1, used >= report["alert_threshold"]], ["over", "alert"], default="ok")
+    return report[["category", "monthly_limit", "spent", "remaining", "used_pct", "status"]] \
+        .sort_values("used_pct", ascending=False, ignore_index=True)
+
+def installment_cash_flow(df: pd.DataFrame, after: pd.Period, months: int = 12) -> pd.Series:
+    """
+    Projected installment payments for the `months` months following `after`.
+    A purchase registered as cuota c/t pays its amount again in each of the
+    next t - c months.
+    """
+    plans = df[df["installment_total"] > 1]
+    remaining = (plans["installment_total"] - plans["installment_current"].fillna(1)).clip(lower=0).astype(int)
+    plans, counts = plans[remaining > 0], remaining[remaining > 0].to_numpy()
+
+    # One row per future payment: repeat each plan `counts` times, offset 1..count months
+    first_row = np.cumsum(counts) - counts
+    offsets = np.arange(counts.sum()) - np.repeat(first_row, counts) + 1
+    ordinals = plans["month"].array.asi8.repeat(counts) + offsets
+    payments = pd.Series(plans["amount"].to_numpy().repeat(counts), index=ordinals)
+
+    horizon = np.arange(after.ordinal + 1, after.ordinal + 1 + months)
+    flow = payments.groupby(level=0).sum().reindex(horizon, fill_value=0.0)
+    flow.index = pd.PeriodIndex.from_ordinals(flow.index, freq="M")
+    flow.index.name = "month"
+    return flow.rename("installments")
+
+def rolling_burn_rate(df: pd.DataFrame, start: date, end: date, window: int = 30) -> pd.DataFrame:
+    """Daily spend in [start, end) and its rolling `window`-day average (the burn rate)."""
+    spend = expenses(df)
+    days = pd.date_range(start, end - timedelta(days=1), freq="D")
+    daily = spend.groupby(spend["date_transaction"].dt.normalize())["amount"].sum().reindex(days, fill_value=0.0)
+    return pd.DataFrame({
+        "spent": daily,
+        "burn_rate": daily.rolling(window, min_periods=1).mean().round(2),
+    }).rename_axis("day")
+
 class FinancialAnalytics:
-    def __init__(self):
-        pass
+    """
+    Finance reports. Aggregation happens in Postgres (RPCs from migration_v5.sql,
+    reading the daily rollups since migration_v6.sql), so payload size and latency
+    don't grow with the number of transactions.
+    """
+
+    def __init__(self, client=None):
+        self.client = client if client is not None else supabase
 
-    def calculate_burn_rate(self) -> Dict[str, Any]:
+    def _rpc(self, name: str, start: date, end: date) -> List[Dict[str, Any]]:
+        params = {"p_start": start.isoformat(), "p_end": end.isoformat()}
+        return self.client.rpc(name, params).execute().data or []
+
+    def total(self, start: date, end: date) -> Dict[str, Any]:
+        """Total spent and number of transactions in [start, end)."""
+        rows = self._rpc("finance_total", start, end)
+        row = rows[0] if rows else {}
+        return {"total": float(row.get("total") or 0), "tx_count": int(row.get("tx_count") or 0)}
+
+    def totals_by_month(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """[{month, total, tx_count}] ordered by month."""
+        return self._rpc("finance_totals_by_month", start, end)
+
+    def totals_by_category(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """[{category, total, tx_count}] ordered by total, descending."""
+        return self._rpc("finance_totals_by_category", start, end)
+
+    def totals_by_payment_method(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """[{payment_method, total, tx_count}] ordered by total, descending."""
+        return self._rpc("finance_totals_by_payment_method", start, end)
+
+    def installment_summary(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """[{installment_total, plans, monthly_amount, remaining_amount}] for plans registered in [start, end)."""
+        return self._rpc("finance_installment_summary", start, end)
+
+    def fetch_transactions(self, start: date, end: date, page_size: int = 1000) -> pd.DataFrame:
+        """All transactions in [start, end) as one DataFrame (paged, PostgREST caps rows per request)."""
+        rows, offset = [], 0
+        while True:
+            page = self.client.table("finance_transactions") \
+                .select(", ".join(REPORT_COLUMNS)) \
+                .gte("date_transaction", start.isoformat()) \
+                .lt("date_transaction", end.isoformat()) \
+                .order("id") \
+                .range(offset, offset + page_size - 1) \
+                .execute().data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            offset += page_size
+        return transactions_frame(rows)
+
+    def fetch_budgets(self) -> pd.DataFrame:
+        rows = self.client.table("budgets").select("category, limit_amount, alert_threshold, period").execute().data
+        return pd.DataFrame(rows or [], columns=["category", "limit_amount", "alert_threshold", "period"])
+
+    def build_report(self, now: Optional[datetime] = None, months: int = 12) -> Dict[str, Any]:
+        """
+        Multi-period report over the last `months` months, computed from a single
+        bulk fetch: month-over-month spend by category, budget consumption for
+        the current month, projected installment cash flow and rolling burn rate.
+        Installment plans registered before the window are not projected.
+        """
+        today = (now or datetime.now()).date()
+        month_start, next_month = month_bounds(today)
+        start = (pd.Period(month_start, freq="M") - (months - 1)).start_time.date()
+
+        df = self.fetch_transactions(start, next_month)
+        current = pd.Period(today, freq="M")
+        return {
+            "month_over_month": month_over_month_by_category(df),
+            "budgets": budget_consumption(df, self.fetch_budgets(), current),
+            "installments": installment_cash_flow(df, current),
+            "burn_rate": rolling_burn_rate(df, start, today + timedelta(days=1)),
+        }
+
+    def calculate_burn_rate(self, now: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Calculates the current month's burn rate and projected end-of-month spend.
         Returns:
@@ -17,26 +201,15 @@ class FinancialAnalytics:
                 "days_remaining": int
             }
         """
-        now = datetime.now()
-        start_of_month = now.replace(day=1).strftime("%Y-%m-%d")
-        # Get next month's first day
-        next_month = (now.replace(day=28) + timedelta(days=4)).replace(day=1)
-        end_of_month = (next_month - timedelta(days=1)).day
-        
+        now = now or datetime.now()
+        start_of_month, next_month = month_bounds(now.date())
+        days_in_month = (next_month - timedelta(days=1)).day
+
         current_day = now.day
-        days_in_month = end_of_month
         days_remaining = days_in_month - current_day
 
-        # Fetch all transactions for current month
-        # Note: In a real production app, we would sum in SQL for efficiency.
-        response = supabase.table("finance_transactions") \
-            .select("amount") \
-            .gte("date_transaction", start_of_month) \
-            .lt("date_transaction", next_month.strftime("%Y-%m-%d")) \
-            .execute()
-
-        transactions = response.data
-        total_spent = sum(t["amount"] for t in transactions) if transactions else 0.0
+        # Summed in SQL: a single row comes back regardless of volume
+        total_spent = self.total(start_of_month, next_month)["total"]
 
         if current_day > 0:
             burn_rate_daily = total_spent / current_day
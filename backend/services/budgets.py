@@ -0,0 +1,120 @@
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from backend.core.setup import supabase
+
+PERIOD_LABELS = {"weekly": "esta semana", "monthly": "este mes", "yearly": "este año"}
+
+
+class Budget(NamedTuple):
+    category: str
+    limit_amount: float
+    alert_threshold: float
+    period: str
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "weekly":
+        return day - timedelta(days=day.weekday())
+    if period == "yearly":
+        return day.replace(month=1, day=1)
+    return day.replace(day=1)
+
+
+class BudgetMonitor:
+    """
+    Running spend per budgeted category for the current period (week / month /
+    year, per budget), kept in memory.
+
+    `seed` loads the budgets and the current periods' spend once (from the daily
+    rollups); after that `record` is O(1) per transaction and returns the alerts
+    for the thresholds it crossed: `alert_threshold` (e.g. 90%) and 100%.
+    Transactions dated in a past period don't affect the current one.
+    """
+
+    def __init__(self, client=None):
+        self.client = client if client is not None else supabase
+        self.budgets: Dict[str, List[Budget]] = {}
+        # (category, period) -> (period start, spent)
+        self._spent: Dict[Tuple[str, str], Tuple[date, float]] = {}
+
+    def seed(self, today: Optional[date] = None) -> None:
+        today = today or date.today()
+        rows = self.client.table("budgets").select("category, limit_amount, alert_threshold, period").execute().data or []
+        self.set_budgets(rows)
+        if not self.budgets:
+            return
+
+        periods = {budget.period for budgets in self.budgets.values() for budget in budgets}
+        since = min(period_start(today, period) for period in periods)
+        spend = self.client.table("finance_daily_rollup") \
+            .select("day, category, total") \
+            .gte("day", since.isoformat()) \
+            .in_("category", list(self.budgets)) \
+            .execute().data or []
+
+        self._spent.clear()
+        for row in spend:
+            self.record(row["category"], float(row["total"] or 0), date.fromisoformat(row["day"]), today=today)
+        logging.info(f"💰 Budget monitor seeded: {sum(len(b) for b in self.budgets.values())} budgets")
+
+    def set_budgets(self, rows: List[Dict[str, Any]]) -> None:
+        self.budgets = {}
+        for row in rows:
+            if row.get("limit_amount") is None:
+                continue
+            budget = Budget(
+                category=row["category"],
+                limit_amount=float(row["limit_amount"]),
+                alert_threshold=float(row.get("alert_threshold") or 0.9),
+                period=row.get("period") if row.get("period") in PERIOD_LABELS else "monthly",
+            )
+            self.budgets.setdefault(budget.category, []).append(budget)
+
+    def record(self, category: Optional[str], amount: float, day: Optional[date] = None,
+               today: Optional[date] = None) -> List[str]:
+        """Adds one transaction to the running totals and returns the alert messages it triggers."""
+        budgets = self.budgets.get(category)
+        if not budgets or not amount:
+            return []
+        today = today or date.today()
+        day = day or today
+
+        alerts = []
+        for budget in budgets:
+            current = period_start(today, budget.period)
+            if period_start(day, budget.period) != current:
+                continue
+
+            start, before = self._spent.get((category, budget.period), (current, 0.0))
+            if start != current:
+                # A new period started since the last transaction
+                before = 0.0
+            after = before + amount
+            self._spent[(category, budget.period)] = (current, after)
+
+            limit = budget.limit_amount
+            label = PERIOD_LABELS[budget.period]
+            if before < limit <= after:
+                alerts.append(f"🚨 Presupuesto de {category} excedido: ${after:,.2f} de ${limit:,.2f} {label}.")
+            elif before < budget.alert_threshold * limit <= after < limit:
+                alerts.append(
+                    f"⚠️ Presupuesto de {category} al {after / limit:.0%}: ${after:,.2f} de ${limit:,.2f} {label}."
+                )
+        return alerts
+
+    def record_rows(self, rows: List[Dict[str, Any]], today: Optional[date] = None) -> List[str]:
+        """`record` for `finance_transactions` rows."""
+        alerts = []
+        for row in rows:
+            try:
+                day = date.fromisoformat(str(row["date_transaction"])[:10]) if row.get("date_transaction") else None
+            except ValueError:
+                day = None
+            alerts.extend(self.record(row.get("category"), float(row.get("amount") or 0), day, today=today))
+        return alerts
+
+    def spent(self, category: str, period: str = "monthly", today: Optional[date] = None) -> float:
+        start, total = self._spent.get((category, period), (None, 0.0))
+        return total if start == period_start(today or date.today(), period) else 0.0
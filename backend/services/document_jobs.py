@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from backend.agents.doc_parser import ChunkExtractionError, DocumentProcessor
+from backend.core.doc_cache import DocumentCache, sha256_file, sha256_text
+from backend.core.downloads import download_attachment
+from backend.core.job_queue import Job
+from backend.core.metrics import timed
+from backend.core.repository import SupabaseWriter, finance_rows_from_document
+from backend.services.budgets import BudgetMonitor
+
+# Telegram rate-limits message edits: progress is edited at most this often (seconds)
+PROGRESS_EDIT_INTERVAL = float(os.getenv("PROGRESS_EDIT_INTERVAL", "2"))
+
+
+class ProgressMessage:
+    """
+    A Telegram message edited in place with a job's progress. Intermediate
+    updates are throttled to one per `interval` seconds; `final=True` updates
+    always go through. Repeated texts are skipped (Telegram rejects them).
+    """
+
+    def __init__(self, bot, chat_id: int, message_id: int, interval: float = PROGRESS_EDIT_INTERVAL):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self._text = None
+        self._last = 0.0
+
+    async def update(self, text: str, final: bool = False) -> None:
+        now = time.monotonic()
+        if text == self._text or (not final and now - self._last < self.interval):
+            return
+        self._text, self._last = text, now
+        try:
+            await self.bot.edit_message_text(text=text, chat_id=self.chat_id, message_id=self.message_id)
+        except Exception as e:
+            logging.warning(f"Could not edit progress message: {e}")
+
+    def update_threadsafe(self, loop: asyncio.AbstractEventLoop, text: str) -> None:
+        """`update` from a worker thread (e.g. PDF parsing in asyncio.to_thread)."""
+        loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self.update(text)))
+
+
+class DocumentIngestor:
+    """
+    JobQueue handler for uploaded statements and receipts.
+
+    Job payload: chat_id, message_id (the "Analizando..." message, edited with
+    progress and the final summary), file_id, file_name, is_image. The file is
+    downloaded again from Telegram by file_id, so a job resumed after a restart
+    works the same. The document cache marks a document ingested after its
+    insert, so a repeat upload or a job resumed after that point is skipped; a
+    crash between the insert and `mark_ingested` can still insert it twice.
+    """
+
+    def __init__(
+        self,
+        bot,
+        processor: DocumentProcessor,
+        writer: Optional[SupabaseWriter],
+        doc_cache: Optional[DocumentCache] = None,
+        budget_monitor: Optional[BudgetMonitor] = None,
+    ):
+        self.bot = bot
+        self.processor = processor
+        self.writer = writer
+        self.doc_cache = doc_cache
+        self.budget_monitor = budget_monitor
+
+    @timed("document")
+    async def run(self, job: Job) -> None:
+        payload = job.payload
+        file_name, is_image = payload["file_name"], payload["is_image"]
+        progress = ProgressMessage(self.bot, payload["chat_id"], payload["message_id"])
+        doc_cache = self.doc_cache
+        loop = asyncio.get_running_loop()
+
+        if not self.writer:
+            # Don't spend LLM calls on a document that can't be saved
+            await progress.update(
+                f"⚠️ {file_name}: la base de datos no está configurada, no guardé nada.", final=True
+            )
+            return
+
+        await progress.update(f"📥 {file_name}: descargando...", final=True)
+        file_info = await self.bot.get_file(payload["file_id"])
+
+        # In memory unless the file is big enough to spill to a temp file (removed on exit)
+        async with download_attachment(self.bot, file_info, suffix=f"_{file_name}") as source:
+            # Process File (unless the same content was already parsed)
+            transactions = []
+            digests = [await asyncio.to_thread(sha256_file, source)] if doc_cache else []
+            cached = await asyncio.to_thread(doc_cache.get, digests) if doc_cache else None
+
+            if not cached and not is_image:
+                def on_page(done: int, total: int) -> None:
+                    progress.update_threadsafe(loop, f"📄 {file_name}: leyendo páginas {done}/{total}...")
+
+                try:
+                    # pdfplumber is CPU bound, run it in a worker thread
+                    text_content = await asyncio.to_thread(self.processor.extract_text_from_pdf, source, on_page)
+                except ValueError as ve:
+                    await progress.update(f"⚠️ Error leyendo PDF: {ve}", final=True)
+                    return
+                if doc_cache:
+                    # Same statement downloaded again usually differs in bytes, not in text
+                    digests.append(sha256_text(text_content))
+                    cached = await asyncio.to_thread(doc_cache.get, digests[1:])
+
+            if cached and cached.ingested:
+                ingested_at = datetime.fromtimestamp(cached.created_at).strftime("%d/%m/%Y %H:%M")
+                await progress.update(
+                    f"⚠️ Este documento ya fue procesado ({cached.file_name}, {ingested_at}).\n"
+                    f"📄 {len(cached.entries)} transacciones ya guardadas, no las vuelvo a cargar.",
+                    final=True,
+                )
+                return
+
+            if cached:
+                # Parsed before but the insert didn't go through: reuse the result
+                transactions = cached.entries
+            elif is_image:
+                await progress.update(f"🤖 {file_name}: analizando imagen...", final=True)
+                # Pass the image (buffer or path) directly to Vision model
+                transactions = await self.processor.aanalyze_finance_document(source, is_image=True)
+            else:
+                def on_chunk(done: int, total: int, found: int) -> None:
+                    asyncio.ensure_future(progress.update(
+                        f"🤖 {file_name}: analizadas {done}/{total} partes, {found} transacciones encontradas..."
+                    ))
+
+                await progress.update(f"🤖 {file_name}: analizando texto...", final=True)
+                transactions = await self.processor.aanalyze_finance_document(
+                    text_content, is_image=False, on_chunk=on_chunk
+                )
+
+            # Only complete results get here: a statement with chunks that failed raises
+            # ChunkExtractionError, so it's never cached or marked ingested half done
+            if doc_cache and not cached:
+                await asyncio.to_thread(doc_cache.set, digests, file_name, transactions)
+
+        # Insert into Supabase
+        if not transactions:
+            await progress.update("⚠️ No encontré transacciones válidas en el documento.", final=True)
+            return
+
+        await progress.update(f"💾 {file_name}: guardando {len(transactions)} transacciones...", final=True)
+        # Single bulk insert (chunked) instead of one round trip per transaction
+        rows = finance_rows_from_document(transactions, file_name)
+        inserted = await self.writer.ainsert_many("finance_transactions", rows)
+
+        if doc_cache and inserted:
+            await asyncio.to_thread(doc_cache.mark_ingested, digests)
+
+        total_amount = sum(float(row["amount"] or 0) for row in inserted)
+        await progress.update(
+            f"✅ Procesamiento completado ({file_name}).\n"
+            f"📄 Transacciones extraídas: {len(inserted)}\n"
+            f"💰 Total detectado: ${total_amount:,.2f}\n\n"
+            f"Guardado en Base de Datos.",
+            final=True,
+        )
+
+        if self.budget_monitor:
+            for alert in self.budget_monitor.record_rows(inserted):
+                await self.bot.send_message(payload["chat_id"], alert)
+
+    async def fail(self, job: Job, error: Exception) -> None:
+        """JobQueue `on_failed`: the job gave up after its last attempt."""
+        payload = job.payload
+        progress = ProgressMessage(self.bot, payload["chat_id"], payload["message_id"])
+        if isinstance(error, ChunkExtractionError):
+            # Nothing was saved or cached, so sending the file again retries it
+            await progress.update(
+                f"❌ No pude analizar {error.failed} de {error.total} partes de {payload['file_name']}.\n"
+                f"No guardé ninguna transacción; probá reenviar el archivo más tarde.",
+                final=True,
+            )
+            return
+        await progress.update(f"❌ Error procesando el archivo:\n{error}", final=True)
@@ -0,0 +1,119 @@
+import logging
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.core.text import normalize
+
+
+def month_index(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def month_label(index: int) -> str:
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+class InstallmentSchedule:
+    """
+    Future installment obligations, precomputed per month.
+
+    A row registered as cuota c/t (amount = one cuota) owes cuotas c+1..t, one
+    per month after the row's month. They are added to a NumPy array with one
+    slot per month starting at `origin`, so "how much do I owe over the next N
+    months" is a slice sum.
+
+    The same plan shows up more than once (the manual message, then every card
+    statement with "CUOTA 02/03", ...). Plans are identified by merchant, cuota
+    amount, cuota count and start month, and only cuotas not covered by an
+    earlier sighting are added.
+    """
+
+    def __init__(self, origin: Optional[date] = None, horizon_months: int = 60):
+        self.origin = month_index(origin or date.today())
+        self._amounts = np.zeros(horizon_months, dtype=np.float64)
+        # plan key -> lowest cuota number seen (cuotas after it are already scheduled)
+        self._plans: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, amount: float, day: date, current: int, total: int, merchant: Optional[str] = None) -> None:
+        """Schedules the cuotas still owed by one installment row."""
+        if not total or total <= 1 or not amount:
+            return
+        current = min(max(int(current or 1), 1), int(total))
+        start = month_index(day) - (current - 1)
+        key = (normalize(merchant or "").strip(), round(float(amount), 2), int(total), start)
+
+        with self._lock:
+            seen = self._plans.get(key)
+            if seen is not None and seen <= current:
+                return
+            last = total if seen is None else seen
+            self._plans[key] = current
+            # cuota k is paid in month start + k - 1
+            first_month = max(start + current, self.origin)
+            last_month = start + last - 1
+            if last_month < first_month:
+                return
+            self._grow(last_month - self.origin + 1)
+            self._amounts[first_month - self.origin:last_month - self.origin + 1] += float(amount)
+
+    def add_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Schedules `finance_transactions` rows (only those with installments count)."""
+        for row in rows:
+            total = row.get("installment_total")
+            if not total or int(total) <= 1 or not row.get("date_transaction"):
+                continue
+            try:
+                day = date.fromisoformat(str(row["date_transaction"])[:10])
+            except ValueError:
+                continue
+            self.add(
+                float(row.get("amount") or 0),
+                day,
+                row.get("installment_current") or 1,
+                int(total),
+                row.get("merchant") or row.get("original_desc"),
+            )
+
+    def seed(self, client, limit: int = 10000) -> None:
+        """Loads the installment rows already stored in Supabase (once, at startup)."""
+        rows = client.table("finance_transactions") \
+            .select("amount, merchant, original_desc, date_transaction, installment_current, installment_total") \
+            .gt("installment_total", 1) \
+            .limit(limit) \
+            .execute().data or []
+        self.add_rows(rows)
+        logging.info(f"📅 Installment schedule seeded with {len(rows)} rows")
+
+    def apply(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """`SupabaseWriter.on_insert` hook."""
+        if table == "finance_transactions":
+            self.add_rows(rows)
+
+    def schedule(self, months: int = 12, start: Optional[date] = None) -> List[Tuple[str, float]]:
+        """[(YYYY-MM, amount)] for `months` months from `start`'s month (default: this month)."""
+        first = month_index(start or date.today())
+        with self._lock:
+            amounts = self._slice(first, months)
+        return [(month_label(first + i), round(float(amount), 2)) for i, amount in enumerate(amounts)]
+
+    def owed(self, months: int = 12, start: Optional[date] = None) -> float:
+        """Total owed in installments over `months` months from `start`'s month (default: this month)."""
+        with self._lock:
+            return round(float(self._slice(month_index(start or date.today()), months).sum()), 2)
+
+    def _slice(self, first: int, months: int) -> np.ndarray:
+        out = np.zeros(months, dtype=np.float64)
+        lo, hi = max(first, self.origin), min(first + months, self.origin + len(self._amounts))
+        if lo < hi:
+            out[lo - first:hi - first] = self._amounts[lo - self.origin:hi - self.origin]
+        return out
+
+    def _grow(self, size: int) -> None:
+        if size > len(self._amounts):
+            grown = np.zeros(max(size, 2 * len(self._amounts)), dtype=np.float64)
+            grown[:len(self._amounts)] = self._amounts
+            self._amounts = grown
@@ -0,0 +1,36 @@
+import argparse
+from typing import Optional
+
+from backend.core.setup import supabase
+
+
+class RollupUpdater:
+    """
+    Maintenance for the daily rollup tables from migration_v6.sql.
+
+    The rollups are kept up to date by triggers on the raw tables, so rows
+    written outside the bot (dashboard, manual inserts, deletes) are counted
+    too. `rebuild` recomputes them from the raw tables after a manual repair.
+    """
+
+    def __init__(self, client=None):
+        self.client = client if client is not None else supabase
+
+    def rebuild(self, since: Optional[str] = None) -> None:
+        """Recomputes every rollup from the raw tables (from `since`, YYYY-MM-DD, if given)."""
+        self.client.rpc("rollup_rebuild", {"p_since": since}).execute()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily rollup maintenance")
+    parser.add_argument("--rebuild", action="store_true", help="recompute rollups from the raw tables")
+    parser.add_argument("--since", help="only rebuild days from this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.error("nothing to do (use --rebuild)")
+    if not supabase:
+        raise SystemExit("Supabase client not configured")
+
+    RollupUpdater().rebuild(args.since)
+    print(f"Rollups rebuilt{f' since {args.since}' if args.since else ''}.")
@@ -0,0 +1,9 @@
+-- V4 Migration: Routing history
+-- Run this in Supabase SQL Editor
+
+-- 1. Store the routed category next to each raw message.
+-- Used to seed the bot's local category model (speculative / local routing).
+ALTER TABLE raw_logs
+ADD COLUMN IF NOT EXISTS category text;
+
+CREATE INDEX IF NOT EXISTS idx_raw_logs_category ON raw_logs(category);
@@ -0,0 +1,67 @@
+-- V5 Migration: Server-side finance aggregates
+-- Run this in Supabase SQL Editor
+-- FinancialAnalytics calls these through supabase.rpc(), so only aggregates
+-- cross the wire no matter how many transactions a period has.
+-- All ranges are [p_start, p_end).
+
+-- 0. Date range scans
+CREATE INDEX IF NOT EXISTS idx_finance_date ON finance_transactions(date_transaction);
+
+-- 1. Total for a period
+CREATE OR REPLACE FUNCTION finance_total(p_start date, p_end date)
+RETURNS TABLE (total numeric, tx_count bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(SUM(amount), 0), COUNT(*)
+  FROM finance_transactions
+  WHERE date_transaction >= p_start AND date_transaction < p_end;
+$$;
+
+-- 2. Totals by month
+CREATE OR REPLACE FUNCTION finance_totals_by_month(p_start date, p_end date)
+RETURNS TABLE (month date, total numeric, tx_count bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT date_trunc('month', date_transaction)::date, SUM(amount), COUNT(*)
+  FROM finance_transactions
+  WHERE date_transaction >= p_start AND date_transaction < p_end
+  GROUP BY 1
+  ORDER BY 1;
+$$;
+
+-- 3. Totals by category
+CREATE OR REPLACE FUNCTION finance_totals_by_category(p_start date, p_end date)
+RETURNS TABLE (category text, total numeric, tx_count bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(category, 'Otros'), SUM(amount), COUNT(*)
+  FROM finance_transactions
+  WHERE date_transaction >= p_start AND date_transaction < p_end
+  GROUP BY 1
+  ORDER BY 2 DESC;
+$$;
+
+-- 4. Totals by payment method
+CREATE OR REPLACE FUNCTION finance_totals_by_payment_method(p_start date, p_end date)
+RETURNS TABLE (payment_method text, total numeric, tx_count bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(payment_method, 'unknown'), SUM(amount), COUNT(*)
+  FROM finance_transactions
+  WHERE date_transaction >= p_start AND date_transaction < p_end
+  GROUP BY 1
+  ORDER BY 2 DESC;
+$$;
+
+-- 5. Installment plans registered in a period, grouped by plan length.
+-- remaining_amount = installments still to be paid after the registered one.
+CREATE OR REPLACE FUNCTION finance_installment_summary(p_start date, p_end date)
+RETURNS TABLE (installment_total int, plans bigint, monthly_amount numeric, remaining_amount numeric)
+LANGUAGE sql STABLE AS $$
+  SELECT
+    installment_total,
+    COUNT(*),
+    SUM(amount),
+    SUM(amount * GREATEST(installment_total - COALESCE(installment_current, 1), 0))
+  FROM finance_transactions
+  WHERE installment_total > 1
+    AND date_transaction >= p_start AND date_transaction < p_end
+  GROUP BY 1
+  ORDER BY 1;
+$$;
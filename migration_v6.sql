@@ -0,0 +1,222 @@
+-- V6 Migration: Daily rollups for finance, mood and activity metrics
+-- Run this in Supabase SQL Editor (after migration_v5.sql)
+-- Triggers on the raw tables keep them up to date, so analytics and the
+-- dashboard read O(days) rows instead of O(transactions). The migration ends
+-- with a full rebuild (backfill of the existing history).
+-- Repair: python -m backend.services.rollups --rebuild [--since YYYY-MM-DD]
+
+-- 1. Rollup tables (keys are NOT NULL so upserts can target them)
+CREATE TABLE IF NOT EXISTS finance_daily_rollup (
+  day date NOT NULL,
+  category text NOT NULL,
+  payment_method text NOT NULL,
+  total numeric NOT NULL DEFAULT 0,
+  tx_count int NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, category, payment_method)
+);
+
+CREATE TABLE IF NOT EXISTS mood_daily_rollup (
+  day date PRIMARY KEY,
+  mood_sum numeric NOT NULL DEFAULT 0,
+  mood_count int NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS activity_daily_rollup (
+  day date NOT NULL,
+  type text NOT NULL,
+  activity_count int NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, type)
+);
+
+-- Monthly views are derived from the daily tables (at most 31 rows per key per month)
+CREATE OR REPLACE VIEW finance_monthly_rollup AS
+  SELECT date_trunc('month', day)::date AS month, category, payment_method,
+         SUM(total) AS total, SUM(tx_count) AS tx_count
+  FROM finance_daily_rollup
+  GROUP BY 1, 2, 3;
+
+CREATE OR REPLACE VIEW mood_daily_average AS
+  SELECT day, mood_sum / NULLIF(mood_count, 0) AS mood_avg, mood_count
+  FROM mood_daily_rollup;
+
+-- 2. Incremental updates: statement-level triggers on the raw tables, so rows
+--    written by the bot, the dashboard or by hand (and updates / deletes) are
+--    all reflected. A bulk insert is aggregated once per statement.
+CREATE OR REPLACE FUNCTION rollup_finance_changes()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    INSERT INTO finance_daily_rollup AS r (day, category, payment_method, total, tx_count)
+    SELECT COALESCE(date_transaction, created_at::date), COALESCE(category, 'Otros'),
+           COALESCE(payment_method, 'unknown'), -COALESCE(SUM(amount), 0), -COUNT(*)
+    FROM old_rows
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, category, payment_method)
+    DO UPDATE SET total = r.total + EXCLUDED.total, tx_count = r.tx_count + EXCLUDED.tx_count;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO finance_daily_rollup AS r (day, category, payment_method, total, tx_count)
+    SELECT COALESCE(date_transaction, created_at::date), COALESCE(category, 'Otros'),
+           COALESCE(payment_method, 'unknown'), COALESCE(SUM(amount), 0), COUNT(*)
+    FROM new_rows
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, category, payment_method)
+    DO UPDATE SET total = r.total + EXCLUDED.total, tx_count = r.tx_count + EXCLUDED.tx_count;
+  END IF;
+  DELETE FROM finance_daily_rollup WHERE tx_count = 0;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION rollup_mood_changes()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    INSERT INTO mood_daily_rollup AS r (day, mood_sum, mood_count)
+    SELECT created_at::date, -SUM(mood_score), -COUNT(*)
+    FROM old_rows
+    WHERE mood_score IS NOT NULL
+    GROUP BY 1
+    ON CONFLICT (day)
+    DO UPDATE SET mood_sum = r.mood_sum + EXCLUDED.mood_sum, mood_count = r.mood_count + EXCLUDED.mood_count;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO mood_daily_rollup AS r (day, mood_sum, mood_count)
+    SELECT created_at::date, SUM(mood_score), COUNT(*)
+    FROM new_rows
+    WHERE mood_score IS NOT NULL
+    GROUP BY 1
+    ON CONFLICT (day)
+    DO UPDATE SET mood_sum = r.mood_sum + EXCLUDED.mood_sum, mood_count = r.mood_count + EXCLUDED.mood_count;
+  END IF;
+  DELETE FROM mood_daily_rollup WHERE mood_count = 0;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION rollup_activity_changes()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    INSERT INTO activity_daily_rollup AS r (day, type, activity_count)
+    SELECT created_at::date, COALESCE(type, 'unknown'), -COUNT(*)
+    FROM old_rows
+    GROUP BY 1, 2
+    ON CONFLICT (day, type)
+    DO UPDATE SET activity_count = r.activity_count + EXCLUDED.activity_count;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO activity_daily_rollup AS r (day, type, activity_count)
+    SELECT created_at::date, COALESCE(type, 'unknown'), COUNT(*)
+    FROM new_rows
+    GROUP BY 1, 2
+    ON CONFLICT (day, type)
+    DO UPDATE SET activity_count = r.activity_count + EXCLUDED.activity_count;
+  END IF;
+  DELETE FROM activity_daily_rollup WHERE activity_count = 0;
+  RETURN NULL;
+END;
+$$;
+
+-- Transition tables can't be shared between INSERT / UPDATE / DELETE triggers, hence three per table
+DROP TRIGGER IF EXISTS finance_rollup_insert ON finance_transactions;
+DROP TRIGGER IF EXISTS finance_rollup_update ON finance_transactions;
+DROP TRIGGER IF EXISTS finance_rollup_delete ON finance_transactions;
+CREATE TRIGGER finance_rollup_insert AFTER INSERT ON finance_transactions
+  REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_finance_changes();
+CREATE TRIGGER finance_rollup_update AFTER UPDATE ON finance_transactions
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_finance_changes();
+CREATE TRIGGER finance_rollup_delete AFTER DELETE ON finance_transactions
+  REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_finance_changes();
+
+DROP TRIGGER IF EXISTS mood_rollup_insert ON journal_entries;
+DROP TRIGGER IF EXISTS mood_rollup_update ON journal_entries;
+DROP TRIGGER IF EXISTS mood_rollup_delete ON journal_entries;
+CREATE TRIGGER mood_rollup_insert AFTER INSERT ON journal_entries
+  REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mood_changes();
+CREATE TRIGGER mood_rollup_update AFTER UPDATE ON journal_entries
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mood_changes();
+CREATE TRIGGER mood_rollup_delete AFTER DELETE ON journal_entries
+  REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mood_changes();
+
+DROP TRIGGER IF EXISTS activity_rollup_insert ON activities;
+DROP TRIGGER IF EXISTS activity_rollup_update ON activities;
+DROP TRIGGER IF EXISTS activity_rollup_delete ON activities;
+CREATE TRIGGER activity_rollup_insert AFTER INSERT ON activities
+  REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_activity_changes();
+CREATE TRIGGER activity_rollup_update AFTER UPDATE ON activities
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_activity_changes();
+CREATE TRIGGER activity_rollup_delete AFTER DELETE ON activities
+  REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_activity_changes();
+
+-- 3. Rebuild from the raw tables (everything, or from p_since onwards)
+CREATE OR REPLACE FUNCTION rollup_rebuild(p_since date DEFAULT NULL)
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+  DELETE FROM finance_daily_rollup WHERE p_since IS NULL OR day >= p_since;
+  INSERT INTO finance_daily_rollup (day, category, payment_method, total, tx_count)
+  SELECT COALESCE(date_transaction, created_at::date), COALESCE(category, 'Otros'),
+         COALESCE(payment_method, 'unknown'), COALESCE(SUM(amount), 0), COUNT(*)
+  FROM finance_transactions
+  WHERE p_since IS NULL OR COALESCE(date_transaction, created_at::date) >= p_since
+  GROUP BY 1, 2, 3;
+
+  DELETE FROM mood_daily_rollup WHERE p_since IS NULL OR day >= p_since;
+  INSERT INTO mood_daily_rollup (day, mood_sum, mood_count)
+  SELECT created_at::date, SUM(mood_score), COUNT(*)
+  FROM journal_entries
+  WHERE mood_score IS NOT NULL AND (p_since IS NULL OR created_at::date >= p_since)
+  GROUP BY 1;
+
+  DELETE FROM activity_daily_rollup WHERE p_since IS NULL OR day >= p_since;
+  INSERT INTO activity_daily_rollup (day, type, activity_count)
+  SELECT created_at::date, COALESCE(type, 'unknown'), COUNT(*)
+  FROM activities
+  WHERE p_since IS NULL OR created_at::date >= p_since
+  GROUP BY 1, 2;
+END;
+$$;
+
+-- 4. The v5 finance aggregates now read the daily rollup instead of raw rows
+--    (finance_installment_summary keeps reading finance_transactions: it needs
+--    per-purchase installment columns and only touches installment rows).
+CREATE OR REPLACE FUNCTION finance_total(p_start date, p_end date)
+RETURNS TABLE (total numeric, tx_count bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(SUM(total), 0), COALESCE(SUM(tx_count), 0)::bigint
+  FROM finance_daily_rollup
+  WHERE day >= p_start AND day < p_end;
+$$;
+
+CREATE OR REPLACE FUNCTION finance_totals_by_month(p_start date, p_end date)
+RETURNS TABLE (month date, total numeric, tx_count bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT date_trunc('month', day)::date, SUM(total), SUM(tx_count)::bigint
+  FROM finance_daily_rollup
+  WHERE day >= p_start AND day < p_end
+  GROUP BY 1
+  ORDER BY 1;
+$$;
+
+CREATE OR REPLACE FUNCTION finance_totals_by_category(p_start date, p_end date)
+RETURNS TABLE (category text, total numeric, tx_count bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT category, SUM(total), SUM(tx_count)::bigint
+  FROM finance_daily_rollup
+  WHERE day >= p_start AND day < p_end
+  GROUP BY 1
+  ORDER BY 2 DESC;
+$$;
+
+CREATE OR REPLACE FUNCTION finance_totals_by_payment_method(p_start date, p_end date)
+RETURNS TABLE (payment_method text, total numeric, tx_count bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT payment_method, SUM(total), SUM(tx_count)::bigint
+  FROM finance_daily_rollup
+  WHERE day >= p_start AND day < p_end
+  GROUP BY 1
+  ORDER BY 2 DESC;
+$$;
+
+-- 5. Backfill: the aggregates above read the rollups from now on
+SELECT rollup_rebuild();
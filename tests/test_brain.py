@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from backend.agents.brain import LifeOSBrain
+from backend.benchmarks.stubs import StubEmbeddings, StubLLM, unlimited_governor
+
+MESSAGES = [
+    "gasté 2000 en coto con débito",
+    "corrí 5km en 30 minutos",
+    "hoy me sentí 7/10, cansado pero contento",
+    "pagué netflix con visa",
+    "hice 4 series de sentadillas",
+] * 2
+
+LATENCY = 0.05
+
+
+def make_brain(**kwargs) -> LifeOSBrain:
+    options = dict(pre_router=False, cache=False, governor=unlimited_governor())
+    options.update(kwargs)
+    return LifeOSBrain(llm=StubLLM(LATENCY), embeddings=StubEmbeddings(LATENCY), **options)
+
+
+def test_aprocess_input_matches_process_input():
+    brain = make_brain()
+    for text in MESSAGES[:5]:
+        sync_result = brain.process_input(text)
+        async_result = asyncio.run(brain.aprocess_input(text))
+        assert async_result == sync_result
+
+
+def test_concurrent_messages_overlap():
+    brain = make_brain()
+
+    start = time.perf_counter()
+    for text in MESSAGES:
+        brain.process_input(text)
+    sequential = time.perf_counter() - start
+
+    async def run_all():
+        return await asyncio.gather(*(brain.aprocess_input(text) for text in MESSAGES))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_all())
+    concurrent = time.perf_counter() - start
+
+    assert [r["category"] for r in results] == [
+        "FINANCE", "HEALTH", "JOURNAL", "FINANCE", "HEALTH",
+    ] * 2
+    # Router + agent (+ embedding) per message: ~10x sequentially, ~2-3 LLM latencies concurrently
+    assert sequential / concurrent > 3
+
+
+class GuessHealth:
+    """Local classifier stand-in that always guesses HEALTH."""
+
+    def predict(self, text):
+        return "HEALTH", 0.99
+
+    def update(self, text, category):
+        pass
+
+
+class SlowAgent:
+    def __init__(self):
+        self.finished = False
+
+    async def aprocess(self, text):
+        try:
+            await asyncio.sleep(10)
+        finally:
+            # Slow cleanup, longer than the right agent's call
+            await asyncio.sleep(LATENCY * 4)
+            self.finished = True
+
+
+def test_speculative_miss_waits_for_the_cancelled_call():
+    brain = make_brain(speculative=True)
+    brain.classifier = GuessHealth()
+    brain.health_agent = SlowAgent()
+
+    async def run():
+        result = await brain.aprocess_input("gasté 2000 en coto con débito")
+        return result, brain.health_agent.finished
+
+    result, finished = asyncio.run(run())
+
+    assert result["category"] == "FINANCE"
+    assert brain.speculation_stats["misses"] == 1
+    # The wrong agent's call was cancelled and awaited before the result came back
+    assert finished
+
+
+def trained_classifier():
+    from backend.agents.classifier import CategoryClassifier
+    rows = [
+        ("gasté 2000 en coto este mes", "FINANCE"),
+        ("cuánto salió la luz? pagué 3000", "FINANCE"),
+        ("corrí 5km", "HEALTH"),
+        ("hoy me sentí bien", "JOURNAL"),
+    ] * 100
+    return CategoryClassifier().fit(rows)
+
+
+def test_prerouter_model_tier_is_opt_in():
+    from backend.agents.brain import RulePreRouter
+
+    question = "cuánto gasté este mes?"
+    assert RulePreRouter(trained_classifier()).route(question) is None
+    assert RulePreRouter(trained_classifier(), use_model=True).route(question).category == "FINANCE"
+
+
+def test_classifier_learns_only_from_llm_labels():
+    brain = make_brain(pre_router=True)
+
+    asyncio.run(brain.aprocess_input("$3500 nafta visa"))  # regex rule, no LLM
+    assert brain.classifier.history_size == 0
+
+    asyncio.run(brain.aprocess_input("fui al cine con amigos"))  # LLM router
+    assert brain.classifier.history_size == 1
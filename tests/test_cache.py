@@ -0,0 +1,31 @@
+from backend.core.cache import ResponseCache
+
+DAY = "2024-05-15"
+VECTOR = [1.0, 0.0, 0.0]
+
+
+def result(category):
+    return {"category": category, "confidence": 0.95, "data": {"raw_text": "..."}}
+
+
+def test_exact_tier_is_keyed_by_date():
+    cache = ResponseCache()
+    cache.set("pagué netflix", DAY, result("FINANCE"))
+    assert cache.get("Pagué  Netflix", DAY)["category"] == "FINANCE"
+    assert cache.get("pagué netflix", "2024-05-16") is None
+
+
+def test_semantic_tier_skips_extracted_results():
+    cache = ResponseCache(semantic=True)
+    cache.set("gasté 2000 en coto", DAY, result("FINANCE"), embedding=VECTOR)
+    cache.set("corrí 5km", DAY, result("HEALTH"), embedding=VECTOR)
+    cache.set("hoy me sentí bien", DAY, result("JOURNAL"), embedding=VECTOR)
+    assert cache.get_similar("gasté 2000 en coto!", VECTOR, DAY) is None
+    assert cache.get_similar("hoy me senti bien!", VECTOR, DAY) is None
+
+
+def test_semantic_tier_needs_the_same_numbers():
+    cache = ResponseCache(semantic=True)
+    cache.set("qué hora es en tokio a las 10", DAY, result("OTHER"), embedding=VECTOR)
+    assert cache.get_similar("que hora es en tokio a las 11", VECTOR, DAY) is None
+    assert cache.get_similar("que hora es en tokio a las 10?", VECTOR, DAY)["category"] == "OTHER"
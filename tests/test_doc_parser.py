@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from backend.agents.doc_parser import (
+    ChunkExtractionError, DocumentProcessor, merge_chunk_results, split_statement,
+)
+from backend.benchmarks.stubs import StubLLM, unlimited_governor
+from backend.core.schemas import FinanceBatch, FinanceEntry
+
+LINES = [f"{day:02d}/05 COMERCIO {day} {day * 100},00" for day in range(1, 21)]
+
+
+def entry(day, amount=None, merchant=None):
+    return FinanceEntry(amount=amount or day * 100, category="Otros", merchant=merchant or f"comercio {day}",
+                        date=f"2024-05-{day:02d}")
+
+
+def test_split_statement_repeats_the_overlap_lines():
+    chunks = split_statement("\n".join(LINES), max_chars=200, overlap_lines=2)
+    assert len(chunks) > 1
+    assert chunks[0].overlap == ""
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.text.startswith(chunk.overlap)
+        assert previous.text.endswith(chunk.overlap)
+
+
+def test_merge_drops_only_overlap_duplicates():
+    chunks = split_statement("\n".join(LINES), max_chars=200, overlap_lines=2)
+    day = lambda line: int(line[:2])
+    results = [[entry(day(line)) for line in chunk.text.splitlines()] for chunk in chunks]
+
+    merged = merge_chunk_results(results, chunks)
+    assert [e.date for e in merged] == [f"2024-05-{d:02d}" for d in range(1, 21)]
+
+
+def test_merge_keeps_a_repeated_transaction_next_to_the_cut():
+    # Two identical coffees on the same day, with the cut (and the overlap line) between them
+    lines = ["02/05 CAFE 500,00", "02/05 KIOSCO 800,00", "02/05 CAFE 500,00"]
+    chunks = split_statement("\n".join(lines), max_chars=40, overlap_lines=1)
+    assert [c.overlap for c in chunks] == ["", "02/05 KIOSCO 800,00"]
+    results = [
+        [entry(2, 500, "cafe"), entry(2, 800, "kiosco")],
+        [entry(2, 800, "kiosco"), entry(2, 500, "cafe")],
+    ]
+    merged = merge_chunk_results(results, chunks)
+    assert [(e.merchant, e.amount) for e in merged] == [("cafe", 500), ("kiosco", 800), ("cafe", 500)]
+
+
+class FlakyChain:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise ValueError("bad structured output")
+        return FinanceBatch(transactions=[entry(int(line[:2])) for line in inputs["input"].splitlines()])
+
+
+def processor_with(chain):
+    processor = DocumentProcessor(StubLLM(), governor=unlimited_governor())
+    processor.text_chain = chain
+    return processor
+
+
+def test_failed_chunks_are_retried(monkeypatch):
+    monkeypatch.setattr("backend.agents.doc_parser.CHUNK_MAX_CHARS", 200)
+    chain = FlakyChain(failures=1)
+    transactions = asyncio.run(processor_with(chain).aanalyze_finance_document("\n".join(LINES)))
+    assert len(transactions) == 20
+    assert chain.calls == len(split_statement("\n".join(LINES))) + 1
+
+
+def test_chunks_that_keep_failing_raise(monkeypatch):
+    monkeypatch.setattr("backend.agents.doc_parser.CHUNK_MAX_CHARS", 200)
+    with pytest.raises(ChunkExtractionError) as error:
+        asyncio.run(processor_with(FlakyChain(failures=1000)).aanalyze_finance_document("\n".join(LINES)))
+    assert error.value.failed == error.value.total > 1
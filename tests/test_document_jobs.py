@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.benchmarks.stubs import InMemorySupabase
+from backend.core.doc_cache import DocumentCache
+from backend.core.job_queue import Job
+from backend.core.repository import SupabaseWriter
+from backend.core.schemas import FinanceEntry
+from backend.services.document_jobs import DocumentIngestor
+
+JOB = Job(1, {"chat_id": 1, "message_id": 2, "file_id": "f", "file_name": "ticket.jpg", "is_image": True}, 0, 0.0)
+
+
+class FakeBot:
+    def __init__(self):
+        self.texts = []
+        self.downloads = 0
+
+    async def edit_message_text(self, text, chat_id, message_id):
+        self.texts.append(text)
+
+    async def get_file(self, file_id):
+        return SimpleNamespace(file_path=file_id, file_size=3)
+
+    async def download_file(self, file_path, destination):
+        self.downloads += 1
+        destination.write(b"img")
+
+    async def send_message(self, chat_id, text):
+        pass
+
+
+class FakeProcessor:
+    def __init__(self):
+        self.calls = 0
+
+    async def aanalyze_finance_document(self, source, is_image=False, on_chunk=None):
+        self.calls += 1
+        return [FinanceEntry(amount=1500, category="Supermercado", merchant="Coto", date="2024-05-15")]
+
+
+def test_missing_writer_saves_nothing_and_says_so():
+    bot, processor = FakeBot(), FakeProcessor()
+    asyncio.run(DocumentIngestor(bot, processor, writer=None).run(JOB))
+    assert bot.downloads == 0 and processor.calls == 0
+    assert "no guardé nada" in bot.texts[-1]
+    assert not any(text.startswith("✅") for text in bot.texts)
+
+
+def test_ingested_document_is_not_inserted_again(tmp_path):
+    bot, processor, db = FakeBot(), FakeProcessor(), InMemorySupabase()
+    ingestor = DocumentIngestor(bot, processor, SupabaseWriter(db), DocumentCache(str(tmp_path / "docs.sqlite3")))
+
+    asyncio.run(ingestor.run(JOB))
+    asyncio.run(ingestor.run(JOB))
+    assert len(db.tables["finance_transactions"]) == 1
+    assert processor.calls == 1
+    assert "ya fue procesado" in bot.texts[-1]
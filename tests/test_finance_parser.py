@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+
+from backend.agents.finance_parser import FinanceRuleParser
+
+TODAY = date(2024, 5, 15)
+
+
+def parse(text):
+    return FinanceRuleParser().parse(text, today=TODAY)
+
+
+@pytest.mark.parametrize("text, amount, category, payment_method", [
+    ("gasté 2000 en coto con débito", 2000, "Supermercado", "Débito"),
+    ("nafta 20 lucas visa", 20000, "Vehículo: Auto", "Crédito: Visa"),
+    ("pagué netflix 4500 con mp", 4500, "Suscripciones", "Transferencia"),
+    ("12 cuotas de 10000 en carrefour con master", 10000, "Supermercado", "Crédito: Master"),
+    ("gasté 3000 en coto con tarjeta de débito", 3000, "Supermercado", "Débito"),
+    ("gasté 3000 en coto con la tarjeta", 3000, "Supermercado", "Crédito: Visa"),
+])
+def test_simple_expenses(text, amount, category, payment_method):
+    batch = parse(text)
+    assert batch is not None
+    [entry] = batch.transactions
+    assert entry.amount == amount
+    assert entry.category == category
+    assert entry.payment_method == payment_method
+
+
+@pytest.mark.parametrize("text", [
+    "no gasté 2000 en coto",
+    "nunca pagué 3000 de luz",
+    "vendí la moto 500 lucas",
+    "me pagaron 50000 por el curso",
+    "me devolvieron 3000 de coto",
+    "reintegro de 1500 en la farmacia con visa",
+    "cobré 200000 de alquiler",
+])
+def test_negations_income_and_refunds_fall_through(text):
+    assert parse(text) is None
+
+
+def test_needs_an_expense_cue():
+    # Amount and merchant, but nothing says the money went out
+    assert parse("coto 2000") is None
+    assert parse("coto 2000 efectivo") is not None
+
+
+@pytest.mark.parametrize("text", [
+    "pagué 3000 en coto con visa y master",
+    "gasté 3000 en coto, mitad efectivo mitad débito",
+    "12 cuotas de 10000 en carrefour",
+])
+def test_ambiguous_or_missing_payment_method_falls_through(text):
+    assert parse(text) is None
+
+def test_multipliers():
+    assert parse("gasté 2 palos en la moto con visa").transactions[0].amount == 2_000_000
+    assert parse("gasté 5 k en coto").transactions[0].amount == 5000
+    # "m" is not read as millions
+    assert parse("gasté 5 m en coto") is None
+    assert parse("gasté 5m en coto") is None
+
+
+def test_relative_dates():
+    assert parse("ayer gasté 2000 en coto").transactions[0].date == "2024-05-14"
+    assert parse("gasté 2000 en coto el 28/12").transactions[0].date == "2023-12-28"
+
+
+@pytest.mark.parametrize("text", [
+    "gasté 5000 en coto la semana pasada",
+    "gasté 5000 en coto el mes pasado",
+    "gasté 5000 en coto en enero",
+    "gasté 5000 en coto hace un mes",
+    "anoche gasté 5000 en el bar",
+    "el finde gasté 5000 en coto",
+])
+def test_unresolved_dates_fall_through(text):
+    assert parse(text) is None
+
+
+def test_weekdays_and_days_ago():
+    assert parse("el lunes pasado gasté 2000 en coto").transactions[0].date == "2024-05-13"
+    assert parse("hace 3 dias gasté 2000 en coto").transactions[0].date == "2024-05-12"
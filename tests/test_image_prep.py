@@ -0,0 +1,38 @@
+import base64
+import io
+
+from PIL import Image
+
+from backend.agents.image_prep import detect_mime_type, prepare_image
+
+
+def photo(size=(1600, 1200), fmt="PNG") -> bytes:
+    image = Image.effect_noise(size, 60).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_detects_the_real_mime_type():
+    assert detect_mime_type(photo((10, 10), "PNG")[:16]) == "image/png"
+    assert detect_mime_type(photo((10, 10), "JPEG")[:16]) == "image/jpeg"
+    assert detect_mime_type(b"not an image") is None
+
+
+def test_big_photos_are_downsized_to_jpeg():
+    original = photo()
+    prepared = prepare_image(io.BytesIO(original), max_side=800)
+
+    assert prepared.mime_type == "image/jpeg"
+    assert prepared.bytes_before == len(original)
+    assert prepared.bytes_after < prepared.bytes_before
+    header, data = prepared.data_url.split(",", 1)
+    assert header == "data:image/jpeg;base64"
+    with Image.open(io.BytesIO(base64.b64decode(data))) as image:
+        assert max(image.size) == 800
+
+
+def test_undecodable_files_are_sent_as_is():
+    prepared = prepare_image(b"\x89PNG\r\n\x1a\n garbage")
+    assert prepared.mime_type == "image/png"
+    assert prepared.bytes_after == prepared.bytes_before
@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+
+import backend.core.vector_index as vector_index
+from backend.core.vector_index import VectorIndex, popcount
+
+
+def test_popcount_without_bitwise_count(monkeypatch):
+    values = np.array([0, 1, 0xFF, 2**64 - 1, 0x8000000000000001], dtype=np.uint64)
+    expected = [0, 1, 8, 64, 2]
+    assert popcount(values).tolist() == expected
+    # NumPy < 2.0 has no bitwise_count: the lookup table gives the same counts
+    monkeypatch.delattr(vector_index.np, "bitwise_count", raising=False)
+    assert popcount(values).tolist() == expected
+
+
+def test_files_are_created_on_first_add(tmp_path):
+    path = str(tmp_path / "data" / "journal_index")
+    index = VectorIndex(path, dim=4, capacity=8)
+    assert not os.path.exists(f"{path}.npy")
+
+    index.add([1, 0, 0, 0], {"id": 1})
+    index.add([0, 1, 0, 0], {"id": 2})
+    assert os.path.exists(f"{path}.npy")
+
+    reopened = VectorIndex(path)
+    assert len(reopened) == 2
+    assert reopened.search([0, 1, 0, 0], k=1)[0][2] == {"id": 2}
+
+
+def test_approximate_search_finds_the_nearest_row():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 32)).astype(np.float32)
+    index = VectorIndex(dim=32, capacity=16)
+    index.add_many(vectors, [{"id": i} for i in range(len(vectors))])
+
+    query = vectors[123] + 0.01 * rng.standard_normal(32).astype(np.float32)
+    row, score, meta = index.search(query, k=1, approximate=True, candidates=50)[0]
+    assert (row, meta) == (123, {"id": 123})
+    assert score > 0.99
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+
+from backend.core.write_queue import WriteBehindQueue
+
+
+class SlowWriter:
+    """SupabaseWriter stand-in: inserts in a worker thread, like the real one."""
+
+    chunk_size = 500
+
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.rows = []
+
+    def _insert(self, table, rows):
+        time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("supabase down")
+        self.rows.extend((table, row) for row in rows)
+        return rows
+
+    async def ainsert_many(self, table, rows):
+        return await asyncio.to_thread(self._insert, table, rows)
+
+
+def test_rows_are_batched_per_table(tmp_path):
+    writer = SlowWriter()
+
+    async def run():
+        queue = WriteBehindQueue(writer, spool_path=str(tmp_path / "spool.jsonl"), flush_interval=60)
+        await queue.start()
+        for i in range(3):
+            await queue.enqueue("raw_logs", {"i": i})
+        await queue.stop()
+
+    asyncio.run(run())
+    assert [row["i"] for _, row in writer.rows] == [0, 1, 2]
+
+
+def test_stop_during_an_insert_writes_it_once(tmp_path):
+    writer = SlowWriter(latency=0.2)
+
+    async def run():
+        queue = WriteBehindQueue(writer, spool_path=str(tmp_path / "spool.jsonl"), batch_size=1)
+        await queue.start()
+        await queue.enqueue("raw_logs", {"message_content": "hola"})
+        await asyncio.sleep(0.05)  # the flusher is now inside ainsert_many
+        await queue.stop()
+
+    asyncio.run(run())
+    assert len(writer.rows) == 1
+
+
+def test_unacknowledged_rows_are_replayed(tmp_path):
+    spool = str(tmp_path / "spool.jsonl")
+
+    async def run(writer):
+        queue = WriteBehindQueue(writer, spool_path=spool, flush_interval=60, max_attempts=100)
+        await queue.start()
+        return queue
+
+    async def first_run():
+        queue = await run(SlowWriter(fail=True))
+        await queue.enqueue("raw_logs", {"message_content": "hola"})
+        await queue.stop()
+
+    asyncio.run(first_run())
+    with open(spool) as f:
+        assert [json.loads(line)["row"] for line in f] == [{"message_content": "hola"}]
+
+    writer = SlowWriter()
+
+    async def second_run():
+        queue = await run(writer)
+        await queue.stop()
+
+    asyncio.run(second_run())
+    assert writer.rows == [("raw_logs", {"message_content": "hola"})]
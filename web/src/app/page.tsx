@@ -8,7 +8,7 @@ import { MoodArea } from '@/components/dashboard/MoodArea';
 export const revalidate = 0;
 
 export default async function Home() {
-  const { transactions, journalEntries, activities, totalSpent, donutChartData, moodChartData } = await getDashboardData();
+  const { transactions, activities, totalSpent, donutChartData, moodChartData } = await getDashboardData();
 
   const currencyFormatter = (number: number) => 
     `$${Intl.NumberFormat('es-AR').format(number).toString()}`;
@@ -1,37 +1,48 @@
 import { supabase } from './supabase';
-import { Transaction, JournalEntry, Activity } from '@/types';
-import { format, subDays, startOfMonth, endOfMonth } from 'date-fns';
+import { Transaction, Activity, FinanceDailyRollup, MoodDailyRollup } from '@/types';
+import { format, parseISO, subDays, startOfMonth, endOfMonth } from 'date-fns';
 
 export async function getDashboardData() {
   const now = new Date();
-  const startMonth = startOfMonth(now).toISOString();
-  const endMonth = endOfMonth(now).toISOString();
-  const sevenDaysAgo = subDays(now, 7).toISOString();
+  // Rollup tables are keyed by plain dates (YYYY-MM-DD)
+  const startMonth = format(startOfMonth(now), 'yyyy-MM-dd');
+  const endMonth = format(endOfMonth(now), 'yyyy-MM-dd');
+  const sevenDaysAgo = format(subDays(now, 7), 'yyyy-MM-dd');
 
-  // 1. Fetch Finance Transactions (Current Month)
-  const { data: transactions, error: financeError } = await supabase
-    .from('finance_transactions')
-    .select('*')
-    .gte('date_transaction', startMonth)
-    .lte('date_transaction', endMonth)
-    .order('date_transaction', { ascending: false });
+  // 1. Fetch Finance Rollup (Current Month): one row per day/category/payment method
+  const { data: financeRollup, error: financeError } = await supabase
+    .from('finance_daily_rollup')
+    .select('day, category, total')
+    .gte('day', startMonth)
+    .lte('day', endMonth);
 
   if (financeError) {
-    console.error('Error fetching finance:', financeError);
+    console.error('Error fetching finance rollup:', financeError);
   }
 
-  // 2. Fetch Journal Entries (Last 7 Days)
-  const { data: journalEntries, error: journalError } = await supabase
-    .from('journal_entries')
+  // 2. Fetch Latest Transactions (only the ones listed)
+  const { data: transactions, error: transactionsError } = await supabase
+    .from('finance_transactions')
     .select('*')
-    .gte('created_at', sevenDaysAgo)
-    .order('created_at', { ascending: true });
+    .order('date_transaction', { ascending: false })
+    .limit(5);
+
+  if (transactionsError) {
+    console.error('Error fetching transactions:', transactionsError);
+  }
+
+  // 3. Fetch Mood Rollup (Last 7 Days)
+  const { data: moodRollup, error: moodError } = await supabase
+    .from('mood_daily_rollup')
+    .select('day, mood_sum, mood_count')
+    .gte('day', sevenDaysAgo)
+    .order('day', { ascending: true });
 
-  if (journalError) {
-    console.error('Error fetching journal:', journalError);
+  if (moodError) {
+    console.error('Error fetching mood rollup:', moodError);
   }
 
-  // 3. Fetch Activities (Latest 5)
+  // 4. Fetch Activities (Latest 5)
   const { data: activities, error: activityError } = await supabase
     .from('activities')
     .select('*')
@@ -42,16 +53,16 @@ export async function getDashboardData() {
     console.error('Error fetching activities:', activityError);
   }
 
-  // 4. Transformations
+  // 5. Transformations (over days, not transactions)
+  const financeRows = (financeRollup as FinanceDailyRollup[]) || [];
 
   // Calculate Total Spent
-  const totalSpent = transactions?.reduce((sum, t) => sum + Number(t.amount), 0) || 0;
+  const totalSpent = financeRows.reduce((sum, r) => sum + Number(r.total), 0);
 
   // Group by Category for Donut Chart
   const expensesByCategory: Record<string, number> = {};
-  transactions?.forEach((t) => {
-    const category = t.category || 'Uncategorized';
-    expensesByCategory[category] = (expensesByCategory[category] || 0) + Number(t.amount);
+  financeRows.forEach((r) => {
+    expensesByCategory[r.category] = (expensesByCategory[r.category] || 0) + Number(r.total);
   });
 
   const donutChartData = Object.entries(expensesByCategory).map(([name, value]) => ({
@@ -59,15 +70,16 @@ export async function getDashboardData() {
     value,
   }));
 
-  // Map Mood Score for Area Chart
-  const moodChartData = journalEntries?.map((entry) => ({
-    date: format(new Date(entry.created_at!), 'MMM dd'),
-    Mood: entry.mood_score,
-  })) || [];
+  // Daily average Mood Score for Area Chart
+  const moodChartData = ((moodRollup as MoodDailyRollup[]) || [])
+    .filter((r) => r.mood_count > 0)
+    .map((r) => ({
+      date: format(parseISO(r.day), 'MMM dd'),
+      Mood: Math.round((Number(r.mood_sum) / r.mood_count) * 10) / 10,
+    }));
 
   return {
     transactions: (transactions as Transaction[]) || [],
-    journalEntries: (journalEntries as JournalEntry[]) || [],
     activities: (activities as Activity[]) || [],
     totalSpent,
     donutChartData,
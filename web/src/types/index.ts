@@ -30,3 +30,18 @@ export interface Activity {
   type: string | null;
   details: Record<string, any> | null; // jsonb
 }
+
+// Daily rollups (migration_v6.sql)
+export interface FinanceDailyRollup {
+  day: string;
+  category: string;
+  payment_method: string;
+  total: number;
+  tx_count: number;
+}
+
+export interface MoodDailyRollup {
+  day: string;
+  mood_sum: number;
+  mood_count: number;
+}